@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=invalid-name
+# pylint: disable=wrong-import-position
+
+import logging
+import os
+import sys
+import time
+from typing import Any, Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import helmYAMLizer  # noqa: E402
+from corpus import iter_example_lines  # noqa: E402
+
+LABEL_KEYS = ["helm.sh/chart", "app.kubernetes.io/managed-by"]
+ROUNDS = 5
+
+
+def load_corpus() -> List[Any]:
+    """Parse every example chart document once."""
+    return [
+        helmYAMLizer.load_document(raw_document)
+        for raw_document in helmYAMLizer.iter_raw_documents(iter_example_lines())
+    ]
+
+
+def measure(transform: Callable[[Any], Any], documents: List[Any]) -> float:
+    """Return the average wall time it takes to transform the whole corpus."""
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for document in documents:
+            transform(document)
+    return (time.perf_counter() - start) / ROUNDS
+
+
+def main() -> None:
+    """Main function"""
+    logging.disable(logging.CRITICAL)
+    documents = load_corpus()
+    results = {}
+    for mode in ("recursive", "targeted"):
+        transform = helmYAMLizer.get_transform(
+            helmYAMLizer.RenderOptions(LABEL_KEYS, drop_labels_mode=mode)
+        )
+        elapsed = measure(transform, documents)
+        results[mode] = elapsed
+        print(
+            f"{mode:>10}: {elapsed * 1000:9.2f}ms {len(documents) / elapsed:10.1f} docs/s"
+        )
+    print(f"{'speedup':>10}: {results['recursive'] / results['targeted']:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
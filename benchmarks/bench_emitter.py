@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=invalid-name
+# pylint: disable=wrong-import-position
+
+import logging
+import os
+import sys
+import time
+from typing import Any, Callable, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import helmYAMLizer  # noqa: E402
+from corpus import iter_example_lines  # noqa: E402
+
+# Documents parsed with a loader, along with their source comment.
+Documents = List[Tuple[str, Any]]
+
+
+def load_corpus(loader: str) -> Documents:
+    """Parse every example chart document having a source with the loader."""
+    documents = []
+    for raw_document in helmYAMLizer.iter_raw_documents(iter_example_lines()):
+        source_comment = helmYAMLizer.get_raw_first_line_comment(raw_document)
+        if not source_comment:
+            continue
+        if loader == "fast":
+            document = helmYAMLizer.load_fast_document(raw_document)
+        else:
+            document = helmYAMLizer.load_document(raw_document)
+        documents.append((source_comment, document))
+    return documents
+
+
+def serializer(loader: str, emitter: str) -> Callable[[str, Any], str]:
+    """Return the serializer 'process_document' uses for the loader and emitter."""
+    if loader == "roundtrip" and emitter == "roundtrip":
+        return lambda _, document: helmYAMLizer.serialize_document(document)
+    return lambda source_comment, document: helmYAMLizer.serialize_fast_document(
+        source_comment, document, emitter
+    )
+
+
+def measure(
+    serialize: Callable[[str, Any], str], documents: Documents
+) -> Tuple[float, int]:
+    """Return the wall time and output bytes of serializing the whole corpus."""
+    size = 0
+    start = time.perf_counter()
+    for source_comment, document in documents:
+        size += len(serialize(source_comment, document).encode("utf-8"))
+    return time.perf_counter() - start, size
+
+
+def main() -> None:
+    """Main function"""
+    logging.disable(logging.CRITICAL)
+    results = {}
+    for loader in ("roundtrip", "fast"):
+        documents = load_corpus(loader)
+        for emitter in ("roundtrip", "fast"):
+            serialize = serializer(loader, emitter)
+            # Create the YAML instances ahead of measuring.
+            serialize(*documents[0])
+            elapsed, size = measure(serialize, documents)
+            name = f"{loader} > {emitter}"
+            results[name] = elapsed
+            print(
+                f"{name:>21}: {elapsed:8.3f}s"
+                f" {len(documents) / elapsed:10.1f} docs/s"
+                f" {size / 2**20 / elapsed:8.2f} MB/s"
+            )
+    for loader in ("roundtrip", "fast"):
+        speedup = results[f"{loader} > roundtrip"] / results[f"{loader} > fast"]
+        print(f"{loader + ' speedup':>21}: {speedup:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
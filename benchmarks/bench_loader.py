@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=invalid-name
+# pylint: disable=wrong-import-position
+
+import logging
+import os
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import helmYAMLizer  # noqa: E402
+from corpus import iter_example_lines  # noqa: E402
+
+LABEL_KEYS = ["helm.sh/chart", "app.kubernetes.io/managed-by"]
+
+
+def load_corpus() -> List[str]:
+    """Load every example chart document as a raw document."""
+    return list(helmYAMLizer.iter_raw_documents(iter_example_lines()))
+
+
+def measure(engine: Callable[[str], object], documents: List[str]) -> float:
+    """Return the wall time it takes the engine to handle the whole corpus."""
+    start = time.perf_counter()
+    for raw_document in documents:
+        engine(raw_document)
+    return time.perf_counter() - start
+
+
+def partial_render(
+    transform: Callable, stats: helmYAMLizer.RunStats, loader: str
+) -> Callable[[str], object]:
+    """Return an engine rendering a document with the given loader."""
+    return lambda raw: helmYAMLizer.process_document(0, raw, transform, stats, loader)
+
+
+def main() -> None:
+    """Main function"""
+    logging.disable(logging.CRITICAL)
+    documents = load_corpus()
+    size_mb = sum(len(document.encode("utf-8")) for document in documents) / 2**20
+    transform = helmYAMLizer.get_transform(helmYAMLizer.RenderOptions(LABEL_KEYS))
+    stats = helmYAMLizer.RunStats(enabled=False)
+    engines = {
+        "parse roundtrip": helmYAMLizer.load_document,
+        "parse fast": helmYAMLizer.load_fast_document,
+        "render roundtrip": partial_render(transform, stats, "roundtrip"),
+        "render fast": partial_render(transform, stats, "fast"),
+    }
+    # Create the YAML instances and import ruamel.yaml ahead of measuring.
+    for engine in engines.values():
+        engine(documents[0])
+    results = {}
+    for name, engine in engines.items():
+        elapsed = measure(engine, documents)
+        results[name] = elapsed
+        print(
+            f"{name:>16}: {elapsed:8.3f}s"
+            f" {len(documents) / elapsed:10.1f} docs/s"
+            f" {size_mb / elapsed:8.2f} MB/s"
+        )
+    for stage in ("parse", "render"):
+        speedup = results[f"{stage} roundtrip"] / results[f"{stage} fast"]
+        print(f"{stage + ' speedup':>16}: {speedup:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
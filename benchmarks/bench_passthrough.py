@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=invalid-name
+# pylint: disable=wrong-import-position
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import helmYAMLizer  # noqa: E402
+from corpus import iter_example_lines  # noqa: E402
+
+
+def load_corpus() -> List[str]:
+    """Load every example chart document as a raw document."""
+    return list(helmYAMLizer.iter_raw_documents(iter_example_lines()))
+
+
+def roundtrip(raw_document: str, target_dir: str) -> None:
+    """Process a document the way a transforming run does."""
+    document = helmYAMLizer.load_document(raw_document)
+    comment = helmYAMLizer.get_first_line_comment(document)
+    path = helmYAMLizer.flatten_source_path(
+        helmYAMLizer.get_template_source_path(comment)
+    )
+    file_path = helmYAMLizer.prepare_file_path(target_dir, path)
+    helmYAMLizer.save_document_to_file(file_path, document)
+
+
+def passthrough(raw_document: str, target_dir: str) -> None:
+    """Process a document the way a non-transforming run does."""
+    comment = helmYAMLizer.get_raw_first_line_comment(raw_document)
+    path = helmYAMLizer.flatten_source_path(
+        helmYAMLizer.get_template_source_path(comment)
+    )
+    file_path = helmYAMLizer.prepare_file_path(target_dir, path)
+    helmYAMLizer.save_bytes_to_file(file_path, raw_document.encode("utf-8"))
+
+
+def measure(engine: Callable[[str, str], None], documents: List[str]) -> float:
+    """Return the wall time it takes the engine to write the whole corpus."""
+    with tempfile.TemporaryDirectory() as target_dir:
+        start = time.perf_counter()
+        for raw_document in documents:
+            engine(raw_document, target_dir)
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    """Main function"""
+    logging.disable(logging.CRITICAL)
+    documents = load_corpus()
+    size_mb = sum(len(document.encode("utf-8")) for document in documents) / 2**20
+    results = {}
+    for engine in (roundtrip, passthrough):
+        elapsed = measure(engine, documents)
+        results[engine.__name__] = elapsed
+        print(
+            f"{engine.__name__:>12}: {elapsed:8.3f}s"
+            f" {len(documents) / elapsed:10.1f} docs/s"
+            f" {size_mb / elapsed:8.2f} MB/s"
+        )
+    print(f"{'speedup':>12}: {results['roundtrip'] / results['passthrough']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
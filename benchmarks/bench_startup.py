@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=invalid-name
+
+import argparse
+import os
+import py_compile
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SCRIPT = os.path.join(ROOT_DIR, "helmYAMLizer.py")
+
+# Modules a plain import must not load, as they are only needed on first use.
+LAZY_MODULES = (
+    "ruamel.yaml",
+    "concurrent.futures.process",
+    "socketserver",
+    "socket",
+    "subprocess",
+    "tempfile",
+    "mmap",
+)
+
+# Standard library modules every run needs, imported eagerly by the module.
+# Importing them is the reference the import time is compared with, measured
+# the same way and in the same run, so the gate holds on any machine.
+BASELINE_MODULES = (
+    "argparse",
+    "collections",
+    "contextlib",
+    "contextvars",
+    "dataclasses",
+    "fnmatch",
+    "functools",
+    "heapq",
+    "json",
+    "logging",
+    "re",
+    "threading",
+    "typing",
+)
+
+# The module takes about a quarter longer to import than its baseline, which
+# leaves room for noise but not for another eager dependency.
+MAX_IMPORT_RATIO = 1.5
+
+# A single chart document, small enough for interpreter startup to dominate.
+SMALL_CHART = """---
+# Source: chart/templates/service.yaml
+apiVersion: v1
+kind: Service
+metadata:
+  name: release-chart
+"""
+
+
+def measure_import(modules: Tuple[str, ...]) -> Tuple[float, List[str]]:
+    """Return the import time of the modules and the lazy modules they loaded."""
+    code = (
+        f"import sys, {', '.join(modules)};"
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Lines of the imported modules themselves report their cumulative
+    # microseconds, the ones of their dependencies are indented further.
+    cumulative = 0
+    for line in result.stderr.splitlines()[1:]:
+        _, microseconds, name = line.split("|")
+        if name[1:] in modules:
+            cumulative += int(microseconds)
+    return cumulative / 1000, [m for m in result.stdout.strip().split(",") if m]
+
+
+def measure_run(target_dir: str) -> float:
+    """Return the wall time of a passthrough run on a single document."""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, SCRIPT, "--dir", target_dir],
+        input=SMALL_CHART,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    """Main function"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--max-import-ratio",
+        type=float,
+        default=MAX_IMPORT_RATIO,
+        help="Fail if the fastest import takes longer than this times the baseline.",
+    )
+    args = parser.parse_args()
+    # Compile ahead, as 'PYTHONDONTWRITEBYTECODE' would otherwise have every
+    # import measure the compilation too.
+    py_compile.compile(SCRIPT)
+    baselines, imports, runs, loaded = [], [], [], set()
+    with tempfile.TemporaryDirectory() as target_dir:
+        for _ in range(args.runs):
+            baselines.append(measure_import(BASELINE_MODULES)[0])
+            import_ms, lazy_loaded = measure_import(("helmYAMLizer",))
+            imports.append(import_ms)
+            loaded.update(lazy_loaded)
+            runs.append(measure_run(target_dir))
+    for name, timings in (("baseline", baselines), ("import", imports), ("run", runs)):
+        median = sorted(timings)[len(timings) // 2]
+        print(f"{name:>12}: {min(timings):8.1f}ms (median {median:.1f}ms)")
+    failures = []
+    if loaded:
+        failures.append(f"import loaded {', '.join(sorted(loaded))}")
+    ratio = min(imports) / min(baselines)
+    print(f"{'ratio':>12}: {ratio:8.2f}")
+    if ratio > args.max_import_ratio:
+        failures.append(
+            f"import took {ratio:.2f} times the baseline,"
+            f" over {args.max_import_ratio:.2f}"
+        )
+    for failure in failures:
+        print(f"{'regression':>12}: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=invalid-name
+
+import glob
+import os
+import random
+from typing import Iterator
+
+EXAMPLES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "examples"
+)
+
+KINDS = ("Deployment", "Service", "ConfigMap", "ServiceAccount")
+
+
+def iter_example_lines() -> Iterator[str]:
+    """Yield the lines of every example chart as one 'helm template' stream."""
+    for file_path in sorted(glob.glob(f"{EXAMPLES_DIR}/**/*.yaml", recursive=True)):
+        with open(file_path, encoding="utf-8", newline="") as f:
+            yield from f
+
+
+def generate_labels(density: int, indent: str) -> Iterator[str]:
+    """Yield a labels mapping holding the requested number of labels."""
+    yield f"{indent}labels:\n"
+    yield f"{indent}  helm.sh/chart: synthetic-1.0.0\n"
+    yield f"{indent}  app.kubernetes.io/managed-by: Helm\n"
+    for index in range(density):
+        yield f"{indent}  example.com/label-{index}: value-{index}\n"
+
+
+def generate_schema(properties: int, rng: random.Random) -> Iterator[str]:
+    """Yield an openAPIV3Schema with nested properties, like large CRDs have."""
+    yield "      schema:\n"
+    yield "        openAPIV3Schema:\n"
+    yield "          type: object\n"
+    yield "          properties:\n"
+    for index in range(properties):
+        yield f"            field{index}:\n"
+        yield f"              description: {'lorem ipsum ' * rng.randint(1, 8)}\n"
+        yield "              type: object\n"
+        yield "              properties:\n"
+        # CRD schemas commonly describe 'labels' themselves.
+        yield "                labels:\n"
+        yield "                  type: object\n"
+        yield "                  additionalProperties:\n"
+        yield "                    type: string\n"
+
+
+def generate_stream(
+    documents: int = 1000,
+    crd_size: int = 200,
+    crd_ratio: float = 0.05,
+    label_density: int = 5,
+    subchart_depth: int = 1,
+    seed: int = 0,
+) -> Iterator[str]:
+    """
+    Yield the lines of a synthetic 'helm template' stream.
+
+    'crd_size' is the number of schema properties of every CRD, 'crd_ratio'
+    the share of documents that are CRDs, 'label_density' the number of extra
+    labels per resource and 'subchart_depth' how deeply templates are nested
+    in subcharts.
+    """
+    rng = random.Random(seed)
+    chart_path = "synthetic" + "".join(
+        f"/charts/sub{level}" for level in range(subchart_depth)
+    )
+    for index in range(documents):
+        yield "---\n"
+        if rng.random() < crd_ratio:
+            yield f"# Source: crds/crd-{index}.yaml\n"
+            yield "apiVersion: apiextensions.k8s.io/v1\n"
+            yield "kind: CustomResourceDefinition\n"
+            yield "metadata:\n"
+            yield f"  name: crd{index}.example.com\n"
+            yield from generate_labels(label_density, "  ")
+            yield "spec:\n"
+            yield "  versions:\n"
+            yield "    - name: v1\n"
+            yield from generate_schema(crd_size, rng)
+            continue
+        kind = KINDS[index % len(KINDS)]
+        yield f"# Source: {chart_path}/templates/{kind.lower()}-{index}.yaml\n"
+        yield "apiVersion: v1\n"
+        yield f"kind: {kind}\n"
+        yield "metadata:\n"
+        yield f"  name: resource-{index}\n"
+        yield from generate_labels(label_density, "  ")
+        if kind == "Deployment":
+            yield "spec:\n"
+            yield "  template:\n"
+            yield "    metadata:\n"
+            yield from generate_labels(label_density, "      ")
+            yield "    spec:\n"
+            yield "      containers:\n"
+            yield f"        - name: container-{index}\n"
+            yield "          image: 'example.com/image:1.0.0'\n"
+        elif kind == "ConfigMap":
+            yield "data:\n"
+            for key in range(rng.randint(1, 20)):
+                yield f'  key{key}: "{"x" * rng.randint(10, 200)}"\n'
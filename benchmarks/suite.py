@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=invalid-name
+# pylint: disable=wrong-import-position
+
+import argparse
+import copy
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import helmYAMLizer  # noqa: E402
+from corpus import generate_stream, iter_example_lines  # noqa: E402
+
+LABEL_KEYS = ["helm.sh/chart", "app.kubernetes.io/managed-by"]
+
+
+def stage_split(lines: List[str], _: str) -> List[str]:
+    """Split the stream into raw documents."""
+    return list(helmYAMLizer.iter_raw_documents(lines))
+
+
+def stage_load(raw_documents: List[str], _: str) -> List[Any]:
+    """Parse the raw documents with the round-trip loader."""
+    return [helmYAMLizer.load_document(raw) for raw in raw_documents]
+
+
+def stage_get_first_line_comment(documents: List[Any], _: str) -> List[Any]:
+    """Extract the source comments and resolve the output paths."""
+    results = []
+    for document in documents:
+        comment = helmYAMLizer.get_first_line_comment(document)
+        if comment:
+            path = helmYAMLizer.get_template_source_path(comment)
+            results.append((helmYAMLizer.flatten_source_path(path), document))
+    return results
+
+
+def stage_drop_label_keys(documents: List[Any], _: str) -> List[Any]:
+    """Drop label keys with the recursive engine."""
+    transform = helmYAMLizer.get_transform(
+        helmYAMLizer.RenderOptions(LABEL_KEYS, drop_labels_mode="recursive")
+    )
+    return [(path, transform(document)) for path, document in documents]
+
+
+def stage_drop_targeted_label_keys(documents: List[Any], _: str) -> List[Any]:
+    """Drop label keys with the targeted engine."""
+    transform = helmYAMLizer.get_transform(helmYAMLizer.RenderOptions(LABEL_KEYS))
+    return [(path, transform(document)) for path, document in documents]
+
+
+def stage_save_document_to_file(documents: List[Any], target_dir: str) -> List[str]:
+    """Serialize and save every document."""
+    paths = []
+    for path, document in documents:
+        file_path = helmYAMLizer.prepare_file_path(target_dir, path)
+        helmYAMLizer.save_document_to_file(file_path, document)
+        paths.append(path)
+    return paths
+
+
+def stage_generate_kustomize_file(paths: List[str], target_dir: str) -> List[str]:
+    """Generate the kustomization from the rendered paths."""
+    helmYAMLizer.generate_kustomize_file(target_dir, paths)
+    return paths
+
+
+STAGES: Tuple[Tuple[str, Callable[[Any, str], Any]], ...] = (
+    ("split", stage_split),
+    ("load_all", stage_load),
+    ("get_first_line_comment", stage_get_first_line_comment),
+    ("drop_label_keys", stage_drop_label_keys),
+    ("drop_targeted_label_keys", stage_drop_targeted_label_keys),
+    ("save_document_to_file", stage_save_document_to_file),
+    ("generate_kustomize_file", stage_generate_kustomize_file),
+)
+
+# Stages changing the documents in place. Each one is given its own copy of
+# the documents of the last other stage, so that no engine runs on documents
+# another one already changed.
+IN_PLACE_STAGES = frozenset(("drop_label_keys", "drop_targeted_label_keys"))
+
+
+def run_stages(lines: List[str], trace_memory: bool) -> Dict[str, Dict[str, float]]:
+    """Run every stage on the output of the previous one, or a copy, and measure it."""
+    results: Dict[str, Dict[str, float]] = {}
+    data: Any = lines
+    documents: Any = lines
+    with tempfile.TemporaryDirectory() as target_dir:
+        for name, stage in STAGES:
+            if name in IN_PLACE_STAGES:
+                # Copied ahead of measuring, so the copy is not accounted for.
+                data = copy.deepcopy(documents)
+            if trace_memory:
+                tracemalloc.start()
+            wall, cpu = time.perf_counter(), time.process_time()
+            data = stage(data, target_dir)
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            if name not in IN_PLACE_STAGES:
+                documents = data
+            results[name] = {"seconds": wall, "cpu_seconds": cpu}
+            if trace_memory:
+                results[name] = {
+                    "peak_memory_bytes": tracemalloc.get_traced_memory()[1]
+                }
+                tracemalloc.stop()
+    return results
+
+
+def run_suite(lines: List[str], rounds: int) -> Dict[str, Dict[str, float]]:
+    """Measure the best of several rounds, then the peak memory of each stage."""
+    documents = len(stage_split(lines, ""))
+    size_mb = sum(len(line.encode("utf-8")) for line in lines) / 2**20
+    best: Dict[str, Dict[str, float]] = {}
+    for _ in range(rounds):
+        for name, result in run_stages(lines, trace_memory=False).items():
+            if name not in best or result["seconds"] < best[name]["seconds"]:
+                best[name] = result
+    # Tracing allocations slows everything down, so it runs separately.
+    for name, result in run_stages(lines, trace_memory=True).items():
+        seconds = best[name]["seconds"] or float("inf")
+        best[name].update(result)
+        best[name]["docs_per_sec"] = documents / seconds
+        best[name]["mb_per_sec"] = size_mb / seconds
+    return best
+
+
+def compare(base_path: str, head_path: str) -> None:
+    """Print how each stage changed between two saved results."""
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)["stages"]
+    with open(head_path, encoding="utf-8") as f:
+        head = json.load(f)["stages"]
+    print(f"{'stage':<26}{'base docs/s':>14}{'head docs/s':>14}{'change':>10}")
+    for name in head:
+        if name not in base:
+            continue
+        before, after = base[name]["docs_per_sec"], head[name]["docs_per_sec"]
+        print(f"{name:<26}{before:>14.1f}{after:>14.1f}{after / before - 1:>+10.1%}")
+
+
+def get_arguments() -> argparse.Namespace:
+    """Parses and returns command line arguments."""
+    parser = argparse.ArgumentParser(description="helmYAMLizer benchmark suite.")
+    parser.add_argument(
+        "--corpus", choices=["examples", "synthetic"], default="examples"
+    )
+    parser.add_argument("--documents", type=int, default=300)
+    parser.add_argument("--crd-size", type=int, default=100)
+    parser.add_argument("--crd-ratio", type=float, default=0.05)
+    parser.add_argument("--label-density", type=int, default=5)
+    parser.add_argument("--subchart-depth", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", help="Save the results as JSON to this file.")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BASE", "HEAD"), help="Compare two results."
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Main function"""
+    args = get_arguments()
+    if args.compare:
+        compare(*args.compare)
+        return
+    logging.disable(logging.CRITICAL)
+    if args.corpus == "examples":
+        corpus: Dict[str, Any] = {"name": "examples"}
+        lines = list(iter_example_lines())
+    else:
+        corpus = {
+            "name": "synthetic",
+            "documents": args.documents,
+            "crd_size": args.crd_size,
+            "crd_ratio": args.crd_ratio,
+            "label_density": args.label_density,
+            "subchart_depth": args.subchart_depth,
+            "seed": args.seed,
+        }
+        lines = list(
+            generate_stream(
+                args.documents,
+                args.crd_size,
+                args.crd_ratio,
+                args.label_density,
+                args.subchart_depth,
+                args.seed,
+            )
+        )
+    corpus["bytes"] = sum(len(line.encode("utf-8")) for line in lines)
+    stages = run_suite(lines, args.rounds)
+    print(f"{'stage':<26}{'docs/s':>12}{'MB/s':>10}{'cpu s':>10}{'peak MB':>10}")
+    for name, result in stages.items():
+        print(
+            f"{name:<26}{result['docs_per_sec']:>12.1f}{result['mb_per_sec']:>10.2f}"
+            f"{result['cpu_seconds']:>10.3f}{result['peak_memory_bytes'] / 2**20:>10.2f}"
+        )
+    if args.output:
+        results = {
+            "corpus": corpus,
+            "python": platform.python_version(),
+            "stages": stages,
+        }
+        with open(args.output, encoding="utf-8", mode="w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,21 +5,350 @@
 # pylint: disable=invalid-name
 
 import argparse
+import io
+import json
 import logging
 import os
+import posixpath
+import re
+import stat
 import sys
-from functools import wraps
-from typing import Callable, Any, Dict, List, Union, Optional
+import threading
+import time
+from collections import deque
+from contextlib import closing, contextmanager, nullcontext
+from contextvars import ContextVar, copy_context
+from dataclasses import asdict, dataclass, field, fields, replace
+from fnmatch import fnmatchcase
+from functools import lru_cache, partial, wraps
+from heapq import nlargest
+from typing import (
+    Callable,
+    Any,
+    BinaryIO,
+    Deque,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Set,
+    TYPE_CHECKING,
+    Tuple,
+    Union,
+    Optional,
+    get_args,
+    get_origin,
+)
 
-from ruamel.yaml import YAML, YAMLError
-from ruamel.yaml.comments import CommentedMap
+# ruamel.yaml and the process pool make up a third of the import time, so they
+# are imported on first use, as are modules only some runs need. Passthrough
+# runs and '--help' never load them.
+if TYPE_CHECKING:
+    import mmap
+    import queue
+    from concurrent.futures import Future
+    from ruamel.yaml import YAML
+    from ruamel.yaml.comments import CommentedMap
 
-# Initialize new global YAML instance.
-yaml = YAML()
-# Ensure that the original quotes around string scalars are preserved.
-yaml.preserve_quotes = True
-# Ensure that each YAML document in a multi-document file starts with '---'.
-yaml.explicit_start = True
+
+def new_yaml() -> "YAML":
+    """Create a new round-trip YAML instance."""
+    # pylint: disable=import-outside-toplevel
+    from ruamel.yaml import YAML
+
+    yaml_instance = YAML()
+    # Ensure that the original quotes around string scalars are preserved.
+    yaml_instance.preserve_quotes = True
+    # Ensure that each YAML document in a multi-document file starts with '---'.
+    yaml_instance.explicit_start = True
+    return yaml_instance
+
+
+def __getattr__(name: str) -> Any:
+    """Create the global YAML instance on first access."""
+    if name == "yaml":
+        # pylint: disable=global-statement
+        global yaml
+        yaml = new_yaml()
+        return yaml
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# The global YAML instance, 'yaml', is created by '__getattr__' when first
+# used. Pool workers replace it with their own.
+# YAML instances of other threads, as a YAML instance is not thread-safe.
+thread_yaml = threading.local()
+
+
+def new_fast_yaml() -> Tuple["YAML", "YAML"]:
+    """
+    Create the YAML instances of the fast loader.
+
+    Returns a safe loader, C-backed when ruamel.yaml.clib is installed, and a
+    dumper for the plain data it returns. Both follow YAML 1.1 like
+    Kubernetes does, so that '0755' stays an octal number and the string
+    'yes' keeps its quotes.
+    """
+    # pylint: disable=import-outside-toplevel
+    from ruamel.yaml import YAML
+    from ruamel.yaml.constructor import SafeConstructor
+    from ruamel.yaml.representer import RoundTripRepresenter
+
+    class FastConstructor(SafeConstructor):
+        """Read floats without a dot in their mantissa, such as '1e3', quietly."""
+
+        def construct_yaml_float(self, node: Any) -> float:
+            """Construct the float, bypassing the YAML 1.1 mantissa warning."""
+            value = self.construct_scalar(node).replace("_", "").lower()
+            mantissa, exponent, _ = value.partition("e")
+            if exponent and "." not in mantissa:
+                return float(value)
+            return super().construct_yaml_float(node)
+
+    FastConstructor.add_constructor(
+        "tag:yaml.org,2002:float", FastConstructor.construct_yaml_float
+    )
+
+    class FastRepresenter(RoundTripRepresenter):
+        """Represent multi-line strings as literal blocks, like charts do."""
+
+        def represent_str(self, data: str) -> Any:
+            """Represent the string, as a literal block if multi-line."""
+            style = "|" if "\n" in data else None
+            return self.represent_scalar("tag:yaml.org,2002:str", data, style=style)
+
+    FastRepresenter.add_representer(str, FastRepresenter.represent_str)
+    loader = YAML(typ="safe")
+    loader.Constructor = FastConstructor
+    loader.version = (1, 1)
+    dumper = YAML()
+    dumper.Representer = FastRepresenter
+    dumper.version = (1, 1)
+    dumper.explicit_start = True
+    # Never fold long scalars: ruamel.yaml may fold a double-quoted scalar
+    # right after an escaped line break, which adds a space when read back.
+    dumper.width = sys.maxsize
+    return loader, dumper
+
+
+def get_fast_yaml() -> Tuple["YAML", "YAML"]:
+    """Return the fast loader YAML instances of the current thread."""
+    if not hasattr(thread_yaml, "fast"):
+        thread_yaml.fast = new_fast_yaml()
+    return thread_yaml.fast
+
+
+def new_fast_emitter() -> "YAML":
+    """
+    Create the YAML instance of the fast emitter.
+
+    Returns a dumper using the C-backed emitter when ruamel.yaml.clib is
+    installed, for the documents of either loader. It keeps the key order,
+    the quotes of round-trip strings and the format of round-trip numbers,
+    and quotes plain strings following YAML 1.1 like the fast loader does.
+    """
+    # pylint: disable=import-outside-toplevel
+    import datetime
+    from ruamel.yaml import YAML
+    from ruamel.yaml.representer import RoundTripRepresenter, SafeRepresenter
+    from ruamel.yaml.resolver import VersionedResolver
+    from ruamel.yaml.scalarbool import ScalarBoolean
+    from ruamel.yaml.scalarfloat import ScalarFloat
+    from ruamel.yaml.scalarint import (
+        BinaryInt,
+        HexCapsInt,
+        HexInt,
+        OctalInt,
+        ScalarInt,
+    )
+
+    class FastEmitterRepresenter(SafeRepresenter):
+        """Represent plain and round-trip data in its original order and style."""
+
+        # The C emitter always resolves with the YAML 1.2 rules of 'Resolver',
+        # which comes after the representer in its class hierarchy.
+        resolver = VersionedResolver(version=(1, 1))
+        # Round-trip numbers keep their original format.
+        insert_underscore = RoundTripRepresenter.insert_underscore
+
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            self.sort_base_mapping_type_on_output = False
+
+        def resolve(self, kind: Any, value: Any, implicit: Any) -> Any:
+            """Resolve the tag of a node with the YAML 1.1 rules."""
+            return self.resolver.resolve(kind, value, implicit)
+
+        def represent_scalar(
+            self, tag: Any, value: Any, style: Any = None, anchor: Any = None
+        ) -> Any:
+            """Represent a scalar, without the anchors of round-trip data."""
+            return super().represent_scalar(tag, value, style=style)
+
+        def represent_str(self, data: str) -> Any:
+            """Represent a string in its original style, or literal if multi-line."""
+            style = getattr(data, "style", None) or ("|" if "\n" in data else None)
+            return self.represent_scalar(
+                "tag:yaml.org,2002:str", str(data), style=style
+            )
+
+    FastEmitterRepresenter.add_representer(str, FastEmitterRepresenter.represent_str)
+    # Round-trip data is made of subclasses of the plain types.
+    for data_type, represent in (
+        (str, FastEmitterRepresenter.represent_str),
+        (ScalarBoolean, SafeRepresenter.represent_bool),
+        (BinaryInt, RoundTripRepresenter.represent_binary_int),
+        (OctalInt, RoundTripRepresenter.represent_octal_int),
+        (HexInt, RoundTripRepresenter.represent_hex_int),
+        (HexCapsInt, RoundTripRepresenter.represent_hex_caps_int),
+        (ScalarInt, RoundTripRepresenter.represent_scalar_int),
+        (ScalarFloat, RoundTripRepresenter.represent_scalar_float),
+        (dict, SafeRepresenter.represent_dict),
+        (list, SafeRepresenter.represent_list),
+        (datetime.datetime, SafeRepresenter.represent_datetime),
+        (datetime.date, SafeRepresenter.represent_date),
+    ):
+        FastEmitterRepresenter.add_multi_representer(data_type, represent)
+    emitter = YAML(typ="safe")
+    emitter.Representer = FastEmitterRepresenter
+    emitter.default_flow_style = False
+    emitter.explicit_start = True
+    # Never fold long scalars, within the int the C emitter takes.
+    emitter.width = 2**31 - 1
+    return emitter
+
+
+def get_fast_emitter() -> "YAML":
+    """Return the fast emitter YAML instance of the current thread."""
+    if not hasattr(thread_yaml, "emitter"):
+        thread_yaml.emitter = new_fast_emitter()
+    return thread_yaml.emitter
+
+
+def get_yaml() -> "YAML":
+    """Return the YAML instance of the current thread."""
+    if threading.current_thread() is threading.main_thread():
+        return globals().get("yaml") or __getattr__("yaml")
+    if not hasattr(thread_yaml, "instance"):
+        thread_yaml.instance = new_yaml()
+    return thread_yaml.instance
+
+
+# Whether 'handle_exceptions' terminates the process. The library API and pool
+# workers disable it so that errors are raised as 'RenderError' instead.
+EXIT_ON_ERROR: ContextVar[bool] = ContextVar("EXIT_ON_ERROR", default=True)
+
+# Name of the file recording what the previous run wrote into a directory.
+MANIFEST_FILE_NAME = ".helmYAMLizer-manifest.json"
+
+# Supported archive extensions mapped to their compression.
+ARCHIVE_EXTENSIONS = {
+    ".tar": "",
+    ".tar.gz": "gz",
+    ".tgz": "gz",
+    ".tar.xz": "xz",
+    ".txz": "xz",
+}
+
+# Values accepted by the render options that are a choice, as on the command line.
+OPTION_CHOICES: Dict[str, Tuple[str, ...]] = {
+    "drop_labels_mode": ("targeted", "recursive"),
+    "loader": ("roundtrip", "fast"),
+    "emitter": ("roundtrip", "fast"),
+}
+
+# Smallest values of the integer render options, where writers default to none.
+OPTION_MINIMUMS = {"jobs": 1, "writers": 0, "stats_top": 1, "cache_size": 1}
+
+# Number of documents each writer thread may have queued before the
+# processing of further documents waits for it.
+WRITE_QUEUE_SIZE = 16
+
+# Result of transforming a document in a pool worker.
+TransformResult = Tuple[
+    int, Optional[str], Optional[str], Optional[str], Dict[str, List[float]]
+]
+
+# Document transformation, loader and emitter of pool workers, set by the
+# initializer.
+worker_transform: Optional[Callable[[Any], Any]] = None
+worker_loader = "roundtrip"
+worker_emitter = "roundtrip"
+# Mapped input file pool workers read their documents from, if any.
+worker_buffer: Optional[Union["mmap.mmap", bytes]] = None
+
+# Locations of resource labels, as key paths where '*' matches list items.
+LABEL_PATHS: Tuple[Tuple[str, ...], ...] = (
+    ("metadata", "labels"),
+    ("spec", "template", "metadata", "labels"),
+    ("spec", "jobTemplate", "metadata", "labels"),
+    ("spec", "jobTemplate", "spec", "template", "metadata", "labels"),
+    ("spec", "volumeClaimTemplates", "*", "metadata", "labels"),
+    ("spec", "podMetadata", "labels"),
+)
+
+# Locations of label selectors, only visited when explicitly requested.
+SELECTOR_PATHS: Tuple[Tuple[str, ...], ...] = (
+    ("spec", "selector"),
+    ("spec", "selector", "matchLabels"),
+    ("spec", "jobTemplate", "spec", "selector", "matchLabels"),
+)
+
+# Fields documents can be filtered on, in 'FIELD=GLOB' filter patterns.
+FILTER_FIELDS = ("source", "kind", "name")
+
+# Header fields of a document, at its top level and in its metadata.
+TOP_LEVEL_HEADER_KEYS = ("apiVersion", "kind")
+METADATA_HEADER_KEYS = ("name", "namespace")
+HEADER_KEYS = TOP_LEVEL_HEADER_KEYS + METADATA_HEADER_KEYS
+
+# Matches a block mapping key and its inline value in a raw document.
+HEADER_KEY_PATTERN = re.compile(r"^( *)([\w.-]+):(?:[ \t]+(.*?))?[ \t]*$")
+
+# Locations of resource annotations, mirroring the label locations.
+ANNOTATION_PATHS: Tuple[Tuple[str, ...], ...] = tuple(
+    label_path[:-1] + ("annotations",) for label_path in LABEL_PATHS
+)
+
+# Annotations telling Helm to run a resource as a hook.
+HELM_HOOK_ANNOTATIONS = frozenset(
+    ("helm.sh/hook", "helm.sh/hook-weight", "helm.sh/hook-delete-policy")
+)
+
+# Kinds of cluster-wide resources, which never get a namespace.
+CLUSTER_SCOPED_KINDS = frozenset(
+    (
+        "APIService",
+        "CSIDriver",
+        "CertificateSigningRequest",
+        "ClusterRole",
+        "ClusterRoleBinding",
+        "CustomResourceDefinition",
+        "IngressClass",
+        "MutatingWebhookConfiguration",
+        "Namespace",
+        "Node",
+        "PersistentVolume",
+        "PodSecurityPolicy",
+        "PriorityClass",
+        "RuntimeClass",
+        "StorageClass",
+        "ValidatingAdmissionPolicy",
+        "ValidatingAdmissionPolicyBinding",
+        "ValidatingWebhookConfiguration",
+        "VolumeSnapshotClass",
+    )
+)
+
+# Matches the YAML document start marker. Per the YAML spec, '---' at column 0
+# can never be part of a document's content, so it is a safe split point.
+DOCUMENT_START_PATTERN = re.compile(r"^---(?:[ \t\r\n]|$)")
+
+# The same marker, found anywhere in the bytes of a mapped file.
+MAPPED_DOCUMENT_START_PATTERN = re.compile(rb"^---(?:[ \t\r\n]|$)", re.MULTILINE)
+NON_BLANK_PATTERN = re.compile(rb"\S")
 
 
 def handle_exceptions(func: Callable) -> Callable:
@@ -35,6 +364,11 @@ def handle_exceptions(func: Callable) -> Callable:
         except Exception as err:
             # Get the name of the function where the exception occurred.
             func_name = func.__name__
+            # Let the caller handle the exception if exiting is disabled.
+            if not EXIT_ON_ERROR.get():
+                if isinstance(err, HelmYAMLizerError):
+                    raise
+                raise RenderError(func_name, str(err)) from err
             logging.fatal("An exception occurred " "in function %s: %s", func_name, err)
             # Exit the program with an error status.
             sys.exit(1)
@@ -42,6 +376,211 @@ def handle_exceptions(func: Callable) -> Callable:
     return wrapper
 
 
+@contextmanager
+def raising_errors() -> Iterator[None]:
+    """Raise errors as exceptions instead of exiting within the block."""
+    token = EXIT_ON_ERROR.set(False)
+    try:
+        yield
+    finally:
+        EXIT_ON_ERROR.reset(token)
+
+
+class HelmYAMLizerError(Exception):
+    """Base class of the errors raised by the library API."""
+
+
+class RenderError(HelmYAMLizerError):
+    """Raised when a processing function fails."""
+
+    def __init__(self, function: str, message: str) -> None:
+        super().__init__(function, message)
+        self.function = function
+        self.message = message
+
+    def __str__(self) -> str:
+        return f"An exception occurred in function {self.function}: {self.message}"
+
+
+class DocumentError(HelmYAMLizerError):
+    """Raised when a document fails to be processed."""
+
+    def __init__(self, index: int, message: str) -> None:
+        super().__init__(index, message)
+        self.index = index
+        self.message = message
+
+    def __str__(self) -> str:
+        return f"Document [#{self.index}]: {self.message}"
+
+
+class HelmError(HelmYAMLizerError):
+    """Raised when 'helm template' fails, carrying its exit code and stderr."""
+
+    def __init__(self, returncode: int, stderr: str) -> None:
+        super().__init__(returncode, stderr)
+        self.returncode = returncode
+        self.stderr = stderr
+
+    def __str__(self) -> str:
+        return f"helm template exited with code {self.returncode}: {self.stderr}"
+
+
+def iter_helm_template(chart: str, helm_args: List[str]) -> Iterator[str]:
+    """
+    Run 'helm template' on the chart and yield its output lines as they come.
+
+    Documents are processed while helm is still rendering. The helm binary is
+    taken from the 'HELM_BIN' environment variable, as set for helm plugins,
+    or looked up on the PATH. Once the output ends, a non-zero exit raises a
+    'HelmError' with the captured stderr; otherwise stderr is logged as
+    warnings. Closing the generator early kills helm.
+    """
+    # pylint: disable=import-outside-toplevel
+    import shlex
+    import subprocess
+
+    command = [os.environ.get("HELM_BIN", "helm"), "template", chart, *helm_args]
+    logging.info("Running %s", shlex.join(command))
+    try:
+        # pylint: disable=consider-using-with
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except OSError as err:
+        # Mirror the exit code of a shell failing to run the command.
+        raise HelmError(127, f"Failed to run helm: {err}") from err
+    # Drain stderr concurrently, so a chatty helm never blocks on a full pipe.
+    stderr_lines: List[str] = []
+    stderr_reader = threading.Thread(
+        target=stderr_lines.extend,
+        args=(io.TextIOWrapper(process.stderr, encoding="utf-8", errors="replace"),),
+        daemon=True,
+    )
+    stderr_reader.start()
+    try:
+        # Keep line endings untouched, just like when reading stdin.
+        yield from io.TextIOWrapper(process.stdout, encoding="utf-8", newline="")
+        returncode = process.wait()
+        stderr_reader.join()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+    stderr = "".join(stderr_lines).strip()
+    if returncode != 0:
+        # A helm killed by a signal exits like it would in a shell.
+        raise HelmError(returncode if returncode > 0 else 128 - returncode, stderr)
+    for line in stderr.splitlines():
+        logging.warning("helm: %s", line)
+
+
+def iter_raw_documents(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Yield raw YAML documents one at a time from an iterable of lines.
+
+    Documents are split on '---' start markers, which is where 'helm template'
+    emits its '# Source:' comments, so only a single document is ever buffered.
+    """
+    buffer: List[str] = []
+    for line in lines:
+        # A start marker closes the previously buffered document.
+        if DOCUMENT_START_PATTERN.match(line) and buffer:
+            yield from _flush_raw_document(buffer)
+            buffer = []
+        buffer.append(line)
+    yield from _flush_raw_document(buffer)
+
+
+def _flush_raw_document(buffer: List[str]) -> Iterator[str]:
+    """Yield the buffered lines as a document unless they are all blank."""
+    if any(line.strip() for line in buffer):
+        yield "".join(buffer)
+
+
+def map_file(file_path: str) -> Union["mmap.mmap", bytes]:
+    """Map the file read-only into memory; empty files cannot be mapped."""
+    # pylint: disable=import-outside-toplevel
+    import mmap
+
+    with open(file_path, mode="rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def index_document_offsets(
+    buffer: Union["mmap.mmap", bytes],
+) -> List[Tuple[int, int]]:
+    """
+    Return the start and end offsets of the documents of a mapped file.
+
+    Documents are split on the same start markers as 'iter_raw_documents',
+    and blank ones are left out just the same, without copying the buffer.
+    """
+    starts = [match.start() for match in MAPPED_DOCUMENT_START_PATTERN.finditer(buffer)]
+    if not starts or starts[0]:
+        starts.insert(0, 0)
+    ends = starts[1:] + [len(buffer)]
+    return [
+        (start, end)
+        for start, end in zip(starts, ends)
+        if NON_BLANK_PATTERN.search(buffer, start, end)
+    ]
+
+
+def read_mapped_document(
+    buffer: Union["mmap.mmap", bytes], span: Tuple[int, int]
+) -> str:
+    """Return the text of the document at the offsets of the mapped file."""
+    start, end = span
+    return buffer[start:end].decode("utf-8")
+
+
+class MappedSource:
+    """
+    A rendered file memory-mapped along with the offsets of its documents.
+
+    Iterating yields the raw documents like 'iter_raw_documents' does, while
+    the offset index gives random access to any of them: pool workers map the
+    file themselves and only receive the offsets of their documents.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = os.path.abspath(file_path)
+        self.buffer = map_file(self.file_path)
+        self.spans = index_document_offsets(self.buffer)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __iter__(self) -> Iterator[str]:
+        for span in self.spans:
+            yield read_mapped_document(self.buffer, span)
+
+    def read(self, span: Tuple[int, int]) -> str:
+        """Return the text of the document at the offsets."""
+        return read_mapped_document(self.buffer, span)
+
+    def close(self) -> None:
+        """Unmap the file; empty files were never mapped."""
+        if not isinstance(self.buffer, bytes):
+            self.buffer.close()
+
+
+@handle_exceptions
+def load_document(raw_document: str) -> Any:
+    """Parse a single raw YAML document."""
+    return get_yaml().load(raw_document)
+
+
+@handle_exceptions
+def load_fast_document(raw_document: str) -> Any:
+    """Parse a single raw YAML document into plain data with the fast loader."""
+    return get_fast_yaml()[0].load(raw_document)
+
+
 @handle_exceptions
 def get_first_line_comment(document: dict) -> Optional[str]:
     """Return the comment from the first line of the YAML document if it exists."""
@@ -63,6 +602,102 @@ def get_first_line_comment(document: dict) -> Optional[str]:
     return None
 
 
+@handle_exceptions
+def get_raw_first_line_comment(raw_document: str) -> Optional[str]:
+    """
+    Return the first line comment of a raw YAML document without parsing it.
+
+    Mirrors 'get_first_line_comment': the comment must directly follow the
+    start marker and the document body must be a mapping.
+    """
+    if not isinstance(raw_document, str):
+        raise ValueError(
+            f"Expected a string for raw document, but got {type(raw_document)}."
+        )
+    lines = raw_document.splitlines()
+    # Skip the document start marker if present.
+    if lines and DOCUMENT_START_PATTERN.match(lines[0]):
+        lines = lines[1:]
+    if not lines or not lines[0].startswith("#"):
+        return None
+    # Documents without a mapping body are skipped just like empty YAML.
+    for line in lines[1:]:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("-") and not stripped.startswith("---"):
+            return None
+        comment_value = lines[0].strip()
+        logging.debug("Comment value: %s", comment_value)
+        return comment_value
+    return None
+
+
+def scan_document_header(raw_document: str) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Return the header of a raw YAML document without parsing it.
+
+    The header holds the apiVersion, the kind and the metadata name and
+    namespace, None when missing. Only the block mappings and simple scalars
+    emitted by 'helm template' are recognized: None is returned for a header
+    written any other way, for the caller to parse the document instead.
+    """
+    header: Dict[str, Optional[str]] = dict.fromkeys(HEADER_KEYS)
+    in_metadata = seen_metadata = False
+    metadata_indent = 0
+    for line in raw_document.splitlines():
+        indent = len(line) - len(line.lstrip(" "))
+        match = HEADER_KEY_PATTERN.match(line)
+        if not match:
+            # Keys the pattern does not recognize may hide header fields.
+            stripped = line.strip()
+            if (
+                stripped
+                and not stripped.startswith("#")
+                and not DOCUMENT_START_PATTERN.match(line)
+                and (
+                    not indent or in_metadata and indent == (metadata_indent or indent)
+                )
+            ):
+                return None
+            continue
+        key, value = match.group(2), match.group(3)
+        if not indent:
+            if seen_metadata and header["apiVersion"] and header["kind"]:
+                break
+            in_metadata = key == "metadata"
+            if in_metadata:
+                # Flow mappings and other inline values need a parser.
+                if value and value[0] != "#":
+                    return None
+                seen_metadata = True
+                metadata_indent = 0
+            elif key in TOP_LEVEL_HEADER_KEYS:
+                header[key] = get_simple_scalar(value)
+                if header[key] is None:
+                    return None
+        elif in_metadata:
+            # Only keys of the metadata mapping itself, not of nested ones.
+            metadata_indent = metadata_indent or indent
+            if indent == metadata_indent and key in METADATA_HEADER_KEYS:
+                header[key] = get_simple_scalar(value)
+                if header[key] is None:
+                    return None
+    return header
+
+
+def get_simple_scalar(value: Optional[str]) -> Optional[str]:
+    """Return the text of a plain or quoted scalar without escapes, if it is one."""
+    if not value or value[0] in "&*!|>[{#%@`":
+        return None
+    if value[0] in "'\"":
+        if len(value) < 2 or value[-1] != value[0] or "\\" in value:
+            return None
+        return value[1:-1].replace("''", "'") if value[0] == "'" else value[1:-1]
+    # Plain scalars end with an inline comment.
+    return value.split(" #", 1)[0].rstrip()
+
+
 @handle_exceptions
 def get_template_source_path(comment: str) -> Optional[str]:
     """Get the document template path from a given comment string."""
@@ -115,6 +750,9 @@ def flatten_source_path(template_path: str) -> str:
 @handle_exceptions
 def save_document_to_file(file_path: str, document: Dict) -> None:
     """Save the given data to the specified file path."""
+    # pylint: disable=import-outside-toplevel
+    from ruamel.yaml import YAMLError
+
     # Validate that the provided document is a dictionary
     logging.debug("Document data to be saved: %s", document)
     if not isinstance(document, Dict):
@@ -130,7 +768,7 @@ def save_document_to_file(file_path: str, document: Dict) -> None:
         with open(file=file_path, encoding="utf-8", mode="w") as yaml_file:
             logging.debug("File path: %s", yaml_file.name)
             # Dump the document data to the file in YAML format
-            yaml.dump(document, yaml_file)
+            get_yaml().dump(document, yaml_file)
     # Catch IO errors that might occur during file operations
     except IOError as io_err:
         raise RuntimeError(
@@ -144,6 +782,58 @@ def save_document_to_file(file_path: str, document: Dict) -> None:
         ) from yaml_err
 
 
+@handle_exceptions
+def serialize_document(document: Dict) -> str:
+    """Serialize the given document to a YAML string."""
+    if not isinstance(document, Dict):
+        raise ValueError(
+            f"Provided document must be a dictionary, but got {type(document)}."
+        )
+    stream = io.StringIO()
+    get_yaml().dump(document, stream)
+    return stream.getvalue()
+
+
+@handle_exceptions
+def serialize_fast_document(
+    source_comment: str, document: Any, emitter: str = "roundtrip"
+) -> str:
+    """
+    Serialize a document read by the fast loader to a YAML string.
+
+    The fast loader drops comments, so the source comment is put back right
+    after the start marker, where 'helm template' emits it. The fast emitter
+    serializes documents of the round-trip loader the same way, unless they
+    hold values only the round-trip emitter can represent, such as tags.
+    """
+    # pylint: disable=import-outside-toplevel
+    from ruamel.yaml.comments import CommentedBase
+    from ruamel.yaml.representer import RepresenterError
+
+    stream = io.StringIO()
+    if emitter == "fast":
+        try:
+            get_fast_emitter().dump(document, stream)
+        except RepresenterError:
+            # The failed dump leaves the emitter in the middle of a stream.
+            del thread_yaml.emitter
+            if not isinstance(document, CommentedBase):
+                raise
+            return serialize_document(document)
+    else:
+        get_fast_yaml()[1].dump(document, stream)
+    text = stream.getvalue()
+    # Drop the '%YAML 1.1' directive, the scalars are quoted as needed anyway.
+    if text.startswith("%YAML"):
+        text = text.split("\n", 1)[1]
+    marker, _, body = text.partition("\n")
+    # Documents such as an empty mapping share the line of the start marker.
+    inline = marker[3:].strip()
+    if inline:
+        body = f"{inline}\n{body}"
+    return f"---\n{source_comment}\n{body}"
+
+
 @handle_exceptions
 def ensure_dirs_exists(file_path: str) -> None:
     """Ensure that the directory of the given path exists."""
@@ -222,6 +912,241 @@ def drop_label_keys(
     return data
 
 
+@handle_exceptions
+def compile_label_keys(label_keys: List[str]) -> FrozenSet[str]:
+    """Validate the label keys once and return them as a set."""
+    if not isinstance(label_keys, list) or not all(
+        isinstance(key, str) for key in label_keys
+    ):
+        raise ValueError("label_keys must be a list of strings.")
+    return frozenset(label_keys)
+
+
+class PathTransform(NamedTuple):
+    """A document transformation applied to the nodes at its key paths."""
+
+    name: str
+    # Key paths from the document root, where '*' matches list items.
+    paths: Tuple[Tuple[str, ...], ...]
+    # Modifies a node found at one of the paths in place.
+    apply: Callable[[Any], None]
+
+
+class TransformNode:
+    """A key of the merged paths of the transforms, with its children."""
+
+    __slots__ = ("children", "transforms")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, TransformNode] = {}
+        # Positions of the transforms applied to the nodes at this path.
+        self.transforms: List[int] = []
+
+
+class FusedTransform:
+    """
+    Apply several path transforms in a single traversal of each document.
+
+    The key paths of all transforms are merged into one tree, so a node shared
+    by several paths, such as 'metadata', is only looked up once, and nothing
+    else of the document is visited. At each node the transforms are applied
+    in order before descending. The time spent by each transform is measured
+    separately when statistics are collected.
+    """
+
+    def __init__(self, transforms: List[PathTransform]) -> None:
+        self.transforms = transforms
+        self.root = TransformNode()
+        for position, transform in enumerate(transforms):
+            for path in transform.paths:
+                node = self.root
+                for key in path:
+                    node = node.children.setdefault(key, TransformNode())
+                node.transforms.append(position)
+
+    def __call__(self, document: Any, stats: Optional["RunStats"] = None) -> Any:
+        """Transform the document in place and return it."""
+        if stats is None or not stats.enabled:
+            self.visit(self.root, document, None)
+            return document
+        timings = [[0.0, 0.0, 0] for _ in self.transforms]
+        self.visit(self.root, document, timings)
+        for transform, (wall, cpu, calls) in zip(self.transforms, timings):
+            if calls:
+                stats.add(f"transform.{transform.name}", wall, cpu, calls)
+        return document
+
+    def visit(
+        self, node: TransformNode, value: Any, timings: Optional[List[List[Any]]]
+    ) -> None:
+        """Apply the transforms of the node to the value, then visit its children."""
+        for position in node.transforms:
+            if timings is None:
+                self.transforms[position].apply(value)
+                continue
+            wall, cpu = time.perf_counter(), time.process_time()
+            self.transforms[position].apply(value)
+            timing = timings[position]
+            timing[0] += time.perf_counter() - wall
+            timing[1] += time.process_time() - cpu
+            timing[2] += 1
+        for key, child in node.children.items():
+            if key == "*":
+                if isinstance(value, list):
+                    for item in value:
+                        self.visit(child, item, timings)
+            elif isinstance(value, dict) and key in value:
+                self.visit(child, value[key], timings)
+
+
+def drop_mapping_keys(node: Any, keys: FrozenSet[str]) -> None:
+    """Remove the keys from the node if it is a mapping."""
+    if isinstance(node, dict):
+        for key in keys.intersection(node):
+            del node[key]
+
+
+def drop_matching_keys(node: Any, patterns: Tuple[str, ...]) -> None:
+    """Remove the keys matching any of the glob patterns from a mapping."""
+    if isinstance(node, dict):
+        for key in [
+            key
+            for key in node
+            if isinstance(key, str)
+            and any(fnmatchcase(key, pattern) for pattern in patterns)
+        ]:
+            del node[key]
+
+
+def set_namespace(document: Any, namespace: str) -> None:
+    """Set the namespace of a namespaced resource, right after its name."""
+    if not isinstance(document, dict) or document.get("kind") in CLUSTER_SCOPED_KINDS:
+        return
+    metadata = document.get("metadata")
+    if not isinstance(metadata, dict):
+        return
+    # Round-trip mappings keep their key order, so keep the usual one.
+    if (
+        "namespace" not in metadata
+        and "name" in metadata
+        and hasattr(metadata, "insert")
+    ):
+        metadata.insert(list(metadata).index("name") + 1, "namespace", namespace)
+    else:
+        metadata["namespace"] = namespace
+
+
+def get_path_transforms(options: "RenderOptions") -> List[PathTransform]:
+    """Return the document transformations requested by the options."""
+    transforms = []
+    if options.namespace:
+        transforms.append(
+            PathTransform(
+                "namespace", ((),), partial(set_namespace, namespace=options.namespace)
+            )
+        )
+    if options.drop_label_keys:
+        if options.drop_labels_mode == "targeted":
+            label_paths = LABEL_PATHS
+            if options.drop_selector_labels:
+                label_paths += SELECTOR_PATHS
+            drop_labels = partial(
+                drop_mapping_keys, keys=compile_label_keys(options.drop_label_keys)
+            )
+            transforms.append(PathTransform("drop-labels", label_paths, drop_labels))
+        else:
+            # Recursive mode walks the whole document from its root.
+            drop_labels = partial(drop_label_keys, label_keys=options.drop_label_keys)
+            transforms.append(PathTransform("drop-labels", ((),), drop_labels))
+    if options.drop_annotations:
+        drop_annotations = partial(
+            drop_matching_keys, patterns=tuple(options.drop_annotations)
+        )
+        transforms.append(
+            PathTransform("drop-annotations", ANNOTATION_PATHS, drop_annotations)
+        )
+    if options.strip_helm_hooks:
+        strip_hooks = partial(drop_mapping_keys, keys=HELM_HOOK_ANNOTATIONS)
+        transforms.append(
+            PathTransform(
+                "strip-helm-hooks", (("metadata", "annotations"),), strip_hooks
+            )
+        )
+    return transforms
+
+
+def parse_filter_patterns(patterns: List[str]) -> List[Tuple[str, str]]:
+    """Split 'FIELD=GLOB' filter patterns; a bare glob matches the source path."""
+    parsed = []
+    for pattern in patterns:
+        field_name, separator, glob = pattern.partition("=")
+        if not separator:
+            field_name, glob = "source", pattern
+        if field_name not in FILTER_FIELDS or not glob:
+            raise ValueError(
+                f"Invalid filter '{pattern}', expected a source glob or"
+                f" FIELD=GLOB with FIELD one of: {', '.join(FILTER_FIELDS)}."
+            )
+        parsed.append((field_name, glob))
+    return parsed
+
+
+@handle_exceptions
+def get_document_filter(
+    include: Optional[List[str]], exclude: Optional[List[str]]
+) -> Optional[Callable[[str, str], bool]]:
+    """
+    Return the predicate telling whether a raw document passes the filters, if any.
+
+    A document is kept if it matches any include pattern, when there are some,
+    and no exclude pattern. The predicate takes the source comment and the raw
+    document, which is only parsed when its header cannot be scanned.
+    """
+    includes = parse_filter_patterns(include or [])
+    excludes = parse_filter_patterns(exclude or [])
+    if not includes and not excludes:
+        return None
+    header_fields = {name for name, _ in includes + excludes} - {"source"}
+
+    def document_filter(source_comment: str, raw_document: str) -> bool:
+        values = {"source": get_template_source_path(source_comment)}
+        if header_fields:
+            values.update(read_document_header(raw_document))
+
+        def matches(patterns: List[Tuple[str, str]]) -> bool:
+            return any(
+                values[name] is not None and fnmatchcase(values[name], glob)
+                for name, glob in patterns
+            )
+
+        return (not includes or matches(includes)) and not matches(excludes)
+
+    return document_filter
+
+
+def get_document_header(document: Any) -> Dict[str, Optional[str]]:
+    """Return the header of a parsed document, like 'scan_document_header'."""
+    header: Dict[str, Optional[str]] = dict.fromkeys(HEADER_KEYS)
+    if isinstance(document, dict):
+        metadata = document.get("metadata")
+        if not isinstance(metadata, dict):
+            metadata = {}
+        for key in HEADER_KEYS:
+            value = (
+                metadata.get(key) if key in METADATA_HEADER_KEYS else document.get(key)
+            )
+            header[key] = None if value is None else str(value)
+    return header
+
+
+def read_document_header(raw_document: str) -> Dict[str, Optional[str]]:
+    """Return the header of a raw document, only parsing it if it cannot be scanned."""
+    header = scan_document_header(raw_document)
+    if header is None:
+        header = get_document_header(load_fast_document(raw_document))
+    return header
+
+
 @handle_exceptions
 def collect_yaml_files(directory: str) -> List[str]:
     """Collect all the YAML files in the directory and its subdirectories."""
@@ -247,8 +1172,11 @@ def is_valid_yaml(file: str) -> bool:
 
 
 @handle_exceptions
-def create_kustom_data(yaml_files: List[str]) -> CommentedMap:
+def create_kustom_data(yaml_files: List[str]) -> "CommentedMap":
     """Generate the kustomization data."""
+    # pylint: disable=import-outside-toplevel
+    from ruamel.yaml.comments import CommentedMap
+
     logging.debug("Generating YAML data.")
     kustom_data = CommentedMap()
     kustom_data["apiVersion"] = "kustomize.config.k8s.io/v1beta1"
@@ -261,97 +1189,2632 @@ def create_kustom_data(yaml_files: List[str]) -> CommentedMap:
 
 
 @handle_exceptions
-def save_kustom_data(directory: str, kustom_data: CommentedMap) -> None:
+def save_kustom_data(directory: str, kustom_data: "CommentedMap") -> None:
     """Save the kustomization data to a file."""
     logging.debug("Storing data to file.")
     file_path = os.path.join(directory, "kustomization.yaml")
     with open(file_path, encoding="utf-8", mode="w") as f:
-        yaml.dump(kustom_data, f)
+        get_yaml().dump(kustom_data, f)
         logging.info(f"Generated kustomization.yaml file {f.name}")
 
 
 @handle_exceptions
-def generate_kustomize_file(directory: str) -> None:
+def generate_kustomize_file(
+    directory: str, yaml_files: Optional[Iterable[str]] = None
+) -> None:
     """
     Generate a single kustomization.yaml file in the root directory that references
     all the .yaml and .yml files in the directory and its subdirectories.
+
+    When the rendered files are known, they are used instead of scanning the
+    directory, so files from older runs or other tools are not referenced.
     """
-    yaml_files = collect_yaml_files(directory)
+    if yaml_files is None:
+        yaml_files = collect_yaml_files(directory)
+    else:
+        yaml_files = sorted(
+            path for path in set(yaml_files) if is_valid_yaml(posixpath.basename(path))
+        )
     if not yaml_files:
         return
     kustom_data = create_kustom_data(yaml_files)
     save_kustom_data(directory, kustom_data)
 
 
-def get_arguments() -> argparse.Namespace:
-    """Parses and returns command line arguments."""
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "-d",
-        "--dir",
-        action="store",
-        help="The directory where files will be saved.",
-        required=True,
-    )
-    parser.add_argument(
-        "--drop-label-keys",
-        nargs="*",
-        action="store",
-        help="List of metadata label keys to remove.",
-        required=False,
-    )
-    parser.add_argument(
-        "-k",
-        "--kustomize-generate",
-        action="store_true",
-        help="Should we generate a kustomize file?",
-        required=False,
-    )
-    parser.add_argument(
-        "--debug",
-        action="store_true",
-        help="Should we run the script in debug mode?",
-        required=False,
-    )
-    return parser.parse_args()
+@handle_exceptions
+def group_kustomize_resources(yaml_files: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Group the files by folder into per-folder kustomization resources.
 
+    Each folder lists its own files and its direct subfolders, which in turn
+    get their own kustomization.
+    """
+    resources: Dict[str, Set[str]] = {"": set()}
+    for path in yaml_files:
+        folder, name = posixpath.split(path)
+        if not is_valid_yaml(name):
+            continue
+        resources.setdefault(folder, set()).add(name)
+        # Reference the folder from all of its parents up to the root.
+        while folder:
+            parent, child = posixpath.split(folder)
+            siblings = resources.setdefault(parent, set())
+            if child in siblings:
+                break
+            siblings.add(child)
+            folder = parent
+    return {folder: sorted(entries) for folder, entries in resources.items()}
 
-def main() -> None:
-    """Main function"""
-    args = get_arguments()
-    logging.basicConfig(
-        level=logging.DEBUG if args.debug else logging.INFO,
-        format="%(levelname)8s - %(message)s",
+
+@handle_exceptions
+def generate_kustomize_files(directory: str, yaml_files: Iterable[str]) -> None:
+    """Generate a kustomization.yaml file in every folder of the rendered tree."""
+    for folder, resources in sorted(group_kustomize_resources(yaml_files).items()):
+        if not resources:
+            continue
+        kustom_data = create_kustom_data(resources)
+        save_kustom_data(
+            os.path.join(directory, folder) if folder else directory, kustom_data
+        )
+
+
+@handle_exceptions
+def render_kustomize_files(yaml_files: Iterable[str], split: bool) -> Dict[str, str]:
+    """
+    Return the text of the kustomization.yaml files of the rendered paths.
+
+    The files are keyed by their relative path: a single one at the root, or
+    one per folder when split, just like the files generated on disk.
+    """
+    if split:
+        groups = group_kustomize_resources(yaml_files)
+    else:
+        groups = {
+            "": sorted(
+                path
+                for path in set(yaml_files)
+                if is_valid_yaml(posixpath.basename(path))
+            )
+        }
+    kustomize_files = {}
+    for folder, resources in sorted(groups.items()):
+        if not resources:
+            continue
+        stream = io.StringIO()
+        get_yaml().dump(create_kustom_data(resources), stream)
+        kustomize_files[posixpath.join(folder, "kustomization.yaml")] = (
+            stream.getvalue()
+        )
+    return kustomize_files
+
+
+def is_path_in_tree(directory: str, relative_path: str) -> bool:
+    """Check whether the relative path resolves to a file inside the directory."""
+    if os.path.isabs(relative_path):
+        return False
+    real_dir = os.path.realpath(directory)
+    real_path = os.path.realpath(os.path.join(directory, relative_path))
+    return os.path.commonpath([real_dir, real_path]) == real_dir
+
+
+@handle_exceptions
+def load_output_manifest(directory: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the files recorded by the previous run in the directory.
+
+    Entries pointing outside of the directory are dropped, as the manifest is
+    usually committed along with the tree and cannot be trusted blindly.
+    """
+    file_path = os.path.join(directory, MANIFEST_FILE_NAME)
+    if not os.path.exists(file_path):
+        return {}
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            files = json.load(f)["files"]
+    except (ValueError, KeyError, TypeError) as err:
+        logging.warning("Ignoring malformed manifest %s: %s", file_path, err)
+        return {}
+    if not isinstance(files, dict):
+        logging.warning("Ignoring malformed manifest %s.", file_path)
+        return {}
+    for relative_path in list(files):
+        if not is_path_in_tree(directory, relative_path):
+            logging.warning(
+                "Ignoring manifest entry %s outside of %s.", relative_path, directory
+            )
+            del files[relative_path]
+    return files
+
+
+@handle_exceptions
+def save_output_manifest(directory: str, files: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Record the files written by the current run in the directory.
+
+    The manifest is left untouched if it already holds the same records, as
+    happens when no file changed, so it does not wake up watchers either.
+    """
+    file_path = os.path.join(directory, MANIFEST_FILE_NAME)
+    text = json.dumps({"version": 1, "files": files}, indent=2, sort_keys=True)
+    data = f"{text}\n".encode("utf-8")
+    if is_file_unchanged(file_path, data, get_sha256(data), None):
+        return
+    save_bytes_to_file(file_path, data)
+
+
+@handle_exceptions
+def get_sha256(data: bytes) -> str:
+    """Return the hex SHA-256 digest of the data."""
+    # pylint: disable=import-outside-toplevel
+    import hashlib
+
+    return hashlib.sha256(data).hexdigest()
+
+
+@handle_exceptions
+def is_file_unchanged(
+    file_path: str, data: bytes, digest: str, record: Optional[Dict[str, Any]]
+) -> bool:
+    """
+    Check whether the file on disk already holds the given data.
+
+    A manifest record matching the file size and mtime is trusted without
+    reading the file; otherwise the file content is hashed and compared.
+    """
+    try:
+        file_stat = os.stat(file_path)
+        if file_stat.st_size != len(data):
+            return False
+        if (
+            record
+            and record.get("sha256") == digest
+            and record.get("mtime_ns") == file_stat.st_mtime_ns
+        ):
+            return True
+        with open(file_path, mode="rb") as f:
+            return get_sha256(f.read()) == digest
+    except FileNotFoundError:
+        return False
+    except OSError as err:
+        raise RuntimeError(
+            f"Failed to compare data with '{file_path}'." f" IOError: {str(err)}"
+        ) from err
+
+
+class OutputWriter:
+    """
+    Write rendered documents into the target directory.
+
+    Directories are created once and remembered, and each file is written
+    from an in-memory buffer with a single write call. In incremental mode
+    files that already hold the rendered content are left untouched. With
+    pruning, files recorded by the previous run that the current run no longer
+    emits are removed. Both rely on a manifest kept in the target directory.
+    In atomic mode the tree is staged next to the target directory and
+    swapped in with a rename once complete, along with links to the files of
+    the target directory the run did not render.
+
+    Documents rendered to the same path are grouped into one multi-document
+    file. The documents of a path are held while they follow each other and
+    written together once a document of another path arrives, so a file is
+    opened and written once. Only a path the stream comes back to later is
+    read back and written again with its further documents by 'flush'. Paths
+    the manifest records as multi-document are held back until then, so an
+    unchanged file is never touched.
+
+    With writer threads, files are written in the background from bounded
+    queues while the caller renders further documents. A path is always
+    written by the same thread, so its writes happen in input order. The
+    first write error is raised by the next 'write' or by 'flush'.
+    """
+
+    def __init__(
+        self,
+        target_dir: str,
+        incremental: bool = False,
+        prune: bool = False,
+        atomic: bool = False,
+        writers: int = 0,
+    ) -> None:
+        # pylint: disable=import-outside-toplevel
+        import queue
+
+        self.target_dir = target_dir
+        # Pruning needs the manifest, so it implies incremental mode.
+        self.incremental = incremental or prune
+        self.prune = prune
+        self.staging_dir = create_staging_dir(target_dir) if atomic else None
+        # Files are written to the staging directory until it is swapped in.
+        self.output_dir = self.staging_dir or target_dir
+        self.previous_files = (
+            load_output_manifest(target_dir) if self.incremental else {}
+        )
+        self.current_files: Dict[str, Dict[str, Any]] = {}
+        # Paths rendered by this run, relative to the target directory.
+        self.rendered_paths: Set[str] = set()
+        self.created_dirs: Set[str] = set()
+        self.document_counts: Dict[str, int] = {}
+        # Documents held back to be grouped into their files by 'flush'.
+        self.grouped_documents: Dict[str, List[str]] = {}
+        # Grouped paths whose first document has not been written either.
+        self.deferred_paths: Set[str] = set()
+        # Documents of the path last written, saved once another path comes.
+        self.pending_path: Optional[str] = None
+        self.pending_texts: List[str] = []
+        self.pending_index: Optional[int] = None
+        # Whether each file was written, as opposed to found unchanged.
+        self.outcomes: Dict[str, bool] = {}
+        self.pruned = 0
+        self.pruned_done = False
+        # Guards the outcomes and the manifest records shared with writers.
+        self.lock = threading.Lock()
+        self.write_error: Optional[HelmYAMLizerError] = None
+        self.write_queues: List["queue.Queue"] = []
+        self.write_threads: List[threading.Thread] = []
+        for _ in range(writers):
+            write_queue: "queue.Queue" = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+            # Writers inherit the context, and with it the error handling mode.
+            thread = threading.Thread(
+                target=copy_context().run,
+                args=(self.drain_queue, write_queue),
+                daemon=True,
+            )
+            thread.start()
+            self.write_queues.append(write_queue)
+            self.write_threads.append(thread)
+
+    def __enter__(self) -> "OutputWriter":
+        return self
+
+    @property
+    def written(self) -> int:
+        """Number of files written by this run."""
+        return sum(self.outcomes.values())
+
+    @property
+    def unchanged(self) -> int:
+        """Number of files left untouched as their content did not change."""
+        return len(self.outcomes) - self.written
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            try:
+                self.close()
+            except HelmYAMLizerError:
+                self.abort()
+                raise
+        else:
+            self.abort()
+
+    def prepare(self, relative_path: str) -> str:
+        """Return the output path for the file, creating its folder once."""
+        file_path = os.path.join(self.output_dir, relative_path)
+        folder_path = os.path.dirname(file_path)
+        if folder_path not in self.created_dirs:
+            ensure_dirs_exists(file_path)
+            self.created_dirs.add(folder_path)
+        return file_path
+
+    def write(self, relative_path: str, text: str, index: Optional[int] = None) -> None:
+        """
+        Write the text to the path relative to the target directory.
+
+        The index of the document, if given, is reported by write errors.
+        """
+        self.prepare(relative_path)
+        self.rendered_paths.add(relative_path)
+        count = self.document_counts.get(relative_path, 0) + 1
+        self.document_counts[relative_path] = count
+        if relative_path == self.pending_path:
+            self.pending_texts.append(text)
+            return
+        self.save_pending()
+        previous_count = self.previous_files.get(relative_path, {}).get("documents", 1)
+        if count > 1 or previous_count > 1:
+            logging.debug("Grouping document into %s.", relative_path)
+            self.grouped_documents.setdefault(relative_path, []).append(text)
+            if count == 1:
+                self.deferred_paths.add(relative_path)
+            return
+        self.pending_path, self.pending_texts = relative_path, [text]
+        self.pending_index = index
+
+    def save_pending(self) -> None:
+        """Save the documents held for the path last written, if any."""
+        if self.pending_path is None:
+            return
+        relative_path, index = self.pending_path, self.pending_index
+        data = join_documents(self.pending_texts).encode("utf-8")
+        self.pending_path, self.pending_texts, self.pending_index = None, [], None
+        file_path = self.prepare(relative_path)
+        if not self.write_queues:
+            try:
+                self.save(relative_path, file_path, data)
+            # Saved while writing a later document, so report the held one.
+            except HelmYAMLizerError as err:
+                if index is None or isinstance(err, DocumentError):
+                    raise
+                raise DocumentError(index, str(err)) from err
+            return
+        self.raise_write_error()
+        write_queue = self.write_queues[hash(relative_path) % len(self.write_queues)]
+        # Blocks while the queue is full, which caps the memory held by it.
+        write_queue.put((relative_path, file_path, data, index))
+
+    def save(self, relative_path: str, file_path: str, data: bytes) -> None:
+        """Save the data unless incremental mode finds the file unchanged."""
+        if not self.incremental:
+            save_bytes_to_file(file_path, data)
+            with self.lock:
+                self.outcomes[relative_path] = True
+            return
+        digest = get_sha256(data)
+        # Compare against the live tree, which differs from the output
+        # directory when staging.
+        live_path = os.path.join(self.target_dir, relative_path)
+        record = self.previous_files.get(relative_path)
+        if is_file_unchanged(live_path, data, digest, record):
+            logging.debug("File %s is unchanged.", live_path)
+            if live_path != file_path:
+                link_or_copy_file(live_path, file_path)
+            unchanged = True
+        else:
+            save_bytes_to_file(file_path, data)
+            unchanged = False
+        with self.lock:
+            self.outcomes[relative_path] = not unchanged
+            self.current_files[relative_path] = {
+                "sha256": digest,
+                "mtime_ns": os.stat(file_path).st_mtime_ns,
+                "documents": self.document_counts.get(relative_path, 1),
+            }
+
+    def drain_queue(self, write_queue: "queue.Queue") -> None:
+        """Save the queued files until a None item, stopping at the first error."""
+        while True:
+            item = write_queue.get()
+            if item is None:
+                return
+            # Keep draining after an error so the caller is never blocked.
+            if self.write_error is not None:
+                continue
+            relative_path, file_path, data, index = item
+            try:
+                self.save(relative_path, file_path, data)
+            # Any error must be recorded, as a dead writer would block the caller.
+            # pylint: disable=broad-except
+            except Exception as err:
+                if index is not None:
+                    error: HelmYAMLizerError = DocumentError(index, str(err))
+                elif isinstance(err, HelmYAMLizerError):
+                    error = err
+                else:
+                    error = RenderError("save", str(err))
+                with self.lock:
+                    if self.write_error is None:
+                        self.write_error = error
+
+    def raise_write_error(self) -> None:
+        """Raise the first error that occurred in a writer thread."""
+        if self.write_error is not None:
+            raise self.write_error
+
+    def stop_writers(self) -> None:
+        """Wait for the writer threads to save all queued files."""
+        for write_queue in self.write_queues:
+            write_queue.put(None)
+        for thread in self.write_threads:
+            thread.join()
+        self.write_queues, self.write_threads = [], []
+
+    def flush(self) -> None:
+        """Finish all pending writes, including the grouped files."""
+        self.save_pending()
+        self.stop_writers()
+        self.raise_write_error()
+        for relative_path, texts in self.grouped_documents.items():
+            file_path = self.prepare(relative_path)
+            if relative_path not in self.deferred_paths:
+                # Prepend the first document, which was written on its own.
+                with open(file_path, encoding="utf-8", newline="") as f:
+                    texts = [f.read(), *texts]
+                # A staged file may be a link into the live tree.
+                if self.staging_dir:
+                    os.remove(file_path)
+            data = join_documents(texts).encode("utf-8")
+            self.save(relative_path, file_path, data)
+        self.grouped_documents, self.deferred_paths = {}, set()
+
+    def write_kustomize_files(self, split: bool) -> None:
+        """Generate kustomization.yaml files referencing the rendered files."""
+        kustomize_files = render_kustomize_files(self.rendered_paths, split)
+        for relative_path, text in kustomize_files.items():
+            # Saved like the rendered files, so unchanged ones are not touched.
+            file_path = self.prepare(relative_path)
+            self.save(relative_path, file_path, text.encode("utf-8"))
+            logging.info("Generated kustomization.yaml file %s", file_path)
+
+    def prune_stale_files(self) -> None:
+        """Remove files of the previous run that were not written this time."""
+        self.flush()
+        if not self.prune or self.pruned_done:
+            return
+        self.pruned_done = True
+        for relative_path in sorted(set(self.previous_files) - set(self.current_files)):
+            # Never touch anything outside of the target directory.
+            if not is_path_in_tree(self.target_dir, relative_path):
+                continue
+            # A staged tree only ever holds the current files.
+            if self.staging_dir:
+                self.pruned += 1
+                continue
+            file_path = os.path.join(self.target_dir, relative_path)
+            if not os.path.isfile(file_path):
+                continue
+            os.remove(file_path)
+            logging.info("Pruned stale file %s", file_path)
+            self.pruned += 1
+            remove_empty_dirs(self.target_dir, os.path.dirname(file_path))
+
+    def close(self) -> None:
+        """Prune stale files, store the manifest and swap in a staged tree."""
+        self.prune_stale_files()
+        if self.incremental:
+            save_output_manifest(self.output_dir, self.current_files)
+        if self.staging_dir:
+            # Only pruned files are left out, as they would be without staging.
+            pruned_paths = set(self.previous_files) - set(self.current_files)
+            carried = carry_over_files(
+                self.target_dir,
+                self.staging_dir,
+                pruned_paths if self.prune else set(),
+            )
+            logging.debug("Carried over %s files not rendered by this run.", carried)
+            swap_staged_tree(self.staging_dir, self.target_dir)
+            self.staging_dir = None
+        logging.info(
+            "Files written: %s, unchanged: %s, pruned: %s",
+            self.written,
+            self.unchanged,
+            self.pruned,
+        )
+
+    def abort(self) -> None:
+        """Discard a staged tree, leaving the target directory untouched."""
+        # Wait for the writers, so nothing is written into the removed tree.
+        self.stop_writers()
+        if self.staging_dir:
+            # pylint: disable=import-outside-toplevel
+            import shutil
+
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            self.staging_dir = None
+
+
+class ArchiveWriter:
+    """
+    Write rendered documents into a single tar archive instead of a folder.
+
+    The compression follows the extension of the archive. Files are kept in
+    memory, which groups the documents sharing a path, and written sorted by
+    path once the stream ends, into a temporary file renamed into place.
+    Every member has the same mode, owner and mtime ('SOURCE_DATE_EPOCH' or
+    zero) and the gzip header carries no name or time, so the same documents
+    always produce the same archive bytes.
+    """
+
+    def __init__(self, archive_path: str) -> None:
+        self.archive_path = archive_path
+        self.compression = get_archive_compression(archive_path)
+        self.files: Dict[str, List[str]] = {}
+        self.kustomize_files: Dict[str, str] = {}
+        # Paths rendered by this run, relative to the archive root.
+        self.rendered_paths: Set[str] = set()
+        self.written = 0
+        # Archives are always written anew.
+        self.unchanged = 0
+        self.pruned = 0
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        # Nothing is written before closing, so there is nothing to abort.
+        if exc_type is None:
+            self.close()
+
+    def write(self, relative_path: str, text: str, index: Optional[int] = None) -> None:
+        """Add the text to the file at the path relative to the archive root."""
+        del index  # Nothing is written before closing.
+        self.rendered_paths.add(relative_path)
+        self.files.setdefault(relative_path, []).append(text)
+
+    def write_kustomize_files(self, split: bool) -> None:
+        """Add kustomization.yaml files referencing the rendered files."""
+        self.kustomize_files = render_kustomize_files(self.rendered_paths, split)
+
+    def flush(self) -> None:
+        """Nothing to wait for, as files are only written when closing."""
+
+    def prune_stale_files(self) -> None:
+        """Nothing to prune, as the archive is always written anew."""
+
+    def close(self) -> None:
+        """Write the archive and move it into place."""
+        members = {
+            relative_path: join_documents(texts).encode("utf-8")
+            for relative_path, texts in self.files.items()
+        }
+        for relative_path, text in self.kustomize_files.items():
+            members[relative_path] = text.encode("utf-8")
+        save_archive(self.archive_path, self.compression, members)
+        self.written = len(members)
+        logging.info("Files archived: %s into %s", self.written, self.archive_path)
+
+
+class CheckWriter:
+    """
+    Compare rendered documents with the files of the target directory.
+
+    Nothing is ever written. Files are kept in memory, which groups the
+    documents sharing a path, and compared in parallel threads once the
+    stream ends: by size first, then by the digest the manifest recorded if
+    the file still has the recorded mtime, or else by hashing the file. YAML
+    files of the directory the render does not produce are reported as extra.
+    """
+
+    def __init__(self, target_dir: str) -> None:
+        self.target_dir = target_dir
+        self.previous_files = load_output_manifest(target_dir)
+        self.files: Dict[str, List[str]] = {}
+        self.kustomize_files: Dict[str, str] = {}
+        # Paths rendered by this run, relative to the target directory.
+        self.rendered_paths: Set[str] = set()
+        self.missing: List[str] = []
+        self.changed: List[str] = []
+        self.extra: List[str] = []
+        # Nothing is written, so matching files count as unchanged.
+        self.written = 0
+        self.unchanged = 0
+        self.pruned = 0
+
+    def __enter__(self) -> "CheckWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.close()
+
+    def write(self, relative_path: str, text: str, index: Optional[int] = None) -> None:
+        """Add the text to the file expected at the path."""
+        del index  # Nothing is compared before closing.
+        self.rendered_paths.add(relative_path)
+        self.files.setdefault(relative_path, []).append(text)
+
+    def write_kustomize_files(self, split: bool) -> None:
+        """Expect kustomization.yaml files referencing the rendered files."""
+        self.kustomize_files = render_kustomize_files(self.rendered_paths, split)
+
+    def flush(self) -> None:
+        """Nothing to wait for, as files are only compared when closing."""
+
+    def prune_stale_files(self) -> None:
+        """Nothing to prune, as stale files are reported as extra instead."""
+
+    def compare(self, relative_path: str, text: str) -> Optional[str]:
+        """Return whether the file is 'missing' or 'changed', or None if it matches."""
+        file_path = os.path.join(self.target_dir, relative_path)
+        if not os.path.isfile(file_path):
+            return "missing"
+        data = text.encode("utf-8")
+        digest = get_sha256(data)
+        record = self.previous_files.get(relative_path)
+        if is_file_unchanged(file_path, data, digest, record):
+            return None
+        return "changed"
+
+    def close(self) -> None:
+        """Compare the files in parallel and report the differences."""
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ThreadPoolExecutor
+
+        expected = {
+            relative_path: join_documents(texts)
+            for relative_path, texts in self.files.items()
+        }
+        expected.update(self.kustomize_files)
+        with ThreadPoolExecutor() as executor:
+            # Threads run in a copy of the context, and its error handling mode.
+            futures = {
+                relative_path: executor.submit(
+                    copy_context().run, self.compare, relative_path, text
+                )
+                for relative_path, text in expected.items()
+            }
+            outcomes = {path: future.result() for path, future in futures.items()}
+        for relative_path, outcome in sorted(outcomes.items()):
+            if outcome == "missing":
+                self.missing.append(relative_path)
+            elif outcome == "changed":
+                self.changed.append(relative_path)
+            else:
+                self.unchanged += 1
+        self.extra = sorted(set(iter_tree_yaml_files(self.target_dir)) - set(expected))
+        for label, paths in (
+            ("Missing", self.missing),
+            ("Changed", self.changed),
+            ("Extra", self.extra),
+        ):
+            for relative_path in paths:
+                logging.warning("%s file: %s", label, relative_path)
+        logging.info(
+            "Files matching: %s, changed: %s, missing: %s, extra: %s",
+            self.unchanged,
+            len(self.changed),
+            len(self.missing),
+            len(self.extra),
+        )
+
+
+def iter_tree_yaml_files(directory: str) -> Iterator[str]:
+    """Yield the paths of all YAML files under the directory, relative to it."""
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.endswith((".yaml", ".yml")):
+                relative_path = os.path.relpath(os.path.join(root, file), directory)
+                yield relative_path.replace(os.sep, "/")
+
+
+def get_archive_compression(archive_path: str) -> str:
+    """Return the compression of the tar archive, judging by its extension."""
+    for extension, compression in ARCHIVE_EXTENSIONS.items():
+        if archive_path.endswith(extension):
+            return compression
+    raise ValueError(
+        f"Unsupported archive '{archive_path}', expected one of:"
+        f" {', '.join(ARCHIVE_EXTENSIONS)}."
+    )
+
+
+@handle_exceptions
+def save_archive(
+    archive_path: str, compression: str, members: Dict[str, bytes]
+) -> None:
+    """Save the members, sorted by path, into a reproducible tar archive."""
+    # pylint: disable=import-outside-toplevel
+    import gzip
+    import lzma
+    import tarfile
+    import tempfile
+
+    mtime = int(os.environ.get("SOURCE_DATE_EPOCH", 0))
+    folder_path = os.path.dirname(os.path.abspath(archive_path))
+    os.makedirs(folder_path, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(archive_path)}.", dir=folder_path
+    )
+    try:
+        with os.fdopen(fd, "wb") as archive_file:
+            stream: BinaryIO = archive_file
+            if compression == "gz":
+                # pylint: disable=consider-using-with
+                stream = gzip.GzipFile(
+                    filename="", mode="wb", fileobj=archive_file, mtime=mtime
+                )
+            elif compression == "xz":
+                # pylint: disable=consider-using-with
+                stream = lzma.LZMAFile(archive_file, mode="wb")
+            with stream, tarfile.open(
+                fileobj=stream, mode="w|", format=tarfile.PAX_FORMAT
+            ) as archive:
+                for relative_path, data in sorted(members.items()):
+                    info = tarfile.TarInfo(relative_path)
+                    info.size = len(data)
+                    info.mtime = mtime
+                    info.mode = 0o644
+                    archive.addfile(info, io.BytesIO(data))
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, archive_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def join_documents(texts: List[str]) -> str:
+    """Join document texts into a single multi-document YAML text."""
+    parts: List[str] = []
+    for text in texts:
+        if parts:
+            if not parts[-1].endswith("\n"):
+                parts.append("\n")
+            # Only the first document of a stream may lack its start marker.
+            if not DOCUMENT_START_PATTERN.match(text):
+                parts.append("---\n")
+        parts.append(text)
+    return "".join(parts)
+
+
+@handle_exceptions
+def save_bytes_to_file(file_path: str, data: bytes) -> None:
+    """Save the given bytes to the specified file path with a single write."""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    try:
+        fd = os.open(file_path, flags, 0o666)
+        try:
+            view = memoryview(data)
+            # A single call writes the whole buffer for regular files; loop
+            # only to guard against short writes.
+            while view:
+                view = view[os.write(fd, view) :]
+        finally:
+            os.close(fd)
+    except OSError as err:
+        raise RuntimeError(
+            f"Failed to save data to '{file_path}'." f" IOError: {str(err)}"
+        ) from err
+
+
+@handle_exceptions
+def link_or_copy_file(source_path: str, target_path: str) -> None:
+    """Hard link the file, falling back to a copy that keeps the mtime."""
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        # pylint: disable=import-outside-toplevel
+        import shutil
+
+        shutil.copy2(source_path, target_path)
+
+
+@handle_exceptions
+def create_staging_dir(target_dir: str) -> str:
+    """
+    Create a staging directory on the same filesystem as the target.
+
+    The staging directory takes the mode of the target directory, or the one
+    'os.makedirs' would give it, rather than the private mode of a temporary
+    directory, so readers keep their access once it is swapped in.
+    """
+    # pylint: disable=import-outside-toplevel
+    import tempfile
+
+    target_dir = os.path.abspath(target_dir)
+    parent_dir = os.path.dirname(target_dir)
+    os.makedirs(parent_dir, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(os.stat(target_dir).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o777 & ~umask
+    staging_dir = tempfile.mkdtemp(
+        prefix=f".{os.path.basename(target_dir)}.", dir=parent_dir
+    )
+    os.chmod(staging_dir, mode)
+    return staging_dir
+
+
+@handle_exceptions
+def carry_over_files(target_dir: str, staging_dir: str, skipped: Set[str]) -> int:
+    """
+    Link the files of the target tree the staged one lacks into the latter.
+
+    Files the run did not render, such as notes or a '.git' folder kept next
+    to the rendered ones, would otherwise be lost with the previous tree, as
+    they are in no other mode. The skipped paths, relative to the target
+    directory, are left out. Returns the number of files carried over.
+    """
+    carried = 0
+    for folder_path, dir_names, file_names in os.walk(target_dir):
+        staged_folder = os.path.join(
+            staging_dir, os.path.relpath(folder_path, target_dir)
+        )
+        for name in list(dir_names):
+            source_path = os.path.join(folder_path, name)
+            staged_path = os.path.join(staged_folder, name)
+            if os.path.islink(source_path):
+                # Links to folders are carried over as links.
+                dir_names.remove(name)
+                file_names.append(name)
+            elif not os.path.lexists(staged_path):
+                os.mkdir(staged_path)
+                os.chmod(staged_path, stat.S_IMODE(os.stat(source_path).st_mode))
+            elif not os.path.isdir(staged_path):
+                # The run rendered a file in place of the folder.
+                dir_names.remove(name)
+        for name in file_names:
+            source_path = os.path.join(folder_path, name)
+            staged_path = os.path.join(staged_folder, name)
+            relative_path = os.path.relpath(source_path, target_dir)
+            if relative_path.replace(os.sep, "/") in skipped or os.path.lexists(
+                staged_path
+            ):
+                continue
+            if os.path.islink(source_path):
+                os.symlink(os.readlink(source_path), staged_path)
+            else:
+                link_or_copy_file(source_path, staged_path)
+            carried += 1
+    return carried
+
+
+def exchange_paths(first_path: str, second_path: str) -> bool:
+    """
+    Atomically exchange two paths with 'renameat2(RENAME_EXCHANGE)'.
+
+    Returns False where the C library, the kernel or the filesystem does not
+    support it, as on other platforms than Linux.
+    """
+    # pylint: disable=import-outside-toplevel
+    import ctypes
+    import errno
+
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (AttributeError, OSError):
+        return False
+    renameat2.argtypes = [
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_uint,
+    ]
+    at_fdcwd, rename_exchange = -100, 2
+    result = renameat2(
+        at_fdcwd,
+        os.fsencode(first_path),
+        at_fdcwd,
+        os.fsencode(second_path),
+        rename_exchange,
+    )
+    if result == 0:
+        return True
+    error = ctypes.get_errno()
+    if error in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+        return False
+    raise OSError(error, os.strerror(error), second_path)
+
+
+@handle_exceptions
+def swap_staged_tree(staging_dir: str, target_dir: str) -> None:
+    """
+    Replace the target directory with the staged one.
+
+    Where the two directories can be exchanged atomically, readers see either
+    the old or the new tree. Elsewhere the old tree is renamed away before the
+    new one takes its place, so the target briefly does not exist; it is never
+    partially written either way.
+    """
+    # pylint: disable=import-outside-toplevel
+    import shutil
+
+    if not os.path.exists(target_dir):
+        os.rename(staging_dir, target_dir)
+        return
+    if exchange_paths(staging_dir, target_dir):
+        # The staging directory now holds the previous tree.
+        shutil.rmtree(staging_dir)
+        logging.debug("Exchanged staged tree %s with %s", staging_dir, target_dir)
+        return
+    backup_dir = f"{staging_dir}.old"
+    os.rename(target_dir, backup_dir)
+    try:
+        os.rename(staging_dir, target_dir)
+    except OSError:
+        # Put the previous tree back before giving up.
+        os.rename(backup_dir, target_dir)
+        raise
+    shutil.rmtree(backup_dir)
+    logging.debug("Swapped staged tree %s into %s", staging_dir, target_dir)
+
+
+@handle_exceptions
+def remove_empty_dirs(root_dir: str, folder_path: str) -> None:
+    """Remove the folder and its parents up to the root while they are empty."""
+    root_dir = os.path.abspath(root_dir)
+    folder_path = os.path.abspath(folder_path)
+    while folder_path != root_dir and folder_path.startswith(root_dir + os.sep):
+        if os.listdir(folder_path):
+            return
+        os.rmdir(folder_path)
+        folder_path = os.path.dirname(folder_path)
+
+
+class RenderCache:
+    """
+    On-disk cache of rendered documents, shared across runs.
+
+    Entries are keyed by a hash of the raw document text and a namespace
+    covering everything else that affects the output, and hold the source
+    comment, the flattened path and the serialized text of the document, so
+    hits skip parsing altogether. Entries are touched when used, and the
+    least recently used ones are evicted on close once the cache exceeds its
+    size cap. Entries are written atomically, so several runs may share the
+    cache directory.
+    """
+
+    def __init__(self, cache_dir: str, namespace: str, max_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.namespace = namespace.encode("utf-8")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, raw_document: str) -> str:
+        """Return the cache key of the raw document."""
+        # pylint: disable=import-outside-toplevel
+        import hashlib
+
+        digest = hashlib.sha256(self.namespace)
+        digest.update(b"\0")
+        digest.update(raw_document.encode("utf-8"))
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        """Return the path of the entry, fanned out over subdirectories."""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(
+        self, key: str
+    ) -> Optional[Tuple[Optional[str], Optional[str], Optional[str]]]:
+        """Return the source comment, path and text of a cached document."""
+        entry_path = self.entry_path(key)
+        try:
+            with open(entry_path, encoding="utf-8") as f:
+                entry = json.load(f)
+            result = entry["source"], entry["path"], entry["text"]
+            if not all(value is None or isinstance(value, str) for value in result):
+                raise TypeError(f"Unexpected value in cache entry {entry_path}")
+            # Mark the entry as recently used.
+            os.utime(entry_path)
+        # Entries evicted by a concurrent run or left corrupt are misses.
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(
+        self,
+        key: str,
+        source_comment: Optional[str],
+        path: Optional[str],
+        text: Optional[str],
+    ) -> None:
+        """Store a rendered document, ignoring failures to do so."""
+        # pylint: disable=import-outside-toplevel
+        import tempfile
+
+        entry_path = self.entry_path(key)
+        data = json.dumps({"source": source_comment, "path": path, "text": text})
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_path, entry_path)
+        except OSError as err:
+            logging.debug("Failed to cache %s: %s", entry_path, err)
+
+    def evict(self) -> None:
+        """Remove the least recently used entries beyond the size cap."""
+        entries = []
+        total = 0
+        for folder in os.scandir(self.cache_dir):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                try:
+                    entry_stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry_stat.st_mtime_ns, entry_stat.st_size, entry.path))
+                total += entry_stat.st_size
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            total -= size
+            self.evicted += 1
+
+    def close(self) -> None:
+        """Evict entries beyond the size cap and log the counters."""
+        self.evict()
+        logging.info(
+            "Cache hits: %s, misses: %s, evicted: %s",
+            self.hits,
+            self.misses,
+            self.evicted,
+        )
+
+
+class RunStats:
+    """
+    Collect wall and CPU time per processing stage and per document.
+
+    A disabled instance records nothing, so it can be passed around freely.
+    """
+
+    STAGES = (
+        "read",
+        "filter",
+        "cache",
+        "parse",
+        "comment",
+        "path",
+        "transform",
+        "serialize",
+        "write",
+        "index",
+        "kustomize",
+    )
+
+    def __init__(self, enabled: bool = True, slowest: int = 10) -> None:
+        self.enabled = enabled
+        self.slowest = slowest
+        # Stage name mapped to its total wall time, CPU time and call count.
+        self.stages: Dict[str, List[float]] = {}
+        self.documents: List[Dict[str, Any]] = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """Measure the wall and CPU time spent in the block."""
+        if not self.enabled:
+            yield
+            return
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def add(self, stage: str, wall: float, cpu: float, calls: int = 1) -> None:
+        """Add the time spent in a stage."""
+        totals = self.stages.setdefault(stage, [0.0, 0.0, 0])
+        totals[0] += wall
+        totals[1] += cpu
+        totals[2] += calls
+
+    def merge(self, stages: Dict[str, List[float]]) -> None:
+        """Add the stage times collected elsewhere, e.g. in a pool worker."""
+        for stage, (wall, cpu, calls) in stages.items():
+            self.add(stage, wall, cpu, int(calls))
+
+    def add_document(
+        self, index: int, source: str, path: str, text: str, wall: float
+    ) -> None:
+        """
+        Record the output size and processing time of a single document.
+
+        Documents are told apart by their source template, as templates of
+        different charts may share the same output path.
+        """
+        if not self.enabled:
+            return
+        self.documents.append(
+            {
+                "index": index,
+                "source": source,
+                "path": path,
+                "bytes": len(text.encode("utf-8")),
+                "seconds": wall,
+            }
+        )
+
+    def iter_timed(self, stage: str, items: Iterable[Any]) -> Iterator[Any]:
+        """Yield the items, measuring the time spent producing each of them."""
+        iterator = iter(items)
+        while True:
+            with self.measure(stage):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the collected statistics as a JSON serializable mapping."""
+        return {
+            "wall_seconds": time.perf_counter() - self.started,
+            "stages": {
+                stage: {"wall_seconds": wall, "cpu_seconds": cpu, "calls": calls}
+                for stage, (wall, cpu, calls) in self.stages.items()
+            },
+            "documents": self.documents,
+            "slowest_documents": nlargest(
+                self.slowest, self.documents, key=lambda doc: doc["seconds"]
+            ),
+        }
+
+    def report(self) -> None:
+        """Log a per-stage and slowest documents report."""
+        data = self.to_dict()
+        total_bytes = sum(doc["bytes"] for doc in self.documents)
+        logging.info(
+            "Processed %s documents (%s bytes) in %.3fs",
+            len(self.documents),
+            total_bytes,
+            data["wall_seconds"],
+        )
+        for stage in self.STAGES:
+            # Stages are followed by their parts, such as every transform.
+            parts = sorted(
+                name for name in data["stages"] if name.startswith(f"{stage}.")
+            )
+            for name in ([stage] if stage in data["stages"] else []) + parts:
+                timing = data["stages"][name]
+                logging.info(
+                    "Stage %-10s wall %8.3fs  cpu %8.3fs  calls %6s",
+                    name,
+                    timing["wall_seconds"],
+                    timing["cpu_seconds"],
+                    timing["calls"],
+                )
+        for doc in data["slowest_documents"]:
+            logging.info(
+                "Slow document [#%s] %.3fs %8s bytes %s (%s)",
+                doc["index"],
+                doc["seconds"],
+                doc["bytes"],
+                doc["source"],
+                doc["path"],
+            )
+
+    def save(self, file_path: str) -> None:
+        """Save the collected statistics as JSON."""
+        with open(file_path, encoding="utf-8", mode="w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write("\n")
+
+
+def init_worker(
+    transform: Optional[Callable[[Any], Any]],
+    loader: str,
+    source_path: Optional[str] = None,
+    emitter: str = "roundtrip",
+) -> None:
+    """Initialize a pool worker with its own YAML instance and input mapping."""
+    # pylint: disable=global-statement
+    global yaml, worker_transform, worker_loader, worker_emitter, worker_buffer
+    yaml = new_yaml()
+    EXIT_ON_ERROR.set(False)
+    worker_transform = transform
+    worker_loader = loader
+    worker_emitter = emitter
+    worker_buffer = map_file(source_path) if source_path else None
+
+
+def transform_document(
+    task: Tuple[int, Union[str, Tuple[int, int]]],
+) -> TransformResult:
+    """
+    Parse, transform and serialize a single document in a pool worker.
+
+    The task holds the document index and either its text or its offsets in
+    the mapped input file. Returns the document index, its source comment,
+    the flattened path, the serialized document and the time spent per stage.
+    Documents without a source only carry the index and timings.
+    """
+    index, raw_document = task
+    stats = RunStats()
+    try:
+        if not isinstance(raw_document, str):
+            with stats.measure("read"):
+                raw_document = read_mapped_document(worker_buffer, raw_document)
+        rendered = process_document(
+            index, raw_document, worker_transform, stats, worker_loader, worker_emitter
+        )
+        return (
+            index,
+            rendered.source_comment,
+            rendered.path,
+            rendered.text,
+            stats.stages,
+        )
+    except HelmYAMLizerError as err:
+        raise DocumentError(index, str(err)) from None
+    # pylint: disable=broad-except
+    except Exception as err:
+        raise DocumentError(index, f"{type(err).__name__}: {err}") from None
+
+
+def iter_transformed_documents(
+    raw_documents: Union[Iterable[str], MappedSource],
+    transform: Optional[Callable[[Any], Any]],
+    jobs: int,
+    cache: Optional[RenderCache] = None,
+    loader: str = "roundtrip",
+    document_filter: Optional[Callable[[str, str], bool]] = None,
+    emitter: str = "roundtrip",
+) -> Iterator[TransformResult]:
+    """
+    Transform documents in a process pool and yield the results in input order.
+
+    At most a few documents per worker are in flight, so the input is still
+    consumed as a stream. Cached and filtered out documents are never sent to
+    the pool. Workers read the documents of a mapped source from their own
+    mapping, and are only sent their offsets.
+    """
+    # pylint: disable=import-outside-toplevel
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    def next_result() -> TransformResult:
+        key, future = pending.popleft()
+        result = future.result()
+        if key is not None:
+            cache.put(key, *result[1:4])
+        return result
+
+    mapped = raw_documents if isinstance(raw_documents, MappedSource) else None
+    documents: Iterable[Any] = mapped.spans if mapped else raw_documents
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_worker,
+        initargs=(transform, loader, mapped.file_path if mapped else None, emitter),
+    ) as executor:
+        pending: Deque[Tuple[Optional[str], "Future"]] = deque()
+        for index, document in enumerate(documents, start=1):
+            raw_document = document
+            # The text of mapped documents is only needed to filter or cache.
+            if mapped and (document_filter or cache):
+                raw_document = mapped.read(document)
+            if document_filter:
+                stats = RunStats()
+                filtered = filter_document(index, raw_document, document_filter, stats)
+                if filtered is not None:
+                    future: Future = Future()
+                    future.set_result(
+                        (index, filtered.source_comment, None, None, stats.stages)
+                    )
+                    pending.append((None, future))
+                    continue
+            key = cache.key(raw_document) if cache else None
+            cached = cache.get(key) if cache else None
+            if cached is None:
+                task = (index, document)
+                pending.append((key, executor.submit(transform_document, task)))
+            else:
+                future = Future()
+                future.set_result((index, *cached, {}))
+                pending.append((None, future))
+            if len(pending) >= jobs * 4:
+                yield next_result()
+        while pending:
+            yield next_result()
+
+
+def positive_int(value: str) -> int:
+    """Argument type accepting integers greater than zero."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer.")
+    return number
+
+
+def filter_pattern(value: str) -> str:
+    """Argument type accepting a source glob or a 'FIELD=GLOB' filter."""
+    try:
+        parse_filter_patterns([value])
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err)) from err
+    return value
+
+
+def get_arguments() -> argparse.Namespace:
+    """Parses and returns command line arguments."""
+    parser = argparse.ArgumentParser()
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument(
+        "-d",
+        "--dir",
+        action="store",
+        help="The directory where files will be saved.",
+    )
+    target.add_argument(
+        "--output-archive",
+        metavar="FILE",
+        help="Write the files into this tar archive instead of a directory,"
+        " compressed if it ends with .tar.gz/.tgz or .tar.xz/.txz.",
+    )
+    parser.add_argument(
+        "--input",
+        metavar="FILE",
+        help="Read the rendered documents from this file instead of stdin,"
+        " mapping it into memory.",
+        required=False,
+    )
+    parser.add_argument(
+        "--helm-template",
+        nargs=argparse.REMAINDER,
+        metavar="CHART [HELM_ARGS]",
+        help="Run 'helm template' on the chart instead of reading stdin. Every"
+        " following argument is passed to helm, so this must come last.",
+    )
+    target.add_argument(
+        "--serve",
+        metavar="SOCKET",
+        help="Keep serving renders on this Unix socket until terminated.",
+    )
+    parser.add_argument(
+        "--connect",
+        metavar="SOCKET",
+        help="Have the daemon serving on this Unix socket render stdin.",
+        required=False,
+    )
+    parser.add_argument(
+        "--max-request-size",
+        metavar="MB",
+        type=positive_int,
+        default=64,
+        help="Largest request the daemon accepts.",
+        required=False,
+    )
+    target.add_argument(
+        "--batch",
+        metavar="JOB_FILE",
+        help="Render the charts listed in a YAML or JSON job file.",
+    )
+    parser.add_argument(
+        "--include",
+        metavar="PATTERN",
+        action="append",
+        type=filter_pattern,
+        help="Only render documents matching a source path glob, or kind=GLOB"
+        " or name=GLOB. May be repeated.",
+        required=False,
+    )
+    parser.add_argument(
+        "--exclude",
+        metavar="PATTERN",
+        action="append",
+        type=filter_pattern,
+        help="Leave out documents matching a pattern, like --include.",
+        required=False,
+    )
+    parser.add_argument(
+        "--drop-label-keys",
+        nargs="*",
+        action="store",
+        help="List of metadata label keys to remove.",
+        required=False,
+    )
+    parser.add_argument(
+        "--drop-labels-mode",
+        choices=OPTION_CHOICES["drop_labels_mode"],
+        default="targeted",
+        help="Drop label keys only at known label locations, or from every"
+        " 'labels' mapping in the document.",
+        required=False,
+    )
+    parser.add_argument(
+        "--drop-selector-labels",
+        action="store_true",
+        help="Also drop label keys from label selectors in targeted mode.",
+        required=False,
+    )
+    parser.add_argument(
+        "--drop-annotations",
+        nargs="*",
+        metavar="GLOB",
+        help="List of annotation key globs to remove, such as 'meta.helm.sh/*'"
+        " or 'checksum/*'.",
+        required=False,
+    )
+    parser.add_argument(
+        "--strip-helm-hooks",
+        action="store_true",
+        help="Remove the Helm hook annotations of the resources.",
+        required=False,
+    )
+    parser.add_argument(
+        "--namespace",
+        help="Set the namespace of every namespaced resource.",
+        required=False,
+    )
+    parser.add_argument(
+        "--loader",
+        choices=OPTION_CHOICES["loader"],
+        default="roundtrip",
+        help="Parse documents keeping quotes and comments, or with the faster"
+        " C-backed safe loader when transforming them.",
+        required=False,
+    )
+    parser.add_argument(
+        "--emitter",
+        choices=OPTION_CHOICES["emitter"],
+        default="roundtrip",
+        help="Serialize transformed documents keeping comments and quotes, or with"
+        " the faster C-backed emitter keeping only the source comment.",
+        required=False,
+    )
+    parser.add_argument(
+        "-k",
+        "--kustomize-generate",
+        action="store_true",
+        help="Should we generate a kustomize file?",
+        required=False,
+    )
+    parser.add_argument(
+        "--kustomize-split",
+        action="store_true",
+        help="Generate a kustomize file in every subdirectory instead of one.",
+        required=False,
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Should we run the script in debug mode?",
+        required=False,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help="Number of processes used to transform documents.",
+        required=False,
+    )
+    parser.add_argument(
+        "--writers",
+        type=positive_int,
+        default=0,
+        help="Number of threads writing files while further documents are"
+        " processed.",
+        required=False,
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only rewrite files whose content has changed.",
+        required=False,
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Remove files of the previous run that are no longer rendered"
+        " (implies --incremental).",
+        required=False,
+    )
+    parser.add_argument(
+        "--atomic",
+        action="store_true",
+        help="Stage the output in a temporary directory and swap it in at once.",
+        required=False,
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Compare the render with the files of the directory instead of"
+        " writing, failing if any file is missing, changed or extra.",
+        required=False,
+    )
+    parser.add_argument(
+        "--index",
+        metavar="FILE",
+        help="Save an index of the rendered resources as JSON Lines to this file.",
+        required=False,
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Report the time spent per processing stage and the slowest documents.",
+        required=False,
+    )
+    parser.add_argument(
+        "--stats-json",
+        metavar="FILE",
+        help="Save the processing statistics as JSON to this file.",
+        required=False,
+    )
+    parser.add_argument(
+        "--stats-top",
+        type=positive_int,
+        default=10,
+        help="Number of slowest documents to report.",
+        required=False,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        help="Reuse documents rendered by previous runs from this directory.",
+        required=False,
+    )
+    parser.add_argument(
+        "--cache-size",
+        metavar="MB",
+        type=positive_int,
+        default=512,
+        help="Size of the cache beyond which the least recently used documents"
+        " are evicted.",
+        required=False,
     )
+    args = parser.parse_args()
+    if args.helm_template is not None:
+        if not args.helm_template:
+            parser.error("argument --helm-template: expected a chart")
+        if args.batch or args.serve or args.connect:
+            parser.error(
+                "argument --helm-template: not allowed with --batch, --serve"
+                " or --connect"
+            )
+    if args.input and (
+        args.helm_template is not None or args.batch or args.serve or args.connect
+    ):
+        parser.error(
+            "argument --input: not allowed with --helm-template, --batch,"
+            " --serve or --connect"
+        )
+    if args.connect and not (args.dir or args.output_archive):
+        parser.error("argument --connect: requires --dir or --output-archive")
+    if args.output_archive:
+        try:
+            get_archive_compression(args.output_archive)
+        except ValueError as err:
+            parser.error(f"argument --output-archive: {err}")
+        if args.incremental or args.prune or args.atomic or args.check:
+            parser.error(
+                "argument --output-archive: not allowed with --incremental,"
+                " --prune, --atomic or --check"
+            )
+    return args
+
+
+class RenderedDocument(NamedTuple):
+    """
+    A processed document; 'path' and 'text' are None if it was skipped.
+
+    Documents without a source are skipped without a source comment, while
+    documents filtered out keep theirs.
+    """
+
+    index: int
+    source_comment: Optional[str]
+    path: Optional[str]
+    text: Optional[str]
+    seconds: float
+
+    @property
+    def filtered(self) -> bool:
+        """Whether the document was left out by the filters."""
+        return self.path is None and self.source_comment is not None
+
+
+@dataclass
+class RenderOptions:
+    """Options of a render, mirroring the command line arguments."""
+
+    drop_label_keys: Optional[List[str]] = None
+    drop_labels_mode: str = "targeted"
+    drop_selector_labels: bool = False
+    drop_annotations: Optional[List[str]] = None
+    strip_helm_hooks: bool = False
+    namespace: Optional[str] = None
+    loader: str = "roundtrip"
+    emitter: str = "roundtrip"
+    kustomize_generate: bool = False
+    kustomize_split: bool = False
+    jobs: int = 1
+    writers: int = 0
+    incremental: bool = False
+    prune: bool = False
+    atomic: bool = False
+    stats: bool = False
+    stats_top: int = 10
+    cache_dir: Optional[str] = None
+    cache_size: int = 512
+    archive: bool = False
+    include: Optional[List[str]] = None
+    exclude: Optional[List[str]] = None
+    index: Optional[str] = None
+    check: bool = False
 
-    target_dir = args.dir
-    user_input = sys.stdin.read()
-    yaml_input = yaml.load_all(user_input)
-
-    for index, document in enumerate(yaml_input, start=1):
-        # Retrieve first document comment
-        source_comment = get_first_line_comment(document)
-        # If document begins with the comment
-        if source_comment:
-            logging.info("Processing document [#%s] %s", index, source_comment)
-            # Retrieve document source comment of the template.
-            doc_source_path = get_template_source_path(source_comment)
-            # Flatten document source comment path.
-            doc_source_path = flatten_source_path(doc_source_path)
-            # Prepare document local path.
-            file_path = prepare_file_path(target_dir, doc_source_path)
-            # Drop metadata label keys from the document.
-            if args.drop_label_keys:
-                document = drop_label_keys(document, args.drop_label_keys)
-            # Save the document to file.
-            save_document_to_file(file_path, document)
+
+@dataclass
+class Manifest:
+    """Outcome of a render: the files it produced and what happened to them."""
+
+    target_dir: str
+    files: List[str] = field(default_factory=list)
+    documents: int = 0
+    skipped: int = 0
+    filtered: int = 0
+    duplicates: int = 0
+    written: int = 0
+    unchanged: int = 0
+    pruned: int = 0
+    missing: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+    cache_hits: int = 0
+    cache_misses: int = 0
+    stats: Optional[RunStats] = None
+
+    @property
+    def drifted(self) -> bool:
+        """Whether check mode found the target directory out of date."""
+        return bool(self.missing or self.changed or self.extra)
+
+
+class ResourceIndex:
+    """
+    Index of the rendered resources, saved as JSON Lines.
+
+    Every rendered document adds a record with its header, template and
+    output paths, size and SHA-256 digest, so downstream tools do not need to
+    parse the files. Records are streamed into a temporary file renamed into
+    place once the render succeeds. Resources sharing a kind, name and
+    namespace are reported as they are found.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        # pylint: disable=import-outside-toplevel
+        import tempfile
+
+        self.file_path = file_path
+        folder_path = os.path.dirname(os.path.abspath(file_path))
+        os.makedirs(folder_path, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(
+            prefix=f".{os.path.basename(file_path)}.", dir=folder_path
+        )
+        self.file = os.fdopen(fd, mode="w", encoding="utf-8", newline="\n")
+        self.records = 0
+        self.duplicates = 0
+        # Index of the first document of every kind, name and namespace.
+        self.resources: Dict[Tuple[str, str, Optional[str]], int] = {}
+
+    def __enter__(self) -> "ResourceIndex":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.close()
         else:
+            self.abort()
+
+    def add(self, rendered: RenderedDocument) -> None:
+        """Add the record of a rendered document and check it is unique."""
+        data = rendered.text.encode("utf-8")
+        header = read_document_header(rendered.text)
+        record = {
+            "index": rendered.index,
+            **header,
+            "source": get_template_source_path(rendered.source_comment),
+            "path": rendered.path,
+            "size": len(data),
+            "sha256": get_sha256(data),
+        }
+        self.file.write(json.dumps(record) + "\n")
+        self.records += 1
+        # Resources without a name, such as generated ones, cannot collide.
+        if header["kind"] is None or header["name"] is None:
+            return
+        resource = (header["kind"], header["name"], header["namespace"])
+        first_index = self.resources.setdefault(resource, rendered.index)
+        if first_index != rendered.index:
+            self.duplicates += 1
             logging.warning(
-                "Document [#%s] has no recognizable source." " Skipping.", index
+                "Duplicate resource %s %s in namespace %s:"
+                " documents [#%s] and [#%s]",
+                header["kind"],
+                header["name"],
+                header["namespace"] or "(none)",
+                first_index,
+                rendered.index,
+            )
+
+    def close(self) -> None:
+        """Move the complete index into place."""
+        self.file.close()
+        os.chmod(self.temp_path, 0o644)
+        os.replace(self.temp_path, self.file_path)
+        logging.info(
+            "Resources indexed: %s, duplicates: %s", self.records, self.duplicates
+        )
+
+    def abort(self) -> None:
+        """Discard the partial index."""
+        self.file.close()
+        os.remove(self.temp_path)
+
+
+@handle_exceptions
+def get_writer(
+    target_dir: str, options: RenderOptions
+) -> Union[OutputWriter, ArchiveWriter, CheckWriter]:
+    """
+    Return the writer of the files: into the target folder or an archive, or
+    comparing them with the target folder in check mode.
+    """
+    if options.check:
+        if options.archive:
+            raise ValueError("Check mode only applies to an output folder.")
+        # Check mode never writes, so the write modes do not matter.
+        return CheckWriter(target_dir)
+    if not options.archive:
+        return OutputWriter(
+            target_dir,
+            incremental=options.incremental,
+            prune=options.prune,
+            atomic=options.atomic,
+            writers=options.writers,
+        )
+    if options.incremental or options.prune or options.atomic:
+        raise ValueError(
+            "Incremental, prune and atomic modes only apply to an output folder."
+        )
+    return ArchiveWriter(target_dir)
+
+
+def process_document(
+    index: int,
+    raw_document: str,
+    transform: Optional[Callable[[Any], Any]],
+    stats: RunStats,
+    loader: str = "roundtrip",
+    emitter: str = "roundtrip",
+) -> RenderedDocument:
+    """
+    Resolve the path of a single document and render its final text.
+
+    The fast loader takes the source comment from the raw text and parses
+    the document into plain data, while the round-trip loader keeps quotes
+    and comments as they are. The fast emitter only keeps the source comment.
+    """
+    started = time.perf_counter()
+    # Without transformations there is no need to parse the document at all.
+    passthrough = transform is None
+    fast = loader == "fast"
+    # Retrieve first document comment
+    if passthrough or fast:
+        with stats.measure("comment"):
+            source_comment = get_raw_first_line_comment(raw_document)
+    else:
+        with stats.measure("parse"):
+            document = load_document(raw_document)
+        with stats.measure("comment"):
+            source_comment = get_first_line_comment(document)
+    # Skip documents that do not begin with the comment.
+    if not source_comment:
+        return RenderedDocument(index, None, None, None, 0.0)
+    with stats.measure("path"):
+        # Retrieve document source comment of the template.
+        doc_source_path = get_template_source_path(source_comment)
+        # Flatten document source comment path.
+        doc_source_path = flatten_source_path(doc_source_path)
+    # Keep the original document bytes when nothing is transformed.
+    if passthrough:
+        serialized = raw_document
+    else:
+        if fast:
+            with stats.measure("parse"):
+                document = load_fast_document(raw_document)
+        # Apply the transformations, fused into a single traversal.
+        with stats.measure("transform"):
+            if isinstance(transform, FusedTransform):
+                document = transform(document, stats)
+            else:
+                document = transform(document)
+        with stats.measure("serialize"):
+            if fast or emitter == "fast":
+                serialized = serialize_fast_document(source_comment, document, emitter)
+            else:
+                serialized = serialize_document(document)
+    return RenderedDocument(
+        index,
+        source_comment,
+        doc_source_path,
+        serialized,
+        time.perf_counter() - started,
+    )
+
+
+def iter_processed_documents(
+    raw_documents: Union[Iterable[str], MappedSource],
+    transform: Optional[Callable[[Any], Any]],
+    stats: RunStats,
+    jobs: int = 1,
+    cache: Optional[RenderCache] = None,
+    loader: str = "roundtrip",
+    document_filter: Optional[Callable[[str, str], bool]] = None,
+    emitter: str = "roundtrip",
+) -> Iterator[RenderedDocument]:
+    """
+    Process raw documents and yield them in input order.
+
+    Parsing and serialization are spread across processes only when there is
+    something to transform; raw passthrough never parses documents. Documents
+    left out by the filter are never parsed either. Documents found in the
+    cache are not processed again, and the others are added.
+    """
+    if transform and jobs > 1:
+        # Pool workers read the documents of a mapped source themselves.
+        if not isinstance(raw_documents, MappedSource):
+            raw_documents = stats.iter_timed("read", raw_documents)
+        results = iter_transformed_documents(
+            raw_documents, transform, jobs, cache, loader, document_filter, emitter
+        )
+        for index, source_comment, doc_source_path, serialized, timings in results:
+            stats.merge(timings)
+            seconds = sum(timing[0] for timing in timings.values())
+            yield log_processed_document(
+                RenderedDocument(
+                    index, source_comment, doc_source_path, serialized, seconds
+                )
+            )
+        return
+    raw_documents = stats.iter_timed("read", raw_documents)
+    for index, raw_document in enumerate(raw_documents, start=1):
+        if document_filter:
+            filtered = filter_document(index, raw_document, document_filter, stats)
+            if filtered is not None:
+                yield log_processed_document(filtered)
+                continue
+        key = cached = None
+        if cache:
+            started = time.perf_counter()
+            with stats.measure("cache"):
+                key = cache.key(raw_document)
+                cached = cache.get(key)
+            if cached is not None:
+                seconds = time.perf_counter() - started
+                yield log_processed_document(RenderedDocument(index, *cached, seconds))
+                continue
+        try:
+            rendered = process_document(
+                index, raw_document, transform, stats, loader, emitter
+            )
+        except HelmYAMLizerError as err:
+            raise DocumentError(index, str(err)) from err
+        if key is not None:
+            with stats.measure("cache"):
+                cache.put(key, rendered.source_comment, rendered.path, rendered.text)
+        yield log_processed_document(rendered)
+
+
+def filter_document(
+    index: int,
+    raw_document: str,
+    document_filter: Callable[[str, str], bool],
+    stats: RunStats,
+) -> Optional[RenderedDocument]:
+    """
+    Return the document as filtered out if it does not pass the filter.
+
+    Documents without a source are left to the processing, which skips them.
+    """
+    started = time.perf_counter()
+    try:
+        with stats.measure("filter"):
+            source_comment = get_raw_first_line_comment(raw_document)
+            if not source_comment or document_filter(source_comment, raw_document):
+                return None
+    except HelmYAMLizerError as err:
+        raise DocumentError(index, str(err)) from err
+    return RenderedDocument(
+        index, source_comment, None, None, time.perf_counter() - started
+    )
+
+
+def log_processed_document(rendered: RenderedDocument) -> RenderedDocument:
+    """Log the processed document, or a warning if it was skipped."""
+    if rendered.filtered:
+        logging.debug(
+            "Document [#%s] %s is filtered out.",
+            rendered.index,
+            rendered.source_comment,
+        )
+    elif rendered.path is None:
+        logging.warning(
+            "Document [#%s] has no recognizable source." " Skipping.", rendered.index
+        )
+    else:
+        logging.info(
+            "Processing document [#%s] %s", rendered.index, rendered.source_comment
+        )
+    return rendered
+
+
+def iter_source_lines(source: Union[str, Iterable[str]]) -> Iterable[str]:
+    """Return the lines of the rendered 'helm template' text or stream."""
+    if isinstance(source, str):
+        return io.StringIO(source, newline="")
+    return source
+
+
+def iter_source_documents(
+    source: Union[str, Iterable[str], MappedSource],
+) -> Union[Iterable[str], MappedSource]:
+    """Return the raw documents of the source; mapped files are already split."""
+    if isinstance(source, MappedSource):
+        return source
+    return iter_raw_documents(iter_source_lines(source))
+
+
+def get_transform(options: RenderOptions) -> Optional[FusedTransform]:
+    """Return the document transformations requested by the options, fused."""
+    transforms = get_path_transforms(options)
+    return FusedTransform(transforms) if transforms else None
+
+
+@lru_cache(maxsize=None)
+def get_tool_digest() -> str:
+    """Return a digest of this module, standing in for a release version."""
+    try:
+        with open(__file__, mode="rb") as f:
+            return get_sha256(f.read())
+    except OSError:
+        return "unknown"
+
+
+@handle_exceptions
+def get_resource_index(options: RenderOptions) -> Optional[ResourceIndex]:
+    """Return the index of the rendered resources requested by the options."""
+    return ResourceIndex(options.index) if options.index else None
+
+
+@handle_exceptions
+def get_render_cache(options: RenderOptions) -> Optional[RenderCache]:
+    """
+    Return the cache of rendered documents requested by the options.
+
+    Raw passthrough is cheaper than a cache lookup, so only transforming runs
+    are cached. The namespace of the entries covers the options affecting the
+    output, the ruamel.yaml version and the code emitting the documents.
+    """
+    if not options.cache_dir or get_transform(options) is None:
+        return None
+    # pylint: disable=import-outside-toplevel
+    from ruamel.yaml import __version__ as ruamel_version
+
+    namespace = json.dumps(
+        {
+            "tool": get_tool_digest(),
+            "ruamel.yaml": ruamel_version,
+            "drop_label_keys": sorted(set(options.drop_label_keys or [])),
+            "drop_labels_mode": options.drop_labels_mode,
+            "drop_selector_labels": options.drop_selector_labels,
+            "drop_annotations": sorted(set(options.drop_annotations or [])),
+            "strip_helm_hooks": options.strip_helm_hooks,
+            "namespace": options.namespace,
+            "loader": options.loader,
+            "emitter": options.emitter,
+        },
+        sort_keys=True,
+    )
+    return RenderCache(options.cache_dir, namespace, options.cache_size * 2**20)
+
+
+def render(
+    source: Union[str, Iterable[str], MappedSource],
+    target_dir: str,
+    options: Optional[RenderOptions] = None,
+) -> Manifest:
+    """
+    Render 'helm template' output into files in the target directory.
+
+    The source is either the whole text, an iterable of lines, such as an
+    open file, or a memory-mapped file. Errors are raised as
+    'HelmYAMLizerError' subclasses, with 'DocumentError' carrying the index
+    of the failing document.
+    """
+    options = options or RenderOptions()
+    with raising_errors():
+        stats = RunStats(enabled=options.stats, slowest=options.stats_top)
+        manifest = Manifest(target_dir, stats=stats if options.stats else None)
+        cache = get_render_cache(options)
+        raw_documents = iter_source_documents(source)
+        rendered_documents = iter_processed_documents(
+            raw_documents,
+            get_transform(options),
+            stats,
+            options.jobs,
+            cache,
+            options.loader,
+            get_document_filter(options.include, options.exclude),
+            options.emitter,
+        )
+        resource_index = get_resource_index(options)
+        # The writer closes first, so a failing one discards the index.
+        with resource_index or nullcontext(), get_writer(target_dir, options) as writer:
+            for rendered in rendered_documents:
+                if rendered.filtered:
+                    manifest.filtered += 1
+                    continue
+                if rendered.path is None:
+                    manifest.skipped += 1
+                    continue
+                started = time.perf_counter()
+                try:
+                    # With writer threads this only measures queueing the file.
+                    with stats.measure("write"):
+                        writer.write(rendered.path, rendered.text, rendered.index)
+                # Errors of writer threads already carry their document index.
+                except DocumentError:
+                    raise
+                except HelmYAMLizerError as err:
+                    raise DocumentError(rendered.index, str(err)) from err
+                if resource_index:
+                    try:
+                        with stats.measure("index"):
+                            resource_index.add(rendered)
+                    except HelmYAMLizerError as err:
+                        raise DocumentError(rendered.index, str(err)) from err
+                stats.add_document(
+                    rendered.index,
+                    get_template_source_path(rendered.source_comment),
+                    rendered.path,
+                    rendered.text,
+                    rendered.seconds + time.perf_counter() - started,
+                )
+                manifest.documents += 1
+            with stats.measure("write"):
+                writer.flush()
+            writer.prune_stale_files()
+            # Generate kustomization.yaml files from the paths written by this run.
+            if options.kustomize_split or options.kustomize_generate:
+                with stats.measure("kustomize"):
+                    writer.write_kustomize_files(options.kustomize_split)
+    manifest.files = sorted(writer.rendered_paths)
+    manifest.written = writer.written
+    manifest.unchanged = writer.unchanged
+    manifest.pruned = writer.pruned
+    if resource_index:
+        manifest.duplicates = resource_index.duplicates
+    if options.check:
+        manifest.missing = writer.missing
+        manifest.changed = writer.changed
+        manifest.extra = writer.extra
+    if cache:
+        cache.close()
+        manifest.cache_hits = cache.hits
+        manifest.cache_misses = cache.misses
+    return manifest
+
+
+def iter_render(
+    source: Union[str, Iterable[str], MappedSource],
+    options: Optional[RenderOptions] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Lazily yield the (path, text) pair of every document without writing.
+
+    Paths are relative to the would-be target directory. Errors are raised
+    just like in 'render'.
+    """
+    options = options or RenderOptions()
+    cache = get_render_cache(options)
+    raw_documents = iter_source_documents(source)
+    rendered_documents = iter_processed_documents(
+        raw_documents,
+        get_transform(options),
+        RunStats(enabled=False),
+        options.jobs,
+        cache,
+        options.loader,
+        get_document_filter(options.include, options.exclude),
+        options.emitter,
+    )
+    while True:
+        # Only raise errors while processing, not while the caller runs.
+        with raising_errors():
+            rendered = next(rendered_documents, None)
+        if rendered is None:
+            if cache:
+                cache.close()
+            return
+        if rendered.path is not None:
+            yield rendered.path, rendered.text
+
+
+@dataclass
+class BatchJob:
+    """A chart to render in batch mode."""
+
+    name: str
+    input_file: str
+    target_dir: str
+    options: RenderOptions
+
+
+@dataclass
+class BatchResult:
+    """Outcome of rendering a chart in batch mode."""
+
+    job: BatchJob
+    seconds: float
+    manifest: Optional[Manifest] = None
+    error: Optional[str] = None
+
+
+def is_option_value(value: Any, annotation: Any) -> bool:
+    """Check whether a value has the type of a 'RenderOptions' field."""
+    origin = get_origin(annotation)
+    if origin is Union:
+        return any(is_option_value(value, arg) for arg in get_args(annotation))
+    if origin is list:
+        return isinstance(value, list) and all(
+            is_option_value(item, get_args(annotation)[0]) for item in value
+        )
+    if annotation is type(None):
+        return value is None
+    # Booleans are integers to Python, but 'jobs: true' is a mistake.
+    if annotation is int and isinstance(value, bool):
+        return False
+    return isinstance(value, annotation)
+
+
+def get_option_error(options: Dict[str, Any]) -> Optional[str]:
+    """
+    Describe the first of the known options whose value is invalid.
+
+    Values must have the type of their 'RenderOptions' field, and are held to
+    the choices and minimums the command line arguments enforce.
+    """
+    option_types = {option.name: option.type for option in fields(RenderOptions)}
+    for key, value in options.items():
+        annotation = option_types.get(key)
+        if annotation is None:
+            continue
+        if not is_option_value(value, annotation):
+            if isinstance(annotation, type):
+                expected = annotation.__name__
+            else:
+                expected = str(annotation).replace("typing.", "")
+            return f"option '{key}' must be {expected}, not {value!r}."
+        if key in OPTION_CHOICES and value not in OPTION_CHOICES[key]:
+            choices = ", ".join(OPTION_CHOICES[key])
+            return f"option '{key}' must be one of {choices}, not {value!r}."
+        if key in OPTION_MINIMUMS and value < OPTION_MINIMUMS[key]:
+            return f"option '{key}' must be at least {OPTION_MINIMUMS[key]}, not {value!r}."
+    return None
+
+
+@handle_exceptions
+def load_batch_jobs(
+    file_path: str, defaults: Optional[RenderOptions] = None
+) -> Tuple[List[BatchJob], Optional[int]]:
+    """
+    Load the charts to render and the number of parallel workers from a job file.
+
+    The job file holds a 'charts' list, each entry with an 'input' file of
+    'helm template' output, a target 'dir', an optional 'name' and any of the
+    'RenderOptions' fields, which override the given defaults and are checked
+    like the command line arguments. Relative paths are resolved against the
+    folder of the job file.
+    """
+    with open(file_path, encoding="utf-8") as f:
+        # JSON is a subset of YAML, so the safe loader reads both formats.
+        # pylint: disable=import-outside-toplevel
+        from ruamel.yaml import YAML
+
+        job_data = YAML(typ="safe", pure=True).load(f)
+    if not isinstance(job_data, dict) or not isinstance(job_data.get("charts"), list):
+        raise ValueError(f"Job file '{file_path}' must contain a 'charts' list.")
+    base_dir = os.path.dirname(os.path.abspath(file_path))
+    option_names = {option.name for option in fields(RenderOptions)}
+    jobs = []
+    for position, chart in enumerate(job_data["charts"], start=1):
+        if not isinstance(chart, dict) or "input" not in chart or "dir" not in chart:
+            raise ValueError(f"Chart #{position} must define 'input' and 'dir'.")
+        chart = dict(chart)
+        input_file = os.path.join(base_dir, chart.pop("input"))
+        target_dir = os.path.join(base_dir, chart.pop("dir"))
+        name = str(chart.pop("name", os.path.basename(input_file)))
+        unknown = set(chart) - option_names
+        if unknown:
+            raise ValueError(
+                f"Chart '{name}' has unknown options: {', '.join(sorted(unknown))}."
+            )
+        option_error = get_option_error(chart)
+        if option_error:
+            raise ValueError(f"Chart '{name}' {option_error}")
+        options = replace(defaults or RenderOptions(), **chart)
+        jobs.append(BatchJob(name, input_file, target_dir, options))
+    workers = job_data.get("workers")
+    if workers is not None and (
+        isinstance(workers, bool) or not isinstance(workers, int) or workers < 1
+    ):
+        raise ValueError("'workers' must be a positive integer.")
+    return jobs, workers
+
+
+def render_batch_job(job: BatchJob) -> BatchResult:
+    """Render a single chart, capturing any failure in the result."""
+    started = time.perf_counter()
+    try:
+        with closing(MappedSource(job.input_file)) as source:
+            manifest = render(source, job.target_dir, job.options)
+    # A failing chart must not stop the others.
+    # pylint: disable=broad-except
+    except Exception as err:
+        return BatchResult(job, time.perf_counter() - started, error=str(err))
+    return BatchResult(job, time.perf_counter() - started, manifest=manifest)
+
+
+def render_batch(
+    jobs: List[BatchJob], workers: Optional[int] = None
+) -> List[BatchResult]:
+    """Render the charts in parallel threads, returning results in job order."""
+    # pylint: disable=import-outside-toplevel
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(render_batch_job, jobs))
+
+
+def log_batch_summary(results: List[BatchResult]) -> None:
+    """Log the outcome and timing of every chart of a batch."""
+    for result in results:
+        if result.manifest is None:
+            logging.error(
+                "Chart %s failed after %.3fs: %s",
+                result.job.name,
+                result.seconds,
+                result.error,
+            )
+            continue
+        manifest = result.manifest
+        logging.info(
+            "Chart %s rendered %s documents in %.3fs"
+            " (written: %s, unchanged: %s, pruned: %s, skipped: %s, filtered: %s)",
+            result.job.name,
+            manifest.documents,
+            result.seconds,
+            manifest.written,
+            manifest.unchanged,
+            manifest.pruned,
+            manifest.skipped,
+            manifest.filtered,
+        )
+    failed = sum(1 for result in results if result.manifest is None)
+    logging.info("Batch rendered %s charts, %s failed", len(results) - failed, failed)
+
+
+def report_batch_stats(
+    results: List[BatchResult], report: bool, file_path: Optional[str]
+) -> None:
+    """Log and save the processing statistics of every rendered chart."""
+    charts = {
+        result.job.name: result.manifest.stats
+        for result in results
+        if result.manifest is not None and result.manifest.stats is not None
+    }
+    if report:
+        for name, stats in charts.items():
+            logging.info("Statistics of chart %s", name)
+            stats.report()
+    if file_path:
+        with open(file_path, encoding="utf-8", mode="w") as f:
+            json.dump({name: stats.to_dict() for name, stats in charts.items()}, f)
+            f.write("\n")
+
+
+# Options the daemon does not take from clients: requests are rendered in its
+# threads rather than in process pools, and statistics stay on its side.
+DAEMON_IGNORED_OPTIONS = ("jobs", "stats", "stats_top")
+
+
+def new_render_server(socket_path: str, max_request_size: int) -> Any:
+    """
+    Create the Unix socket server of the daemon, listening on the path.
+
+    The server classes are defined here, so that 'socketserver' is only
+    imported by the daemon.
+    """
+    # pylint: disable=import-outside-toplevel
+    import socketserver
+
+    class RenderRequestHandler(socketserver.StreamRequestHandler):
+        """
+        Render the 'helm template' output a client sends over the socket.
+
+        A request is a JSON header line holding the target 'dir' and the render
+        'options', followed by the output itself until the client stops sending.
+        The response is a JSON line with either the outcome or an 'error'.
+        """
+
+        def handle(self) -> None:
+            started = time.perf_counter()
+            # Connections probing whether the daemon is alive send nothing.
+            if not self.rfile.peek(1):
+                return
+            try:
+                response = self.render_request()
+            # Keep serving other clients whatever happens to this request.
+            # pylint: disable=broad-except
+            except Exception as err:
+                logging.error("Request failed: %s", err)
+                response = {"error": str(err)}
+            else:
+                logging.info(
+                    "Rendered %s documents into %s in %.3fs",
+                    response["documents"],
+                    response["dir"],
+                    time.perf_counter() - started,
+                )
+            try:
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            except OSError as err:
+                logging.warning("Failed to respond to the client: %s", err)
+
+        def render_request(self) -> Dict[str, Any]:
+            """Read and render a single request, enforcing the size limit."""
+            max_size = self.server.max_request_size
+            header = self.rfile.readline(max_size + 1)
+            if not header.endswith(b"\n"):
+                raise ValueError("Request header is missing or too large.")
+            request = json.loads(header)
+            if not isinstance(request, dict) or not isinstance(request.get("dir"), str):
+                raise ValueError("Request header must define the target 'dir'.")
+            request_options = request.get("options", {})
+            option_names = {option.name for option in fields(RenderOptions)}
+            unknown = set(request_options) - option_names
+            if unknown:
+                raise ValueError(f"Unknown options: {', '.join(sorted(unknown))}.")
+            option_error = get_option_error(request_options)
+            if option_error:
+                raise ValueError(f"Request {option_error}")
+            for name in DAEMON_IGNORED_OPTIONS:
+                request_options.pop(name, None)
+            # Read one byte past the limit to tell a request that exceeds it.
+            payload = self.rfile.read(max_size - len(header) + 1)
+            if len(header) + len(payload) > max_size:
+                raise ValueError(f"Request exceeds the limit of {max_size} bytes.")
+            options = replace(RenderOptions(), **request_options)
+            manifest = render(payload.decode("utf-8"), request["dir"], options)
+            return {
+                "dir": manifest.target_dir,
+                "files": manifest.files,
+                "documents": manifest.documents,
+                "skipped": manifest.skipped,
+                "filtered": manifest.filtered,
+                "duplicates": manifest.duplicates,
+                "missing": manifest.missing,
+                "changed": manifest.changed,
+                "extra": manifest.extra,
+                "written": manifest.written,
+                "unchanged": manifest.unchanged,
+                "pruned": manifest.pruned,
+            }
+
+    class RenderServer(socketserver.ThreadingUnixStreamServer):
+        """
+        Unix socket server rendering each request in its own thread.
+
+        Closing the server waits for the requests in flight to complete.
+        """
+
+        def __init__(self) -> None:
+            self.max_request_size = max_request_size
+            super().__init__(socket_path, RenderRequestHandler)
+            # The daemon writes wherever it is asked to, so only its owner may ask.
+            os.chmod(socket_path, 0o600)
+
+    return RenderServer()
+
+
+def remove_stale_socket(socket_path: str) -> None:
+    """
+    Remove a socket left behind by a daemon that is no longer running.
+
+    Anything but a socket found at the path is left alone.
+    """
+    # pylint: disable=import-outside-toplevel
+    import socket
+
+    try:
+        path_stat = os.lstat(socket_path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(path_stat.st_mode):
+        raise RuntimeError(f"{socket_path} already exists and is not a socket.")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(socket_path)
+            return
+    raise RuntimeError(f"Another daemon is already serving on {socket_path}.")
+
+
+def serve(socket_path: str, max_request_size: int) -> None:
+    """Serve render requests on a Unix socket until SIGTERM or SIGINT."""
+    # pylint: disable=import-outside-toplevel
+    import signal
+
+    remove_stale_socket(socket_path)
+    # Import ruamel.yaml ahead of the first request.
+    new_yaml()
+    with new_render_server(socket_path, max_request_size) as server:
+        socket_stat = os.lstat(socket_path)
+
+        def stop(signum: int, _frame: Any) -> None:
+            logging.info("Received %s, shutting down.", signal.Signals(signum).name)
+            # 'shutdown' waits for 'serve_forever' to return, so it cannot be
+            # called from the thread running it.
+            threading.Thread(target=server.shutdown).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        logging.info("Serving on %s", socket_path)
+        try:
+            server.serve_forever()
+        finally:
+            # Only remove the socket this daemon created, not a replacement.
+            try:
+                if os.path.samestat(os.lstat(socket_path), socket_stat):
+                    os.remove(socket_path)
+            except FileNotFoundError:
+                pass
+    logging.info("Stopped serving.")
+
+
+def render_remote(
+    socket_path: str,
+    source: BinaryIO,
+    target_dir: str,
+    options: Optional[RenderOptions] = None,
+) -> Dict[str, Any]:
+    """
+    Have the daemon listening on the socket render the source into a folder.
+
+    Returns the outcome reported by the daemon, raising a 'HelmYAMLizerError'
+    with its message if the request failed.
+    """
+    # pylint: disable=import-outside-toplevel
+    import socket
+
+    options = options or RenderOptions()
+    request_options = {
+        name: value
+        for name, value in asdict(options).items()
+        if name not in DAEMON_IGNORED_OPTIONS
+    }
+    # The daemon may run in another folder.
+    for name in ("cache_dir", "index"):
+        if request_options[name]:
+            request_options[name] = os.path.abspath(request_options[name])
+    header = {"dir": os.path.abspath(target_dir), "options": request_options}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        try:
+            client.sendall(json.dumps(header).encode("utf-8") + b"\n")
+            for chunk in iter(partial(source.read, 2**16), b""):
+                client.sendall(chunk)
+            client.shutdown(socket.SHUT_WR)
+        # A rejected request is closed early; its response tells why.
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        with client.makefile("rb") as response_file:
+            response_line = response_file.readline()
+    if not response_line:
+        raise HelmYAMLizerError(f"The daemon on {socket_path} closed the connection.")
+    response = json.loads(response_line)
+    if "error" in response:
+        raise HelmYAMLizerError(response["error"])
+    return response
+
+
+def main() -> None:
+    """Main function"""
+    args = get_arguments()
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(levelname)8s - %(message)s",
+    )
+    options = RenderOptions(
+        drop_label_keys=args.drop_label_keys,
+        drop_labels_mode=args.drop_labels_mode,
+        drop_selector_labels=args.drop_selector_labels,
+        drop_annotations=args.drop_annotations,
+        strip_helm_hooks=args.strip_helm_hooks,
+        namespace=args.namespace,
+        loader=args.loader,
+        emitter=args.emitter,
+        kustomize_generate=args.kustomize_generate,
+        kustomize_split=args.kustomize_split,
+        jobs=args.jobs,
+        writers=args.writers,
+        incremental=args.incremental,
+        prune=args.prune,
+        atomic=args.atomic,
+        stats=args.stats or bool(args.stats_json),
+        stats_top=args.stats_top,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size,
+        archive=bool(args.output_archive),
+        include=args.include,
+        exclude=args.exclude,
+        index=args.index,
+        check=args.check,
+    )
+    target_dir = args.output_archive or args.dir
+    if args.serve:
+        try:
+            serve(args.serve, args.max_request_size * 2**20)
+        except (OSError, RuntimeError) as err:
+            logging.fatal("Failed to serve on %s: %s", args.serve, err)
+            sys.exit(1)
+        return
+    if args.connect:
+        try:
+            response = render_remote(
+                args.connect, sys.stdin.buffer, target_dir, options
+            )
+        except (OSError, HelmYAMLizerError) as err:
+            logging.fatal("%s", err)
+            sys.exit(1)
+        logging.info(
+            "Files written: %s, unchanged: %s, pruned: %s",
+            response["written"],
+            response["unchanged"],
+            response["pruned"],
+        )
+        logging.info(
+            "Documents rendered: %s, skipped: %s, filtered out: %s",
+            response["documents"],
+            response["skipped"],
+            response["filtered"],
+        )
+        if response["missing"] or response["changed"] or response["extra"]:
+            sys.exit(1)
+        return
+    if args.batch:
+        jobs, workers = load_batch_jobs(args.batch, options)
+        results = render_batch(jobs, workers)
+        log_batch_summary(results)
+        report_batch_stats(results, args.stats, args.stats_json)
+        if any(
+            result.manifest is None or result.manifest.drifted for result in results
+        ):
+            sys.exit(1)
+        return
+    if args.helm_template:
+        source = iter_helm_template(args.helm_template[0], args.helm_template[1:])
+    elif args.input:
+        try:
+            source = MappedSource(args.input)
+        except (OSError, ValueError) as err:
+            logging.fatal("Failed to read %s: %s", args.input, err)
+            sys.exit(1)
+    else:
+        # Read the input lazily so only one document is held in memory at a
+        # time. Line endings are kept untouched so raw documents can be
+        # written as is.
+        source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    # Closing the source stops helm if processing fails.
+    with closing(source):
+        try:
+            manifest = render(source, target_dir, options)
+        except HelmError as err:
+            logging.fatal("%s", err)
+            sys.exit(err.returncode)
+        except DocumentError as err:
+            logging.fatal(
+                "Failed to process document [#%s]: %s", err.index, err.message
             )
-    # Generate a single kustomization.yaml file.
-    if args.kustomize_generate:
-        generate_kustomize_file(target_dir)
+            sys.exit(1)
+        except HelmYAMLizerError as err:
+            logging.fatal("%s", err)
+            sys.exit(1)
+    logging.info(
+        "Documents rendered: %s, skipped: %s, filtered out: %s",
+        manifest.documents,
+        manifest.skipped,
+        manifest.filtered,
+    )
+    if args.stats:
+        manifest.stats.report()
+    if args.stats_json:
+        manifest.stats.save(args.stats_json)
+    if manifest.drifted:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
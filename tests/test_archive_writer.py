@@ -0,0 +1,113 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import os
+import tarfile
+import tempfile
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import ArchiveWriter, RenderError, RenderOptions, render
+
+HELM_OUTPUT = (
+    "---\n# Source: chart/templates/b.yaml\nkind: B\n"
+    "---\n# Source: chart/templates/sub/a.yaml\nkind: A\n"
+    "---\n# Source: chart/templates/b.yaml\nkind: C\n"
+)
+
+
+class TestArchiveWriter(unittest.TestCase):
+    """'ArchiveWriter' class test cases."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.archive_path = os.path.join(self.temp_dir.name, "out.tar")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_members(self, archive_path):
+        with tarfile.open(archive_path) as archive:
+            return {
+                member.name: archive.extractfile(member).read().decode("utf-8")
+                for member in archive.getmembers()
+            }
+
+    def test_write_sorted_members(self):
+        """Test that members are sorted, grouped and have fixed metadata."""
+        with ArchiveWriter(self.archive_path) as writer:
+            writer.write("sub/a.yaml", "---\nkind: A\n")
+            writer.write("b.yaml", "---\nkind: B\n")
+            writer.write("b.yaml", "---\nkind: C\n")
+        self.assertEqual(writer.written, 2)
+        with tarfile.open(self.archive_path) as archive:
+            members = archive.getmembers()
+        self.assertEqual([member.name for member in members], ["b.yaml", "sub/a.yaml"])
+        for member in members:
+            self.assertEqual((member.mode, member.mtime), (0o644, 0))
+            self.assertEqual((member.uid, member.gid), (0, 0))
+        self.assertEqual(
+            self.read_members(self.archive_path)["b.yaml"],
+            "---\nkind: B\n---\nkind: C\n",
+        )
+
+    def test_source_date_epoch(self):
+        """Test that members take their mtime from SOURCE_DATE_EPOCH."""
+        with patch.dict(os.environ, {"SOURCE_DATE_EPOCH": "1700000000"}):
+            with ArchiveWriter(self.archive_path) as writer:
+                writer.write("a.yaml", "---\nkind: A\n")
+        with tarfile.open(self.archive_path) as archive:
+            self.assertEqual(archive.getmember("a.yaml").mtime, 1700000000)
+
+    def test_unsupported_extension(self):
+        """Test that archives must have a tar extension."""
+        with self.assertRaises(ValueError):
+            ArchiveWriter(os.path.join(self.temp_dir.name, "out.zip"))
+
+    def test_nothing_written_on_error(self):
+        """Test that no archive nor temporary file is left after an error."""
+        with self.assertRaises(RuntimeError):
+            with ArchiveWriter(self.archive_path) as writer:
+                writer.write("a.yaml", "---\nkind: A\n")
+                raise RuntimeError("boom")
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_render_deterministic(self):
+        """Test that rendering the same input twice gives the same bytes."""
+        for extension in (".tar", ".tar.gz", ".tar.xz"):
+            archives = []
+            for run in range(2):
+                archive_path = os.path.join(self.temp_dir.name, f"{run}{extension}")
+                render(HELM_OUTPUT, archive_path, RenderOptions(archive=True))
+                with open(archive_path, "rb") as f:
+                    archives.append(f.read())
+            self.assertEqual(archives[0], archives[1], extension)
+
+    def test_render_with_kustomize(self):
+        """Test that the kustomization.yaml is added to the archive."""
+        archive_path = self.archive_path + ".gz"
+        manifest = render(
+            HELM_OUTPUT,
+            archive_path,
+            RenderOptions(archive=True, kustomize_generate=True),
+        )
+        self.assertEqual(manifest.files, ["b.yaml", "sub/a.yaml"])
+        self.assertEqual(manifest.written, 3)
+        members = self.read_members(archive_path)
+        self.assertEqual(
+            sorted(members), ["b.yaml", "kustomization.yaml", "sub/a.yaml"]
+        )
+        self.assertIn("- sub/a.yaml", members["kustomization.yaml"])
+        self.assertEqual(os.listdir(self.temp_dir.name), ["out.tar.gz"])
+
+    def test_render_rejects_folder_modes(self):
+        """Test that folder only modes cannot be combined with archives."""
+        with self.assertRaises(RenderError):
+            render(
+                HELM_OUTPUT,
+                self.archive_path,
+                RenderOptions(archive=True, incremental=True),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import RenderOptions, load_batch_jobs, render_batch
+from .utils import check_expected_logging_call
+
+
+def make_chart_output(chart, documents):
+    """Return 'helm template' output of a chart with the given documents."""
+    return "".join(
+        f"---\n# Source: {chart}/templates/doc-{index}.yaml\n"
+        f"metadata:\n  labels:\n    drop: me\n    index: '{index}'\n"
+        for index in range(documents)
+    )
+
+
+class TestBatch(unittest.TestCase):
+    """Batch mode functions test cases."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.base_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_file(self, name, text):
+        """Write a file into the temporary directory."""
+        with open(os.path.join(self.base_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+        return os.path.join(self.base_dir, name)
+
+    def test_load_batch_jobs(self):
+        """Test loading a JSON job file with defaults and per-chart options."""
+        job_file = self.write_file(
+            "jobs.json",
+            json.dumps(
+                {
+                    "workers": 2,
+                    "charts": [
+                        {"input": "a.yaml", "dir": "out/a", "drop_label_keys": ["x"]},
+                        {"name": "b", "input": "b.yaml", "dir": "out/b"},
+                    ],
+                }
+            ),
+        )
+        jobs, workers = load_batch_jobs(job_file, RenderOptions(incremental=True))
+        self.assertEqual(workers, 2)
+        self.assertEqual([job.name for job in jobs], ["a.yaml", "b"])
+        self.assertEqual(jobs[0].target_dir, os.path.join(self.base_dir, "out/a"))
+        self.assertEqual(jobs[0].options.drop_label_keys, ["x"])
+        self.assertTrue(jobs[1].options.incremental)
+
+    @patch("helmYAMLizer.sys.exit")
+    @patch("helmYAMLizer.logging.fatal")
+    def test_unknown_options(self, mock_logging, mock_exit):
+        """Test failure when a chart uses an unknown option."""
+        job_file = self.write_file(
+            "jobs.yaml", "charts:\n  - {name: a, input: a, dir: a, colour: red}\n"
+        )
+        load_batch_jobs(job_file)
+        self.assertTrue(
+            check_expected_logging_call(
+                mock_logging,
+                "load_batch_jobs",
+                ValueError,
+                "Chart 'a' has unknown options: colour.",
+            ),
+            "Expected logging call not found.",
+        )
+        mock_exit.assert_called_once_with(1)
+
+    @patch("helmYAMLizer.sys.exit")
+    @patch("helmYAMLizer.logging.fatal")
+    def test_option_types(self, mock_logging, mock_exit):
+        """Test failure when a chart option has the wrong type or value."""
+        for option, error_msg in (
+            ('jobs: "4"', "Chart 'a' option 'jobs' must be int, not '4'."),
+            (
+                "drop_label_keys: x",
+                "Chart 'a' option 'drop_label_keys' must be Optional[List[str]],"
+                " not 'x'.",
+            ),
+            ("check: 1", "Chart 'a' option 'check' must be bool, not 1."),
+            (
+                "drop_labels_mode: targetted",
+                "Chart 'a' option 'drop_labels_mode' must be one of targeted,"
+                " recursive, not 'targetted'.",
+            ),
+            (
+                "loader: fastt",
+                "Chart 'a' option 'loader' must be one of roundtrip, fast,"
+                " not 'fastt'.",
+            ),
+            ("jobs: 0", "Chart 'a' option 'jobs' must be at least 1, not 0."),
+            ("writers: -1", "Chart 'a' option 'writers' must be at least 0, not -1."),
+        ):
+            job_file = self.write_file(
+                "jobs.yaml", f"charts:\n  - {{name: a, input: a, dir: a, {option}}}\n"
+            )
+            load_batch_jobs(job_file)
+            self.assertTrue(
+                check_expected_logging_call(
+                    mock_logging, "load_batch_jobs", ValueError, error_msg
+                ),
+                f"Expected logging call not found for {option}.",
+            )
+        job_file = self.write_file(
+            "jobs.yaml", "workers: true\ncharts:\n  - {name: a, input: a, dir: a}\n"
+        )
+        load_batch_jobs(job_file)
+        self.assertTrue(
+            check_expected_logging_call(
+                mock_logging,
+                "load_batch_jobs",
+                ValueError,
+                "'workers' must be a positive integer.",
+            ),
+            "Expected logging call not found for workers.",
+        )
+        self.assertEqual(mock_exit.call_count, 8)
+
+    def test_render_batch(self):
+        """Test that charts render in parallel and failures stay isolated."""
+        for chart in ("a", "b", "c"):
+            self.write_file(f"{chart}.yaml", make_chart_output(chart, 20))
+        self.write_file("bad.yaml", "---\n# Source: nowhere.yaml\nkind: A\n")
+        job_file = self.write_file(
+            "jobs.yaml",
+            "charts:\n"
+            + "".join(
+                f"  - {{input: {chart}.yaml, dir: out/{chart},"
+                f" drop_label_keys: [drop]}}\n"
+                for chart in ("a", "bad", "b", "missing", "c")
+            ),
+        )
+        jobs, workers = load_batch_jobs(job_file)
+        results = render_batch(jobs, workers)
+        self.assertEqual(
+            [result.job.name for result in results],
+            ["a.yaml", "bad.yaml", "b.yaml", "missing.yaml", "c.yaml"],
+        )
+        failed = [result.job.name for result in results if result.error]
+        self.assertEqual(failed, ["bad.yaml", "missing.yaml"])
+        for chart in ("a", "b", "c"):
+            result = results[["a", "bad", "b", "missing", "c"].index(chart)]
+            self.assertEqual(result.manifest.documents, 20)
+            with open(
+                os.path.join(self.base_dir, f"out/{chart}/doc-7.yaml"), encoding="utf-8"
+            ) as f:
+                self.assertEqual(
+                    f.read(),
+                    f"---\n# Source: {chart}/templates/doc-7.yaml\n"
+                    "metadata:\n  labels:\n    index: '7'\n",
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import RenderOptions, render
+
+HELM_OUTPUT = (
+    "---\n# Source: chart/templates/a.yaml\nkind: A\n"
+    "---\n# Source: chart/templates/sub/b.yaml\nkind: B\n"
+    "---\n# Source: chart/templates/a.yaml\nkind: C\n"
+)
+
+
+def snapshot(directory):
+    """Return the content and mtime of every file under the directory."""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            file_path = os.path.join(root, name)
+            with open(file_path, encoding="utf-8") as f:
+                files[file_path] = (f.read(), os.stat(file_path).st_mtime_ns)
+    return files
+
+
+class TestCheckWriter(unittest.TestCase):
+    """'CheckWriter' class test cases."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.target_dir = self.temp_dir.name
+        render(HELM_OUTPUT, self.target_dir, RenderOptions(kustomize_generate=True))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def check(self, **options):
+        return render(
+            HELM_OUTPUT,
+            self.target_dir,
+            RenderOptions(check=True, kustomize_generate=True, **options),
+        )
+
+    def test_matching_tree(self):
+        """Test that a tree rendered with the same options matches."""
+        manifest = self.check()
+        self.assertFalse(manifest.drifted)
+        self.assertEqual((manifest.unchanged, manifest.written), (3, 0))
+
+    def test_drift(self):
+        """Test that missing, changed and extra files are reported."""
+        with open(os.path.join(self.target_dir, "a.yaml"), "a", encoding="utf-8") as f:
+            f.write("kind: D\n")
+        os.remove(os.path.join(self.target_dir, "sub", "b.yaml"))
+        open(
+            os.path.join(self.target_dir, "sub", "old.yml"), "w", encoding="utf-8"
+        ).close()
+        manifest = self.check()
+        self.assertTrue(manifest.drifted)
+        self.assertEqual(manifest.changed, ["a.yaml"])
+        self.assertEqual(manifest.missing, ["sub/b.yaml"])
+        self.assertEqual(manifest.extra, ["sub/old.yml"])
+
+    def test_options_change_expected_files(self):
+        """Test that the kustomization.yaml is extra when not generated."""
+        manifest = render(HELM_OUTPUT, self.target_dir, RenderOptions(check=True))
+        self.assertEqual(manifest.extra, ["kustomization.yaml"])
+
+    def test_never_writes(self):
+        """Test that checking a drifted tree leaves it untouched."""
+        os.remove(os.path.join(self.target_dir, "sub", "b.yaml"))
+        before = snapshot(self.target_dir)
+        manifest = self.check(incremental=True, prune=True, atomic=True)
+        self.assertEqual(manifest.missing, ["sub/b.yaml"])
+        self.assertEqual(snapshot(self.target_dir), before)
+
+    @patch("helmYAMLizer.is_file_unchanged", side_effect=OSError("denied"))
+    def test_errors_are_raised(self, _):
+        """Test that comparison errors in threads are raised to the caller."""
+        with self.assertRaises(OSError):
+            self.check()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import glob
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import (
+    RenderOptions,
+    get_document_filter,
+    get_document_header,
+    iter_raw_documents,
+    load_document,
+    load_fast_document,
+    parse_filter_patterns,
+    render,
+    scan_document_header,
+)
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "examples")
+
+HELM_OUTPUT = (
+    "---\n# Source: chart/templates/service.yaml\n"
+    "apiVersion: v1\nkind: Service\nmetadata:\n  name: web\n"
+    "---\n# Source: chart/templates/deployment.yaml\n"
+    "apiVersion: apps/v1\nkind: Deployment\nmetadata:\n  name: web\n"
+    "---\n# Source: chart/charts/db/templates/service.yaml\n"
+    "apiVersion: v1\nkind: Service\nmetadata:\n  name: db\n"
+    "---\nkind: NoSource\n"
+)
+
+
+class TestScanDocumentHeader(unittest.TestCase):
+    """'scan_document_header' function test cases."""
+
+    def test_block_mapping(self):
+        """Test scanning the header, ignoring nested names."""
+        raw_document = (
+            "---\n# Source: a\nmetadata:\n  labels:\n    name: label\n"
+            "  name: 'it''s'\nspec:\n  name: spec\nkind: Service # comment\n"
+        )
+        self.assertEqual(
+            scan_document_header(raw_document),
+            {"apiVersion": None, "kind": "Service", "name": "it's", "namespace": None},
+        )
+
+    def test_unrecognized_values(self):
+        """Test that headers needing a parser are not guessed."""
+        for raw_document in (
+            'kind: "Ser\\x76ice"\n',
+            "kind: A\nmetadata: {name: a}\n",
+            'kind: A\nmetadata:\n  "name": a\n',
+        ):
+            self.assertIsNone(scan_document_header(raw_document), raw_document)
+
+    def test_matches_parsed_header(self):
+        """Test that scanned and parsed headers agree on the example charts."""
+        for file_path in glob.glob(f"{EXAMPLES_DIR}/**/*.yaml", recursive=True):
+            with open(file_path, encoding="utf-8") as f:
+                for raw_document in iter_raw_documents(f):
+                    self.assertEqual(
+                        scan_document_header(raw_document),
+                        get_document_header(load_fast_document(raw_document)),
+                    )
+
+
+class TestGetDocumentFilter(unittest.TestCase):
+    """'get_document_filter' function test cases."""
+
+    def test_no_patterns(self):
+        """Test that there is no filter without patterns."""
+        self.assertIsNone(get_document_filter(None, []))
+
+    def test_invalid_pattern(self):
+        """Test that unknown fields and empty globs are rejected."""
+        for pattern in ("namespace=a", "kind="):
+            with self.assertRaises(ValueError):
+                parse_filter_patterns([pattern])
+
+    def test_include_and_exclude(self):
+        """Test that excludes win over includes."""
+        document_filter = get_document_filter(["kind=Serv*", "crds/*"], ["name=db"])
+        comment = "# Source: chart/templates/service.yaml"
+        self.assertTrue(
+            document_filter(comment, "kind: Service\nmetadata:\n  name: a\n")
+        )
+        self.assertFalse(
+            document_filter(comment, "kind: Service\nmetadata:\n  name: db\n")
+        )
+        self.assertFalse(document_filter(comment, "kind: Pod\n"))
+        self.assertTrue(document_filter("# Source: crds/a.yaml", "kind: Pod\n"))
+
+    @patch("helmYAMLizer.load_fast_document", wraps=load_fast_document)
+    def test_parse_only_unscanned_headers(self, mock_load):
+        """Test that documents are only parsed when their header cannot be scanned."""
+        document_filter = get_document_filter(["name=a"], None)
+        comment = "# Source: chart/templates/a.yaml"
+        self.assertTrue(document_filter(comment, "kind: A\nmetadata:\n  name: a\n"))
+        mock_load.assert_not_called()
+        self.assertTrue(document_filter(comment, "kind: A\nmetadata: {name: a}\n"))
+        mock_load.assert_called_once()
+
+
+class TestRenderFilter(unittest.TestCase):
+    """Filtering documents while rendering test cases."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.target_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @patch("helmYAMLizer.load_document", wraps=load_document)
+    def test_filtered_documents_are_not_parsed(self, mock_load):
+        """Test that filtered out documents are counted apart and never parsed."""
+        options = RenderOptions(
+            include=["chart/templates/*"],
+            exclude=["kind=Deployment"],
+            drop_label_keys=["a"],
+        )
+        manifest = render(HELM_OUTPUT, self.target_dir, options)
+        self.assertEqual(manifest.files, ["service.yaml"])
+        self.assertEqual((manifest.filtered, manifest.skipped), (2, 1))
+        # Only the rendered document and the one without source are parsed.
+        self.assertEqual(mock_load.call_count, 2)
+
+    def test_filter_with_jobs(self):
+        """Test that pooled processing filters documents the same way."""
+        options = RenderOptions(include=["kind=Service"], drop_label_keys=["a"], jobs=2)
+        manifest = render(HELM_OUTPUT, self.target_dir, options)
+        self.assertEqual(manifest.files, ["service.yaml"])
+        self.assertEqual((manifest.documents, manifest.filtered), (2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
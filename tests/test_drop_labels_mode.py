@@ -0,0 +1,96 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import RenderOptions, compile_label_keys, get_transform
+from .utils import check_expected_logging_call
+
+
+def make_cronjob():
+    """Return a CronJob-like document with labels at every known location."""
+    labels = {"a": "value_a", "b": "value_b"}
+    return {
+        "metadata": {"labels": dict(labels)},
+        "spec": {
+            "selector": {"matchLabels": dict(labels)},
+            "jobTemplate": {
+                "metadata": {"labels": dict(labels)},
+                "spec": {"template": {"metadata": {"labels": dict(labels)}}},
+            },
+            "volumeClaimTemplates": [{"metadata": {"labels": dict(labels)}}, "x"],
+        },
+    }
+
+
+def drop_labels(data, **options):
+    """Drop the label keys 'a' from the data the way a render would."""
+    return get_transform(RenderOptions(drop_label_keys=["a"], **options))(data)
+
+
+class TestDropLabelsMode(unittest.TestCase):
+    """'--drop-labels-mode' test cases."""
+
+    def test_known_locations(self):
+        """Testing that labels are dropped at every known label location."""
+        data = drop_labels(make_cronjob())
+        job_template = data["spec"]["jobTemplate"]
+        self.assertEqual(data["metadata"]["labels"], {"b": "value_b"})
+        self.assertEqual(job_template["metadata"]["labels"], {"b": "value_b"})
+        self.assertEqual(
+            job_template["spec"]["template"]["metadata"]["labels"], {"b": "value_b"}
+        )
+        self.assertEqual(
+            data["spec"]["volumeClaimTemplates"][0]["metadata"]["labels"],
+            {"b": "value_b"},
+        )
+        # Selectors are left intact unless requested.
+        self.assertIn("a", data["spec"]["selector"]["matchLabels"])
+
+    def test_selectors_when_requested(self):
+        """Testing that selectors are only visited when requested."""
+        data = drop_labels(make_cronjob(), drop_selector_labels=True)
+        self.assertEqual(data["spec"]["selector"]["matchLabels"], {"b": "value_b"})
+
+    def test_schema_properties_are_kept(self):
+        """Testing that 'labels' properties nested in CRD schemas are untouched."""
+        schema = {"properties": {"labels": {"a": {"type": "string"}}}}
+        data = {
+            "metadata": {"labels": {"a": "value_a"}, "annotations": None},
+            "spec": {"versions": [{"schema": schema}]},
+        }
+        drop_labels(data)
+        self.assertEqual(data["metadata"]["labels"], {})
+        self.assertIn("a", schema["properties"]["labels"])
+
+    def test_missing_or_null_locations(self):
+        """Testing documents without labels or with null labels."""
+        self.assertEqual(drop_labels({}), {})
+        data = {"metadata": {"labels": None}, "spec": None}
+        self.assertEqual(drop_labels(data), data)
+
+    def test_recursive_mode(self):
+        """Testing that the recursive mode keeps the previous behavior."""
+        schema = {"properties": {"labels": {"a": {"type": "string"}}}}
+        data = drop_labels({"spec": {"schema": schema}}, drop_labels_mode="recursive")
+        self.assertNotIn("a", schema["properties"]["labels"])
+        self.assertEqual(data, {"spec": {"schema": schema}})
+        self.assertIsNone(get_transform(RenderOptions(drop_label_keys=[])))
+
+    @patch("helmYAMLizer.sys.exit")
+    @patch("helmYAMLizer.logging.fatal")
+    def test_invalid_label_keys(self, mock_logging, mock_exit):
+        """Testing with invalid label keys (not all are strings)."""
+        compile_label_keys(["a", 123])
+        error_msg = "label_keys must be a list of strings."
+        self.assertTrue(
+            check_expected_logging_call(
+                mock_logging, "compile_label_keys", ValueError, error_msg
+            ),
+            "Expected logging call not found.",
+        )
+        mock_exit.assert_called_once_with(1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import glob
+import io
+import os
+import tempfile
+import unittest
+from helmYAMLizer import (
+    RenderOptions,
+    get_render_cache,
+    iter_raw_documents,
+    iter_render,
+    load_document,
+    load_fast_document,
+    render,
+    serialize_fast_document,
+)
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "examples")
+
+HELM_OUTPUT = (
+    "---\n# Source: chart/templates/a.yaml\n"
+    "# A comment the fast emitter drops.\nmetadata:\n"
+    "  labels:\n    drop: me\n    keep: me\n"
+    'data:\n  enabled: "yes"\n  plain: on\n  mode: 0755\n  verbs: ["get", list]\n'
+    "  script: |\n    echo one\n    echo two\n"
+    "---\nkind: NoSource\n"
+    "---\n# Source: chart/templates/sub/b.yaml\nkind: B\n"
+)
+
+
+class TestFastEmitter(unittest.TestCase):
+    """'serialize_fast_document' with the fast emitter test cases."""
+
+    def test_roundtrip_document(self):
+        """Test that round-trip data keeps its key order and quotes."""
+        text = serialize_fast_document(
+            "# Source: a.yaml",
+            load_document("---\n# Source: a.yaml\nz: 'x'\na: \"on\"\nb: [1, 0x1f]\n"),
+            "fast",
+        )
+        self.assertEqual(
+            text, "---\n# Source: a.yaml\nz: 'x'\na: \"on\"\nb:\n- 1\n- 0x1f\n"
+        )
+
+    def test_plain_strings_follow_yaml_1_1(self):
+        """Test that strings Kubernetes would read as booleans are quoted."""
+        text = serialize_fast_document(
+            "# Source: a.yaml", {"a": "on", "b": "0755", "c": "one\ntwo\n"}, "fast"
+        )
+        self.assertEqual(
+            text, "---\n# Source: a.yaml\na: 'on'\nb: '0755'\nc: |\n  one\n  two\n"
+        )
+
+    def test_tagged_values_fall_back(self):
+        """Test that values only the round-trip emitter knows are still written."""
+        raw_document = "---\n# Source: a.yaml\na: !custom value\n"
+        self.assertEqual(
+            serialize_fast_document(
+                "# Source: a.yaml", load_document(raw_document), "fast"
+            ),
+            raw_document,
+        )
+
+    def test_example_charts_keep_their_meaning(self):
+        """Test that both emitters write the same data for the example charts."""
+        for file_path in glob.glob(f"{EXAMPLES_DIR}/nginx/**/*.yaml", recursive=True):
+            with open(file_path, encoding="utf-8") as f:
+                text = f.read()
+            for loader in ("roundtrip", "fast"):
+                files = [
+                    dict(
+                        iter_render(
+                            text, RenderOptions(["x"], loader=loader, emitter=emitter)
+                        )
+                    )
+                    for emitter in ("roundtrip", "fast")
+                ]
+                self.assertEqual(files[0].keys(), files[1].keys())
+                for path, expected in files[0].items():
+                    self.assertEqual(
+                        load_fast_document(files[1][path]),
+                        load_fast_document(expected),
+                    )
+                    self.assertEqual(
+                        expected.splitlines()[:2], files[1][path].splitlines()[:2]
+                    )
+
+    def test_render_fast(self):
+        """Test rendering with the fast emitter, serially and in a pool."""
+        with tempfile.TemporaryDirectory() as target_dir:
+            for jobs in (1, 2):
+                options = RenderOptions(
+                    drop_label_keys=["drop"], emitter="fast", jobs=jobs
+                )
+                manifest = render(HELM_OUTPUT, target_dir, options)
+                self.assertEqual(manifest.files, ["a.yaml", "sub/b.yaml"])
+                with open(os.path.join(target_dir, "a.yaml"), encoding="utf-8") as f:
+                    self.assertEqual(
+                        f.read(),
+                        "---\n# Source: chart/templates/a.yaml\nmetadata:\n"
+                        '  labels:\n    keep: me\ndata:\n  enabled: "yes"\n'
+                        "  plain: 'on'\n  mode: 0755\n  verbs:\n  - \"get\"\n"
+                        "  - list\n  script: |\n    echo one\n    echo two\n",
+                    )
+
+    def test_cache_namespace(self):
+        """Test that cached documents are not shared between emitters."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            caches = [
+                get_render_cache(
+                    RenderOptions(["a"], cache_dir=cache_dir, emitter=emitter)
+                )
+                for emitter in ("roundtrip", "fast")
+            ]
+            keys = [cache.key("kind: A\n") for cache in caches]
+            for cache in caches:
+                cache.close()
+        self.assertNotEqual(*keys)
+
+    def test_stream(self):
+        """Test that the fast emitter output splits back into documents."""
+        files = dict(iter_render(HELM_OUTPUT, RenderOptions(["drop"], emitter="fast")))
+        stream = io.StringIO("".join(files.values()))
+        self.assertEqual(len(list(iter_raw_documents(stream))), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
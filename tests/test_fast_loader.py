@@ -0,0 +1,77 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import os
+import tempfile
+import unittest
+import warnings
+from helmYAMLizer import (
+    RenderOptions,
+    load_fast_document,
+    render,
+    serialize_fast_document,
+)
+
+HELM_OUTPUT = (
+    "---\n# Source: chart/templates/a.yaml\n"
+    "# A comment the fast loader drops.\nmetadata:\n"
+    "  labels:\n    drop: me\n    keep: me\n"
+    'data:\n  enabled: "yes"\n  mode: 0755\n  script: |\n    echo one\n    echo two\n'
+    "---\nkind: NoSource\n"
+    "---\n# Source: chart/templates/sub/b.yaml\nkind: B\n"
+)
+
+
+class TestFastLoader(unittest.TestCase):
+    """'load_fast_document' and 'serialize_fast_document' test cases."""
+
+    def test_load_follows_yaml_1_1(self):
+        """Test that scalars are resolved the way Kubernetes resolves them."""
+        # Importing ruamel.yaml adds filters of its own.
+        load_fast_document("a: 1\n")
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            filters = list(warnings.filters)
+            document = load_fast_document("a: 0755\nb: 'yes'\nc: on\nd: 1e3\n")
+            # The float warning is silenced without touching the filters.
+            self.assertEqual(caught, [])
+            self.assertEqual(warnings.filters, filters)
+        self.assertEqual(document, {"a": 493, "b": "yes", "c": True, "d": 1000.0})
+
+    def test_serialize_restores_source_comment(self):
+        """Test that the source comment follows the start marker."""
+        text = serialize_fast_document(
+            "# Source: a.yaml", {"kind": "A", "b": "yes", "c": "one\ntwo\n"}
+        )
+        self.assertEqual(
+            text, "---\n# Source: a.yaml\nkind: A\nb: 'yes'\nc: |\n  one\n  two\n"
+        )
+
+    def test_serialize_inline_document(self):
+        """Test that documents sharing the line of the marker are split."""
+        self.assertEqual(
+            serialize_fast_document("# Source: a.yaml", {}),
+            "---\n# Source: a.yaml\n{}\n",
+        )
+
+    def test_render_fast(self):
+        """Test rendering with the fast loader, serially and in a pool."""
+        with tempfile.TemporaryDirectory() as target_dir:
+            for jobs in (1, 2):
+                options = RenderOptions(
+                    drop_label_keys=["drop"], loader="fast", jobs=jobs
+                )
+                manifest = render(HELM_OUTPUT, target_dir, options)
+                self.assertEqual(manifest.files, ["a.yaml", "sub/b.yaml"])
+                self.assertEqual(manifest.skipped, 1)
+                with open(os.path.join(target_dir, "a.yaml"), encoding="utf-8") as f:
+                    self.assertEqual(
+                        f.read(),
+                        "---\n# Source: chart/templates/a.yaml\nmetadata:\n"
+                        "  labels:\n    keep: me\ndata:\n  enabled: 'yes'\n"
+                        "  mode: 493\n  script: |\n    echo one\n    echo two\n",
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import (
+    FusedTransform,
+    PathTransform,
+    RenderOptions,
+    RunStats,
+    get_transform,
+    iter_render,
+    load_document,
+)
+
+JOB = """---
+# Source: chart/templates/job.yaml
+apiVersion: batch/v1
+kind: Job
+metadata:
+  name: migrate
+  labels:
+    helm.sh/chart: chart-1.0.0
+    app: chart
+  annotations:
+    helm.sh/hook: pre-install
+    helm.sh/hook-weight: "1"
+    meta.helm.sh/release-name: release
+    note: keep
+spec:
+  template:
+    metadata:
+      annotations:
+        checksum/config: abc
+        note: keep
+"""
+
+HELM_OUTPUT = JOB + """---
+# Source: chart/templates/role.yaml
+apiVersion: rbac.authorization.k8s.io/v1
+kind: ClusterRole
+metadata:
+  name: reader
+"""
+
+
+def record(node, visited, name):
+    """Record the node a transform is applied to."""
+    visited.append((name, dict(node)))
+
+
+class TestFusedTransform(unittest.TestCase):
+    """'FusedTransform' class test cases."""
+
+    def test_single_traversal(self):
+        """Test that shared path prefixes are only looked up once."""
+        visited = []
+        transform = FusedTransform(
+            [
+                PathTransform(
+                    "one",
+                    (("metadata", "labels"),),
+                    lambda node: record(node, visited, "one"),
+                ),
+                PathTransform(
+                    "two",
+                    (("metadata", "labels"), ("metadata",)),
+                    lambda node: record(node, visited, "two"),
+                ),
+            ]
+        )
+        self.assertEqual(list(transform.root.children), ["metadata"])
+        transform({"metadata": {"labels": {"a": 1}}, "spec": {"metadata": {}}})
+        self.assertEqual(
+            visited,
+            [
+                ("two", {"labels": {"a": 1}}),
+                ("one", {"a": 1}),
+                ("two", {"a": 1}),
+            ],
+        )
+
+    def test_list_items(self):
+        """Test that '*' keys visit every item of a list."""
+        visited = []
+        transform = FusedTransform(
+            [PathTransform("items", (("items", "*"),), visited.append)]
+        )
+        transform({"items": [{"a": 1}, {"b": 2}]})
+        transform({"items": {"a": 1}})
+        self.assertEqual(visited, [{"a": 1}, {"b": 2}])
+
+    def test_timings_per_transform(self):
+        """Test that each transform reports its own stage."""
+        transform = get_transform(
+            RenderOptions(drop_label_keys=["helm.sh/chart"], strip_helm_hooks=True)
+        )
+        stats = RunStats()
+        transform(load_document(JOB), stats)
+        self.assertEqual(
+            sorted(stats.stages),
+            ["transform.drop-labels", "transform.strip-helm-hooks"],
+        )
+        self.assertEqual(stats.stages["transform.strip-helm-hooks"][2], 1)
+
+
+class TestPathTransforms(unittest.TestCase):
+    """Path transforms requested by the render options test cases."""
+
+    def render(self, **options):
+        return dict(iter_render(HELM_OUTPUT, RenderOptions(**options)))
+
+    def test_no_transform(self):
+        """Test that there is nothing to fuse without options."""
+        self.assertIsNone(get_transform(RenderOptions()))
+
+    def test_all_transforms(self):
+        """Test combining every transform in one pass."""
+        files = self.render(
+            drop_label_keys=["helm.sh/chart"],
+            drop_annotations=["meta.helm.sh/*", "checksum/*"],
+            strip_helm_hooks=True,
+            namespace="prod",
+        )
+        self.assertEqual(
+            files["job.yaml"],
+            """---
+# Source: chart/templates/job.yaml
+apiVersion: batch/v1
+kind: Job
+metadata:
+  name: migrate
+  namespace: prod
+  labels:
+    app: chart
+  annotations:
+    note: keep
+spec:
+  template:
+    metadata:
+      annotations:
+        note: keep
+""",
+        )
+        # Cluster-wide resources never get a namespace.
+        self.assertNotIn("namespace", files["role.yaml"])
+
+    def test_fast_loader_namespace(self):
+        """Test that the namespace is also set on plain mappings."""
+        files = self.render(namespace="prod", loader="fast")
+        self.assertIn("namespace: prod", files["job.yaml"])
+
+    @patch("helmYAMLizer.drop_matching_keys")
+    def test_annotations_only_at_known_paths(self, mock_drop):
+        """Test that annotations are only looked for at their locations."""
+        self.render(drop_annotations=["*"])
+        self.assertEqual(
+            [call.args[0] for call in mock_drop.call_args_list],
+            [
+                load_document(JOB)["metadata"]["annotations"],
+                {"checksum/config": "abc", "note": "keep"},
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
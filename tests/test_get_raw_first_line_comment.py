@@ -0,0 +1,73 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import glob
+import os
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import (
+    get_first_line_comment,
+    get_raw_first_line_comment,
+    iter_raw_documents,
+    load_document,
+)
+from .utils import check_expected_logging_call
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "examples")
+
+
+class TestGetRawFirstLineComment(unittest.TestCase):
+    """'get_raw_first_line_comment' function test cases."""
+
+    def test_document_with_comment(self):
+        """Test retrieving the comment that directly follows the start marker."""
+        raw_document = "---\n# Source: a/templates/a.yaml \nkind: A\n"
+        self.assertEqual(
+            get_raw_first_line_comment(raw_document), "# Source: a/templates/a.yaml"
+        )
+
+    def test_document_without_marker(self):
+        """Test retrieving the comment of a document without a start marker."""
+        raw_document = "# Source: a/templates/a.yaml\nkind: A\n"
+        self.assertEqual(
+            get_raw_first_line_comment(raw_document), "# Source: a/templates/a.yaml"
+        )
+
+    def test_document_with_no_comment(self):
+        """Test that documents not starting with a comment are ignored."""
+        self.assertIsNone(get_raw_first_line_comment("---\nkind: A\n"))
+        self.assertIsNone(get_raw_first_line_comment("---\n\n# Source: a\nkind: A\n"))
+
+    def test_document_without_mapping_body(self):
+        """Test that comment-only and sequence documents are ignored."""
+        self.assertIsNone(get_raw_first_line_comment("---\n# Source: a\n"))
+        self.assertIsNone(get_raw_first_line_comment("---\n# Source: a\n# b\n\n"))
+        self.assertIsNone(get_raw_first_line_comment("---\n# Source: a\n- item\n"))
+
+    def test_matches_parsed_comment(self):
+        """Test that raw and parsed comments agree on the example charts."""
+        for file_path in glob.glob(f"{EXAMPLES_DIR}/nginx/**/*.yaml", recursive=True):
+            with open(file_path, encoding="utf-8") as f:
+                for raw_document in iter_raw_documents(f):
+                    self.assertEqual(
+                        get_raw_first_line_comment(raw_document),
+                        get_first_line_comment(load_document(raw_document)),
+                    )
+
+    @patch("helmYAMLizer.sys.exit")
+    @patch("helmYAMLizer.logging.fatal")
+    def test_non_string_document(self, mock_logging, mock_exit):
+        """Test failure when providing a non-string raw document."""
+        get_raw_first_line_comment({})
+        error_msg = "Expected a string for raw document, but got <class 'dict'>."
+        self.assertTrue(
+            check_expected_logging_call(
+                mock_logging, "get_raw_first_line_comment", ValueError, error_msg
+            ),
+            "Expected logging call not found.",
+        )
+        mock_exit.assert_called_once_with(1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import os
+import stat
+import tempfile
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import HelmError, iter_helm_template, render
+
+# A fake 'helm' printing its arguments to stderr, two documents to stdout with
+# a pause in between, and exiting with the code given in the environment.
+FAKE_HELM = """#!/bin/sh
+echo "args: $*" >&2
+printf -- '---\\n# Source: chart/templates/a.yaml\\nkind: A\\n'
+# Wait for the reader to see the first document before finishing.
+if [ -n "$FAKE_HELM_FLAG" ]; then
+  for _ in $(seq 50); do [ -e "$FAKE_HELM_FLAG" ] && break; sleep 0.1; done
+  [ -e "$FAKE_HELM_FLAG" ] || exit 9
+fi
+printf -- '---\\n# Source: chart/templates/b.yaml\\nkind: B\\n'
+exit "${FAKE_HELM_EXIT:-0}"
+"""
+
+
+class TestIterHelmTemplate(unittest.TestCase):
+    """'iter_helm_template' function test cases."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        helm_path = os.path.join(self.temp_dir.name, "helm")
+        with open(helm_path, "w", encoding="utf-8") as f:
+            f.write(FAKE_HELM)
+        os.chmod(helm_path, os.stat(helm_path).st_mode | stat.S_IXUSR)
+        path = self.temp_dir.name + os.pathsep + os.environ.get("PATH", "")
+        self.environ = patch.dict(os.environ, {"PATH": path})
+        self.environ.start()
+        os.environ.pop("HELM_BIN", None)
+
+    def tearDown(self):
+        self.environ.stop()
+        self.temp_dir.cleanup()
+
+    @patch("helmYAMLizer.logging.warning")
+    def test_yields_output_and_logs_stderr(self, mock_logging):
+        """Test that the output is yielded and stderr is logged."""
+        lines = list(iter_helm_template("./chart", ["--set", "a=b"]))
+        self.assertEqual(lines[1], "# Source: chart/templates/a.yaml\n")
+        self.assertEqual(len(lines), 6)
+        mock_logging.assert_called_once_with(
+            "helm: %s", "args: template ./chart --set a=b"
+        )
+
+    def test_output_is_streamed(self):
+        """Test that documents are yielded while helm is still running."""
+        flag_path = os.path.join(self.temp_dir.name, "flag")
+        os.environ["FAKE_HELM_FLAG"] = flag_path
+        lines = iter_helm_template("./chart", [])
+        self.assertEqual(next(lines), "---\n")
+        with open(flag_path, "w", encoding="utf-8"):
+            pass
+        self.assertEqual(len(list(lines)), 5)
+
+    def test_failure_raises_helm_error(self):
+        """Test that a failing helm raises its exit code and stderr."""
+        os.environ["FAKE_HELM_EXIT"] = "3"
+        with self.assertRaises(HelmError) as context:
+            list(iter_helm_template("./chart", []))
+        self.assertEqual(context.exception.returncode, 3)
+        self.assertEqual(context.exception.stderr, "args: template ./chart")
+
+    def test_missing_binary_raises_helm_error(self):
+        """Test that a missing helm binary is reported like a shell would."""
+        os.environ["HELM_BIN"] = os.path.join(self.temp_dir.name, "missing")
+        with self.assertRaises(HelmError) as context:
+            list(iter_helm_template("./chart", []))
+        self.assertEqual(context.exception.returncode, 127)
+
+    def test_render_helm_output(self):
+        """Test rendering the output of helm into files."""
+        target_dir = os.path.join(self.temp_dir.name, "out")
+        with patch("helmYAMLizer.logging.warning"):
+            manifest = render(iter_helm_template("./chart", []), target_dir)
+        self.assertEqual(manifest.files, ["a.yaml", "b.yaml"])
+
+
+if __name__ == "__main__":
+    unittest.main()
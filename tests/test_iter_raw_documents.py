@@ -0,0 +1,99 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import io
+import subprocess
+import sys
+import unittest
+from helmYAMLizer import iter_raw_documents, load_document
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+# Child script measuring the peak RSS of splitting a synthetic stream of the
+# requested size (in documents) without ever holding the whole stream.
+RSS_PROBE = """
+import resource, sys
+from helmYAMLizer import iter_raw_documents
+
+def generate(count):
+    for index in range(count):
+        yield "---\\n"
+        yield "# Source: chart/templates/cm-%d.yaml\\n" % index
+        yield "apiVersion: v1\\nkind: ConfigMap\\ndata:\\n"
+        for line in range(100):
+            yield "  key%d: %s\\n" % (line, "x" * 80)
+
+for _ in iter_raw_documents(generate(int(sys.argv[1]))):
+    pass
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+class TestIterRawDocuments(unittest.TestCase):
+    """'iter_raw_documents' function test cases."""
+
+    def test_split_on_start_markers(self):
+        """Test splitting a helm template stream into raw documents."""
+        stream = io.StringIO(
+            "---\n# Source: a/templates/a.yaml\nkind: A\n"
+            "---\n# Source: a/templates/b.yaml\nkind: B\n"
+        )
+        self.assertEqual(
+            list(iter_raw_documents(stream)),
+            [
+                "---\n# Source: a/templates/a.yaml\nkind: A\n",
+                "---\n# Source: a/templates/b.yaml\nkind: B\n",
+            ],
+        )
+
+    def test_first_document_without_marker(self):
+        """Test that a leading document without a start marker is kept."""
+        stream = io.StringIO("kind: A\n---\nkind: B\n")
+        self.assertEqual(
+            list(iter_raw_documents(stream)), ["kind: A\n", "---\nkind: B\n"]
+        )
+
+    def test_blank_chunks_are_skipped(self):
+        """Test that blank input between markers does not produce documents."""
+        stream = io.StringIO("\n\n---\nkind: A\n")
+        self.assertEqual(list(iter_raw_documents(stream)), ["---\nkind: A\n"])
+        self.assertEqual(list(iter_raw_documents(io.StringIO(""))), [])
+
+    def test_indented_marker_is_content(self):
+        """Test that '---' inside an indented block scalar is not a boundary."""
+        stream = io.StringIO("---\ndata:\n  script: |\n    ---\n    echo\n")
+        documents = list(iter_raw_documents(stream))
+        self.assertEqual(len(documents), 1)
+        self.assertEqual(load_document(documents[0])["data"]["script"], "---\necho\n")
+
+    def test_is_lazy(self):
+        """Test that documents are yielded before the input is exhausted."""
+
+        def lines():
+            yield "---\n"
+            yield "kind: A\n"
+            yield "---\n"
+            raise AssertionError("Input consumed beyond the first document.")
+
+        self.assertEqual(next(iter_raw_documents(lines())), "---\nkind: A\n")
+
+    @unittest.skipIf(resource is None, "resource module is not available")
+    def test_peak_rss_is_independent_of_input_size(self):
+        """Test that peak RSS stays flat when the input grows 16 times."""
+
+        def peak_rss(count):
+            output = subprocess.check_output(
+                [sys.executable, "-c", RSS_PROBE, str(count)], text=True
+            )
+            return int(output.strip())
+
+        # ~4MB versus ~68MB of input; ru_maxrss is reported in KiB on Linux.
+        small, large = peak_rss(500), peak_rss(8000)
+        self.assertLess(large - small, 8 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import (
+    DocumentError,
+    RenderOptions,
+    get_transform,
+    iter_transformed_documents,
+    serialize_document,
+    transform_document,
+    load_document,
+    raising_errors,
+)
+
+RAW_DOCUMENTS = [
+    "---\n# Source: chart/templates/a.yaml\nmetadata:\n"
+    "  labels:\n    drop: me\n    keep: me\n",
+    "---\nkind: NoSource\n",
+    "---\n# Source: chart/templates/b.yaml\nkind: B\n",
+]
+
+
+class TestIterTransformedDocuments(unittest.TestCase):
+    """'iter_transformed_documents' function test cases."""
+
+    def test_serialize_document(self):
+        """Test that a parsed document serializes back to the same YAML."""
+        self.assertEqual(
+            serialize_document(load_document(RAW_DOCUMENTS[2])), RAW_DOCUMENTS[2]
+        )
+
+    @patch("helmYAMLizer.worker_transform", get_transform(RenderOptions(["drop"])))
+    def test_transform_document(self):
+        """Test transforming a single document the way a worker does."""
+        with raising_errors():
+            result = transform_document((1, RAW_DOCUMENTS[0]))
+        self.assertEqual(
+            result[:4],
+            (
+                1,
+                "# Source: chart/templates/a.yaml",
+                "a.yaml",
+                "---\n# Source: chart/templates/a.yaml\nmetadata:\n"
+                "  labels:\n    keep: me\n",
+            ),
+        )
+        # Worker stage timings are sent back with the result.
+        self.assertEqual(
+            sorted(result[4]),
+            [
+                "comment",
+                "parse",
+                "path",
+                "serialize",
+                "transform",
+                "transform.drop-labels",
+            ],
+        )
+        result = transform_document((2, RAW_DOCUMENTS[1]))
+        self.assertEqual(result[:4], (2, None, None, None))
+
+    def test_transform_document_error(self):
+        """Test that worker errors carry the document index."""
+        with self.assertRaises(DocumentError) as context:
+            with raising_errors():
+                transform_document((7, "---\n# Source: nowhere.yaml\nkind: A\n"))
+        self.assertEqual(context.exception.index, 7)
+        self.assertIn("flatten_source_path", str(context.exception))
+
+    def test_results_keep_input_order(self):
+        """Test that pooled results are yielded in input order."""
+        results = list(
+            iter_transformed_documents(
+                RAW_DOCUMENTS * 5, get_transform(RenderOptions(["drop"])), 2
+            )
+        )
+        self.assertEqual([result[0] for result in results], list(range(1, 16)))
+        self.assertEqual(
+            [result[2] for result in results[:3]], ["a.yaml", None, "b.yaml"]
+        )
+        self.assertNotIn("drop: me", results[0][3])
+
+    def test_worker_errors_are_raised(self):
+        """Test that errors raised in workers reach the parent with the index."""
+        raw_documents = RAW_DOCUMENTS + ["---\n# Source: nowhere.yaml\nkind: A\n"]
+        with self.assertRaises(DocumentError) as context:
+            list(iter_transformed_documents(raw_documents, None, 2))
+        self.assertEqual(context.exception.index, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
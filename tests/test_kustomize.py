@@ -11,6 +11,8 @@ from helmYAMLizer import (
     create_kustom_data,
     save_kustom_data,
     generate_kustomize_file,
+    generate_kustomize_files,
+    group_kustomize_resources,
 )
 
 
@@ -93,6 +95,48 @@ class TestKustomizeFileGenFunctions(unittest.TestCase):
         generate_kustomize_file("/testdir")
         mock_save.assert_not_called()
 
+    @patch("helmYAMLizer.collect_yaml_files")
+    @patch("helmYAMLizer.save_kustom_data")
+    def test_generate_kustomize_file_from_rendered_paths(self, mock_save, mock_collect):
+        """
+        Test that generate_kustomize_file uses the rendered paths when they are
+        given instead of scanning the directory.
+        """
+        generate_kustomize_file("/testdir", {"b.yaml", "sub/a.yaml", "c.txt"})
+        mock_collect.assert_not_called()
+        kustom_data = mock_save.call_args[0][1]
+        self.assertEqual(kustom_data["resources"], ["b.yaml", "sub/a.yaml"])
+
+    def test_group_kustomize_resources(self):
+        """
+        Test the group_kustomize_resources function to ensure every folder lists
+        its own files and its direct subfolders.
+        """
+        result = group_kustomize_resources(
+            ["a.yaml", "x/b.yaml", "x/y/z/c.yaml", "x/y/z/d.yaml", "notes.txt"]
+        )
+        self.assertEqual(
+            result,
+            {
+                "": ["a.yaml", "x"],
+                "x": ["b.yaml", "y"],
+                "x/y": ["z"],
+                "x/y/z": ["c.yaml", "d.yaml"],
+            },
+        )
+
+    @patch("helmYAMLizer.save_kustom_data")
+    def test_generate_kustomize_files(self, mock_save):
+        """
+        Test the generate_kustomize_files function to ensure a kustomization is
+        saved in every folder of the rendered tree.
+        """
+        generate_kustomize_files("/testdir", ["a.yaml", "x/b.yaml"])
+        saved = {
+            call[0][0]: call[0][1]["resources"] for call in mock_save.call_args_list
+        }
+        self.assertEqual(saved, {"/testdir": ["a.yaml", "x"], "/testdir/x": ["b.yaml"]})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,73 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=invalid-name
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CHART = """---
+# Source: chart/templates/service.yaml
+apiVersion: v1
+kind: Service
+metadata:
+  name: release-chart
+"""
+
+# Modules only needed on first use, as in 'benchmarks/bench_startup.py'.
+LAZY_MODULES = (
+    "ruamel.yaml",
+    "concurrent.futures.process",
+    "socketserver",
+    "socket",
+    "subprocess",
+    "tempfile",
+    "mmap",
+)
+
+
+def loaded_modules(code: str, stdin: str = "") -> str:
+    """Run the code in a fresh interpreter and return the heavy modules it loaded."""
+    script = (
+        "import sys\n"
+        f"{code}\n"
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT_DIR,
+        input=stdin,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_import(self):
+        self.assertEqual(loaded_modules("import helmYAMLizer"), "")
+
+    def test_passthrough_run(self):
+        with tempfile.TemporaryDirectory() as target_dir:
+            code = (
+                "import helmYAMLizer\n"
+                f"sys.argv = ['helmYAMLizer', '--dir', {target_dir!r}]\n"
+                "helmYAMLizer.main()"
+            )
+            self.assertEqual(loaded_modules(code, CHART), "")
+            self.assertTrue(os.path.exists(os.path.join(target_dir, "service.yaml")))
+
+    def test_yaml_created_on_first_use(self):
+        code = "import helmYAMLizer\nhelmYAMLizer.yaml.dump({'a': 1}, sys.stdout)"
+        self.assertEqual(loaded_modules(code), "ruamel.yaml")
+
+
+if __name__ == "__main__":
+    unittest.main()
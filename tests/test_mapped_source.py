@@ -0,0 +1,94 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import glob
+import io
+import os
+import tempfile
+import unittest
+from contextlib import closing
+from unittest.mock import patch
+from helmYAMLizer import (
+    MappedSource,
+    RenderOptions,
+    iter_raw_documents,
+    iter_render,
+    render,
+)
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "examples")
+
+HELM_OUTPUT = (
+    "---\n# Source: chart/templates/a.yaml\nmetadata:\n  labels:\n    drop: me\n"
+    "---\nkind: NoSource\n"
+    "---\n# Source: chart/templates/sub/b.yaml\r\nkind: B\r\n"
+    "\n---\n\n"
+)
+
+
+class TestMappedSource(unittest.TestCase):
+    """'MappedSource' class test cases."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.file_path = os.path.join(self.temp_dir.name, "input.yaml")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def map_text(self, text):
+        with open(self.file_path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        return closing(MappedSource(self.file_path))
+
+    def test_documents_match_stream(self):
+        """Test that mapped documents are split like streamed ones."""
+        for text in (HELM_OUTPUT, "", "\n\n", "kind: A\n---\nkind: B", "---x\n"):
+            with self.map_text(text) as source:
+                self.assertEqual(
+                    list(source),
+                    list(iter_raw_documents(io.StringIO(text, newline=""))),
+                )
+
+    def test_example_charts(self):
+        """Test that the example charts split the same way."""
+        for file_path in glob.glob(f"{EXAMPLES_DIR}/**/*.yaml", recursive=True):
+            with open(file_path, encoding="utf-8", newline="") as f:
+                text = f.read()
+            with self.map_text(text) as source:
+                documents = list(iter_raw_documents(io.StringIO(text, newline="")))
+                self.assertEqual(len(source), len(documents))
+                self.assertEqual(source.read(source.spans[-1]), documents[-1])
+
+    def test_render(self):
+        """Test that rendering a mapped file gives the same files."""
+        options = RenderOptions(drop_label_keys=["drop"])
+        with self.map_text(HELM_OUTPUT) as source:
+            self.assertEqual(
+                list(iter_render(source, options)),
+                list(iter_render(HELM_OUTPUT, options)),
+            )
+
+    def test_workers_read_their_documents(self):
+        """Test that pool workers are only sent the offsets of documents."""
+        target_dir = os.path.join(self.temp_dir.name, "out")
+        options = RenderOptions(drop_label_keys=["drop"], jobs=2)
+        with self.map_text(HELM_OUTPUT) as source:
+            # Without filter nor cache, the parent never decodes a document.
+            with patch.object(source, "read", side_effect=AssertionError):
+                manifest = render(source, target_dir, options)
+        self.assertEqual(manifest.files, ["a.yaml", "sub/b.yaml"])
+        with open(os.path.join(target_dir, "sub", "b.yaml"), encoding="utf-8") as f:
+            self.assertIn("kind: B", f.read())
+
+    def test_filter_with_workers(self):
+        """Test that filtered out mapped documents are not sent to workers."""
+        target_dir = os.path.join(self.temp_dir.name, "out")
+        options = RenderOptions(drop_label_keys=["drop"], jobs=2, exclude=["kind=B"])
+        with self.map_text(HELM_OUTPUT) as source:
+            manifest = render(source, target_dir, options)
+        self.assertEqual((manifest.files, manifest.filtered), (["a.yaml"], 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
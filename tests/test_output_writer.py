@@ -0,0 +1,381 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import (
+    MANIFEST_FILE_NAME,
+    WRITE_QUEUE_SIZE,
+    DocumentError,
+    OutputWriter,
+    RenderError,
+    ensure_dirs_exists,
+    load_output_manifest,
+    raising_errors,
+    save_bytes_to_file,
+)
+
+
+class TestOutputWriter(unittest.TestCase):
+    """'OutputWriter' class test cases."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.target_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def render(self, files, **kwargs):
+        """Write the files with a new writer and return it."""
+        writer = OutputWriter(self.target_dir, **kwargs)
+        for relative_path, text in files.items():
+            writer.write(relative_path, text)
+        writer.close()
+        return writer
+
+    def test_write_creates_files(self):
+        """Test that files are written without a manifest by default."""
+        writer = self.render({"a.yaml": "a: 1\n", "sub/b.yaml": "b: 2\n"})
+        self.assertEqual(writer.written, 2)
+        with open(os.path.join(self.target_dir, "sub/b.yaml"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "b: 2\n")
+        self.assertFalse(
+            os.path.exists(os.path.join(self.target_dir, MANIFEST_FILE_NAME))
+        )
+
+    def test_incremental_skips_unchanged_files(self):
+        """Test that unchanged files are not rewritten."""
+        self.render({"a.yaml": "a: 1\n", "b.yaml": "b: 2\n"}, incremental=True)
+        with patch("helmYAMLizer.save_bytes_to_file") as mock_save:
+            writer = self.render(
+                {"a.yaml": "a: 1\n", "b.yaml": "b: 3\n"}, incremental=True
+            )
+        # The manifest is saved too, as the record of the changed file differs.
+        self.assertEqual(
+            [call.args[0] for call in mock_save.call_args_list],
+            [
+                os.path.join(self.target_dir, "b.yaml"),
+                os.path.join(self.target_dir, MANIFEST_FILE_NAME),
+            ],
+        )
+        self.assertEqual((writer.written, writer.unchanged), (1, 1))
+
+    def test_incremental_keeps_manifest_and_kustomization(self):
+        """Test that a run changing nothing leaves every file untouched."""
+
+        def render():
+            writer = OutputWriter(self.target_dir, incremental=True)
+            writer.write("a.yaml", "a: 1\n")
+            writer.write("sub/b.yaml", "b: 2\n")
+            writer.write_kustomize_files(split=True)
+            writer.close()
+            return writer
+
+        self.assertEqual(render().written, 4)
+        with patch("helmYAMLizer.save_bytes_to_file") as mock_save:
+            writer = render()
+        mock_save.assert_not_called()
+        self.assertEqual((writer.written, writer.unchanged), (0, 4))
+
+    def test_incremental_detects_changes_on_disk(self):
+        """Test that files edited after the previous run are rewritten."""
+        self.render({"a.yaml": "a: 1\n"}, incremental=True)
+        with open(os.path.join(self.target_dir, "a.yaml"), "w", encoding="utf-8") as f:
+            f.write("a: 2\n")
+        writer = self.render({"a.yaml": "a: 1\n"}, incremental=True)
+        self.assertEqual((writer.written, writer.unchanged), (1, 0))
+
+    def test_incremental_without_manifest_compares_content(self):
+        """Test that existing files are compared even without a manifest."""
+        self.render({"a.yaml": "a: 1\n"})
+        writer = self.render({"a.yaml": "a: 1\n"}, incremental=True)
+        self.assertEqual((writer.written, writer.unchanged), (0, 1))
+        self.assertIn("a.yaml", load_output_manifest(self.target_dir))
+
+    def test_prune_removes_stale_files(self):
+        """Test that files no longer rendered are removed with their folders."""
+        self.render({"a.yaml": "a: 1\n", "sub/b.yaml": "b: 2\n"}, prune=True)
+        # Files not produced by helmYAMLizer must never be pruned.
+        with open(os.path.join(self.target_dir, "c.yaml"), "w", encoding="utf-8"):
+            pass
+        writer = self.render({"a.yaml": "a: 1\n"}, prune=True)
+        self.assertEqual((writer.unchanged, writer.pruned), (1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.target_dir, "sub")))
+        self.assertTrue(os.path.exists(os.path.join(self.target_dir, "c.yaml")))
+        self.assertEqual(list(load_output_manifest(self.target_dir)), ["a.yaml"])
+
+    @patch("helmYAMLizer.ensure_dirs_exists", wraps=ensure_dirs_exists)
+    def test_directories_are_created_once(self, mock_ensure_dirs):
+        """Test that each output directory is only checked once."""
+        self.render({"sub/a.yaml": "a: 1\n", "sub/b.yaml": "b: 2\n", "c.yaml": ""})
+        self.assertEqual(mock_ensure_dirs.call_count, 2)
+
+    def test_atomic_swaps_in_complete_tree(self):
+        """Test that an atomic run replaces the target tree as a whole."""
+        self.render({"old.yaml": "old: 1\n"}, prune=True)
+        writer = OutputWriter(self.target_dir, atomic=True, prune=True)
+        writer.write("new.yaml", "new: 1\n")
+        # Nothing is visible in the target directory before closing.
+        self.assertEqual(
+            sorted(os.listdir(self.target_dir)), [MANIFEST_FILE_NAME, "old.yaml"]
+        )
+        writer.close()
+        self.assertEqual(
+            sorted(os.listdir(self.target_dir)), [MANIFEST_FILE_NAME, "new.yaml"]
+        )
+        parent_dir = os.path.dirname(os.path.abspath(self.target_dir))
+        self.assertEqual(
+            [name for name in os.listdir(parent_dir) if name.startswith(".")], []
+        )
+
+    def test_atomic_swap_without_exchange(self):
+        """Test that trees are swapped with renames where they cannot be exchanged."""
+        self.render({"old.yaml": "old: 1\n"})
+        with patch("helmYAMLizer.exchange_paths", return_value=False) as mock_exchange:
+            self.render({"new.yaml": "new: 1\n"}, atomic=True)
+        mock_exchange.assert_called_once()
+        self.assertEqual(sorted(os.listdir(self.target_dir)), ["new.yaml", "old.yaml"])
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "requires renameat2")
+    @patch("helmYAMLizer.os.rename")
+    def test_atomic_swap_exchanges_trees(self, mock_rename):
+        """Test that an existing target tree is exchanged in a single step."""
+        self.render({"old.yaml": "old: 1\n"})
+        self.render({"new.yaml": "new: 1\n"}, atomic=True)
+        mock_rename.assert_not_called()
+        self.assertEqual(sorted(os.listdir(self.target_dir)), ["new.yaml", "old.yaml"])
+
+    def test_atomic_keeps_files_not_rendered(self):
+        """Test that files the run did not render survive the swap."""
+        self.render({"a.yaml": "a: 1\n", "stale.yaml": "s: 1\n"}, prune=True)
+        os.makedirs(os.path.join(self.target_dir, ".git", "refs"))
+        for name in ("NOTES.md", ".git/HEAD"):
+            with open(os.path.join(self.target_dir, name), "w", encoding="utf-8") as f:
+                f.write(name)
+        os.symlink("NOTES.md", os.path.join(self.target_dir, "README.md"))
+        writer = self.render(
+            {"a.yaml": "a: 2\n", "sub/b.yaml": "b: 1\n"}, atomic=True, prune=True
+        )
+        self.assertEqual(writer.pruned, 1)
+        files = {
+            os.path.relpath(os.path.join(root, name), self.target_dir)
+            for root, dir_names, file_names in os.walk(self.target_dir)
+            for name in dir_names + file_names
+        }
+        self.assertEqual(
+            files,
+            {
+                MANIFEST_FILE_NAME,
+                "NOTES.md",
+                "README.md",
+                ".git",
+                ".git/HEAD",
+                ".git/refs",
+                "a.yaml",
+                "sub",
+                "sub/b.yaml",
+            },
+        )
+        self.assertEqual(
+            os.readlink(os.path.join(self.target_dir, "README.md")), "NOTES.md"
+        )
+        with open(os.path.join(self.target_dir, "a.yaml"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "a: 2\n")
+
+    def test_atomic_keeps_directory_mode(self):
+        """Test that the swapped in tree keeps the mode of the target."""
+        os.chmod(self.target_dir, 0o751)
+        self.render({"a.yaml": "a: 1\n"}, atomic=True)
+        self.assertEqual(os.stat(self.target_dir).st_mode & 0o777, 0o751)
+        new_dir = os.path.join(self.target_dir, "new")
+        umask = os.umask(0o022)
+        try:
+            OutputWriter(new_dir, atomic=True).close()
+        finally:
+            os.umask(umask)
+        self.assertEqual(os.stat(new_dir).st_mode & 0o777, 0o755)
+
+    def test_atomic_abort_keeps_target_tree(self):
+        """Test that a failed atomic run leaves the target tree untouched."""
+        self.render({"old.yaml": "old: 1\n"})
+        with self.assertRaises(KeyError):
+            with OutputWriter(self.target_dir, atomic=True) as writer:
+                writer.write("new.yaml", "new: 1\n")
+                raise KeyError("failure")
+        self.assertEqual(os.listdir(self.target_dir), ["old.yaml"])
+        self.assertIsNone(writer.staging_dir)
+
+    def test_atomic_incremental_keeps_unchanged_files(self):
+        """Test that unchanged files keep their mtime in an atomic run."""
+        self.render({"a.yaml": "a: 1\n"}, incremental=True)
+        mtime = os.stat(os.path.join(self.target_dir, "a.yaml")).st_mtime_ns
+        writer = self.render({"a.yaml": "a: 1\n"}, incremental=True, atomic=True)
+        self.assertEqual(writer.unchanged, 1)
+        self.assertEqual(
+            os.stat(os.path.join(self.target_dir, "a.yaml")).st_mtime_ns, mtime
+        )
+
+    def test_writers_match_serial_output(self):
+        """Test that writer threads produce the same tree as a serial run."""
+        files = [(f"sub{i % 3}/file{i % 7}.yaml", f"n: {i}\n") for i in range(50)]
+        writer = OutputWriter(self.target_dir, incremental=True, writers=3)
+        for index, (relative_path, text) in enumerate(files, start=1):
+            writer.write(relative_path, text, index)
+        writer.close()
+        self.assertEqual((writer.written, writer.unchanged), (21, 0))
+        # Every document rendered to a path is kept, in input order.
+        expected = {}
+        for relative_path, text in files:
+            expected[relative_path] = (
+                expected[relative_path] + "---\n" + text
+                if relative_path in expected
+                else text
+            )
+        self.assertEqual(
+            sorted(load_output_manifest(self.target_dir)), sorted(expected)
+        )
+        for relative_path, text in expected.items():
+            with open(
+                os.path.join(self.target_dir, relative_path), encoding="utf-8"
+            ) as f:
+                self.assertEqual(f.read(), text)
+
+    def test_documents_of_a_path_are_grouped(self):
+        """Test that documents sharing a path end up in one file."""
+        files = [
+            ("a.yaml", "---\nkind: A1\n"),
+            ("b.yaml", "---\nkind: B\n"),
+            ("a.yaml", "---\nkind: A2"),
+            ("a.yaml", "---\nkind: A3\n"),
+        ]
+        writer = OutputWriter(self.target_dir, incremental=True)
+        for relative_path, text in files:
+            writer.write(relative_path, text)
+        writer.close()
+        self.assertEqual(writer.written, 2)
+        with open(os.path.join(self.target_dir, "a.yaml"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "---\nkind: A1\n---\nkind: A2\n---\nkind: A3\n")
+        self.assertEqual(
+            load_output_manifest(self.target_dir)["a.yaml"]["documents"], 3
+        )
+        # The manifest marks the file as grouped, so an unchanged rerun
+        # writes nothing at all, not even the first document.
+        with patch("helmYAMLizer.save_bytes_to_file") as mock_save:
+            writer = OutputWriter(self.target_dir, incremental=True)
+            for relative_path, text in files:
+                writer.write(relative_path, text)
+            writer.close()
+        mock_save.assert_not_called()
+        self.assertEqual(writer.unchanged, 2)
+
+    def test_adjacent_documents_are_written_once(self):
+        """Test that documents following each other are saved in one write."""
+        with patch(
+            "helmYAMLizer.save_bytes_to_file", wraps=save_bytes_to_file
+        ) as mock_save:
+            writer = OutputWriter(self.target_dir)
+            writer.write("a.yaml", "---\nkind: A1\n")
+            writer.write("a.yaml", "---\nkind: A2\n")
+            writer.write("b.yaml", "---\nkind: B\n")
+            writer.close()
+        self.assertEqual(
+            [os.path.basename(call.args[0]) for call in mock_save.call_args_list],
+            ["a.yaml", "b.yaml"],
+        )
+        self.assertEqual(writer.written, 2)
+        with open(os.path.join(self.target_dir, "a.yaml"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "---\nkind: A1\n---\nkind: A2\n")
+
+    def test_grouped_files_in_atomic_run_keep_live_tree(self):
+        """Test that grouping never writes through links into the live tree."""
+        self.render({"a.yaml": "---\nkind: A1\n"}, incremental=True)
+        writer = OutputWriter(self.target_dir, incremental=True, atomic=True)
+        writer.write("a.yaml", "---\nkind: A1\n")
+        writer.write("a.yaml", "---\nkind: A2\n")
+        # The live file is untouched until the staged tree is swapped in.
+        writer.flush()
+        with open(os.path.join(self.target_dir, "a.yaml"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "---\nkind: A1\n")
+        writer.close()
+        with open(os.path.join(self.target_dir, "a.yaml"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "---\nkind: A1\n---\nkind: A2\n")
+
+    def test_writers_report_first_write_error(self):
+        """Test that a failing write is raised with its document index."""
+        # Without writers, a file is saved while writing the next document.
+        for writers in (0, 2):
+            with raising_errors():
+                with self.assertRaises(DocumentError) as context:
+                    with OutputWriter(
+                        self.target_dir, atomic=True, writers=writers
+                    ) as writer:
+                        writer.write("a.yaml", "a: 1\n", 1)
+                        # A directory in place of the file makes the write fail.
+                        os.mkdir(writer.prepare("b.yaml"))
+                        writer.write("b.yaml", "b: 2\n", 2)
+                        writer.write("c.yaml", "c: 3\n", 3)
+            self.assertEqual(context.exception.index, 2)
+            self.assertIn("b.yaml", context.exception.message)
+            self.assertEqual(os.listdir(self.target_dir), [])
+            self.assertEqual(writer.write_threads, [])
+
+    @patch.object(OutputWriter, "save", side_effect=OSError("disk full"))
+    def test_writers_report_unexpected_errors(self, _):
+        """Test that any error of a writer is raised instead of blocking it."""
+        with self.assertRaises(DocumentError) as context:
+            with OutputWriter(self.target_dir, writers=1) as writer:
+                # More files than the queue holds, which a dead writer never takes.
+                for index in range(1, WRITE_QUEUE_SIZE + 3):
+                    writer.write(f"{index}.yaml", "a: 1\n", index)
+        self.assertEqual(context.exception.index, 1)
+        self.assertEqual(context.exception.message, "disk full")
+        self.assertEqual(writer.write_threads, [])
+
+    def test_incremental_reports_unreadable_files(self):
+        """Test that a file standing in for a folder fails with a render error."""
+        with open(os.path.join(self.target_dir, "sub"), "w", encoding="utf-8"):
+            pass
+        with raising_errors():
+            with self.assertRaises(RenderError) as context:
+                self.render({"sub/a.yaml": "a: 1\n"}, incremental=True)
+        self.assertEqual(context.exception.function, "is_file_unchanged")
+        self.assertIn("Not a directory", context.exception.message)
+
+    @patch("helmYAMLizer.logging.warning")
+    def test_malformed_manifest_is_ignored(self, mock_logging):
+        """Test that a malformed manifest is treated as missing."""
+        with open(
+            os.path.join(self.target_dir, MANIFEST_FILE_NAME), "w", encoding="utf-8"
+        ) as f:
+            f.write("not json")
+        self.assertEqual(load_output_manifest(self.target_dir), {})
+        mock_logging.assert_called_once()
+
+    @patch("helmYAMLizer.logging.warning")
+    def test_prune_stays_in_tree(self, mock_logging):
+        """Test that manifest entries outside of the tree are never pruned."""
+        with tempfile.TemporaryDirectory() as outside_dir:
+            outside_path = os.path.join(outside_dir, "x.yaml")
+            with open(outside_path, "w", encoding="utf-8") as f:
+                f.write("x: 1\n")
+            os.symlink(outside_dir, os.path.join(self.target_dir, "link"))
+            open(os.path.join(self.target_dir, "a.yaml"), "w", encoding="utf-8").close()
+            entries = [outside_path, "../x.yaml", "link/x.yaml", "a.yaml"]
+            with open(
+                os.path.join(self.target_dir, MANIFEST_FILE_NAME), "w", encoding="utf-8"
+            ) as f:
+                json.dump({"files": {entry: {} for entry in entries}}, f)
+            self.assertEqual(list(load_output_manifest(self.target_dir)), ["a.yaml"])
+            self.assertEqual(mock_logging.call_count, 3)
+            writer = self.render({"b.yaml": "b: 2\n"}, incremental=True, prune=True)
+            self.assertTrue(os.path.exists(outside_path))
+        self.assertEqual(writer.pruned, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import (
+    EXIT_ON_ERROR,
+    DocumentError,
+    HelmYAMLizerError,
+    RenderError,
+    RenderOptions,
+    flatten_source_path,
+    iter_render,
+    render,
+)
+
+HELM_OUTPUT = (
+    "---\n# Source: chart/templates/a.yaml\nmetadata:\n"
+    "  labels:\n    drop: me\n    keep: me\n"
+    "---\nkind: NoSource\n"
+    "---\n# Source: chart/templates/sub/b.yaml\nkind: B\n"
+)
+
+
+class TestRender(unittest.TestCase):
+    """'render' and 'iter_render' functions test cases."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.target_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_render_text(self):
+        """Test rendering text into the target directory."""
+        manifest = render(HELM_OUTPUT, self.target_dir)
+        self.assertEqual(manifest.files, ["a.yaml", "sub/b.yaml"])
+        self.assertEqual((manifest.documents, manifest.skipped), (2, 1))
+        self.assertEqual(manifest.written, 2)
+        self.assertIsNone(manifest.stats)
+        with open(os.path.join(self.target_dir, "sub/b.yaml"), encoding="utf-8") as f:
+            self.assertEqual(
+                f.read(), "---\n# Source: chart/templates/sub/b.yaml\nkind: B\n"
+            )
+
+    def test_render_stream_with_options(self):
+        """Test rendering a stream with transformations and a kustomization."""
+        options = RenderOptions(
+            drop_label_keys=["drop"], kustomize_generate=True, stats=True
+        )
+        manifest = render(io.StringIO(HELM_OUTPUT), self.target_dir, options)
+        with open(os.path.join(self.target_dir, "a.yaml"), encoding="utf-8") as f:
+            self.assertNotIn("drop: me", f.read())
+        self.assertTrue(
+            os.path.exists(os.path.join(self.target_dir, "kustomization.yaml"))
+        )
+        self.assertEqual(len(manifest.stats.documents), 2)
+
+    def test_stats_record_source_templates(self):
+        """Test that documents sharing an output path are told apart by source."""
+        helm_output = (
+            "---\n# Source: chart/templates/clusterrole.yaml\nkind: A\n"
+            "---\n# Source: chart/charts/sub/templates/clusterrole.yaml\nkind: B\n"
+        )
+        manifest = render(helm_output, self.target_dir, RenderOptions(stats=True))
+        self.assertEqual(
+            [(doc["source"], doc["path"]) for doc in manifest.stats.documents],
+            [
+                ("chart/templates/clusterrole.yaml", "clusterrole.yaml"),
+                ("chart/charts/sub/templates/clusterrole.yaml", "clusterrole.yaml"),
+            ],
+        )
+
+    def test_render_with_writers(self):
+        """Test that writer threads produce the same files as a serial run."""
+        serial = render(HELM_OUTPUT, os.path.join(self.target_dir, "serial"))
+        pipelined = render(
+            HELM_OUTPUT,
+            os.path.join(self.target_dir, "pipelined"),
+            RenderOptions(writers=2),
+        )
+        self.assertEqual(pipelined.files, serial.files)
+        self.assertEqual(pipelined.written, serial.written)
+        for relative_path in serial.files:
+            contents = []
+            for folder in ("serial", "pipelined"):
+                file_path = os.path.join(self.target_dir, folder, relative_path)
+                with open(file_path, encoding="utf-8") as f:
+                    contents.append(f.read())
+            self.assertEqual(contents[0], contents[1])
+
+    def test_iter_render_does_not_write(self):
+        """Test that documents are yielded lazily without writing files."""
+        rendered = iter_render(HELM_OUTPUT, RenderOptions(drop_label_keys=["drop"]))
+        path, text = next(rendered)
+        self.assertEqual(path, "a.yaml")
+        self.assertNotIn("drop: me", text)
+        self.assertEqual([path for path, _ in rendered], ["sub/b.yaml"])
+        self.assertEqual(os.listdir(self.target_dir), [])
+
+    @patch("helmYAMLizer.sys.exit")
+    def test_errors_are_raised(self, mock_exit):
+        """Test that errors are raised as typed exceptions instead of exiting."""
+        with self.assertRaises(DocumentError) as context:
+            render(
+                HELM_OUTPUT + "---\n# Source: nowhere.yaml\nkind: C\n", self.target_dir
+            )
+        self.assertEqual(context.exception.index, 4)
+        self.assertIsInstance(context.exception.__cause__, RenderError)
+        self.assertEqual(context.exception.__cause__.function, "flatten_source_path")
+        with self.assertRaises(HelmYAMLizerError):
+            list(iter_render("---\n# Source: nowhere.yaml\nkind: C\n"))
+        mock_exit.assert_not_called()
+        # Exiting on errors is restored for the command line functions.
+        self.assertTrue(EXIT_ON_ERROR.get())
+        with patch("helmYAMLizer.logging.fatal"):
+            flatten_source_path("nowhere.yaml")
+        mock_exit.assert_called_once_with(1)
+
+    @patch("helmYAMLizer.sys.exit")
+    def test_setup_errors_are_raised(self, mock_exit):
+        """Test that invalid options and set-up failures raise typed exceptions."""
+        missing_dir = os.path.join(self.target_dir, "file", "sub")
+        with open(os.path.join(self.target_dir, "file"), "w", encoding="utf-8"):
+            pass
+        for options, function in (
+            (RenderOptions(include=["colour=red"]), "get_document_filter"),
+            (RenderOptions(check=True, archive=True), "get_writer"),
+            (
+                RenderOptions(index=os.path.join(missing_dir, "i.jsonl")),
+                "get_resource_index",
+            ),
+            (RenderOptions(["a"], cache_dir=missing_dir), "get_render_cache"),
+        ):
+            with self.assertRaises(RenderError) as context:
+                render(HELM_OUTPUT, os.path.join(self.target_dir, "out"), options)
+            self.assertEqual(context.exception.function, function)
+        mock_exit.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import RenderCache, RenderOptions, render
+
+HELM_OUTPUT = (
+    "---\n# Source: chart/templates/a.yaml\nmetadata:\n"
+    "  labels:\n    drop: me\n    keep: me\n"
+    "---\nkind: NoSource\n"
+)
+
+
+class TestRenderCache(unittest.TestCase):
+    """'RenderCache' class test cases."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        """Test that stored documents are returned and counted."""
+        cache = RenderCache(self.cache_dir, "namespace", 2**20)
+        key = cache.key("kind: A\n")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "# Source: a.yaml", "a.yaml", "kind: A\n")
+        self.assertEqual(cache.get(key), ("# Source: a.yaml", "a.yaml", "kind: A\n"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_corrupt_entries_are_misses(self):
+        """Test that entries lacking a field or of another type are misses."""
+        cache = RenderCache(self.cache_dir, "namespace", 2**20)
+        key = cache.key("kind: A\n")
+        os.makedirs(os.path.dirname(cache.entry_path(key)))
+        for data in ('{"x": 1}', "[]", '{"source": null, "path": 1, "text": null}'):
+            with open(cache.entry_path(key), "w", encoding="utf-8") as f:
+                f.write(data)
+            self.assertIsNone(cache.get(key))
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+    def test_key_depends_on_namespace(self):
+        """Test that the same document has a different key per namespace."""
+        cache = RenderCache(self.cache_dir, "one", 2**20)
+        other = RenderCache(self.cache_dir, "two", 2**20)
+        self.assertNotEqual(cache.key("kind: A\n"), other.key("kind: A\n"))
+        self.assertEqual(cache.key("kind: A\n"), cache.key("kind: A\n"))
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest entries are evicted beyond the size cap."""
+        cache = RenderCache(self.cache_dir, "namespace", 2**20)
+        keys = [cache.key(str(i)) for i in range(3)]
+        for age, key in enumerate(keys):
+            cache.put(key, None, None, None)
+            size = os.path.getsize(cache.entry_path(key))
+            os.utime(cache.entry_path(key), ns=(age, age))
+        # Using the oldest entry makes the second one the least recent.
+        cache.get(keys[0])
+        cache.max_bytes = 2 * size
+        cache.close()
+        self.assertEqual(cache.evicted, 1)
+        self.assertFalse(os.path.exists(cache.entry_path(keys[1])))
+        self.assertTrue(os.path.exists(cache.entry_path(keys[0])))
+
+    def test_render_skips_parsing_cached_documents(self):
+        """Test that a second render reuses the cached documents."""
+        options = RenderOptions(drop_label_keys=["drop"], cache_dir=self.cache_dir)
+        first = render(HELM_OUTPUT, os.path.join(self.temp_dir.name, "a"), options)
+        self.assertEqual((first.cache_hits, first.cache_misses), (0, 2))
+        with patch("helmYAMLizer.load_document") as mock_load:
+            second = render(HELM_OUTPUT, os.path.join(self.temp_dir.name, "b"), options)
+        mock_load.assert_not_called()
+        self.assertEqual((second.cache_hits, second.cache_misses), (2, 0))
+        self.assertEqual((second.files, second.skipped), (["a.yaml"], 1))
+        with open(os.path.join(self.temp_dir.name, "b/a.yaml"), encoding="utf-8") as f:
+            self.assertNotIn("drop: me", f.read())
+
+    def test_render_misses_with_other_options(self):
+        """Test that options affecting the output are part of the key."""
+        target_dir = os.path.join(self.temp_dir.name, "a")
+        render(
+            HELM_OUTPUT,
+            target_dir,
+            RenderOptions(drop_label_keys=["drop"], cache_dir=self.cache_dir),
+        )
+        manifest = render(
+            HELM_OUTPUT,
+            target_dir,
+            RenderOptions(drop_label_keys=["keep"], cache_dir=self.cache_dir),
+        )
+        self.assertEqual((manifest.cache_hits, manifest.cache_misses), (0, 2))
+
+    def test_passthrough_is_not_cached(self):
+        """Test that runs without transformations do not use the cache."""
+        render(
+            HELM_OUTPUT,
+            os.path.join(self.temp_dir.name, "a"),
+            RenderOptions(cache_dir=self.cache_dir),
+        )
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import hashlib
+import json
+import os
+import tempfile
+import unittest
+from helmYAMLizer import DocumentError, RenderOptions, render
+
+SERVICE = (
+    "---\n# Source: chart/templates/service.yaml\n"
+    "apiVersion: v1\nkind: Service\nmetadata:\n  name: web\n  namespace: prod\n"
+)
+
+HELM_OUTPUT = (
+    SERVICE + "---\n# Source: chart/templates/service-headless.yaml\n"
+    "apiVersion: v1\nkind: Service\nmetadata: {name: web, namespace: dev}\n"
+    "---\n# Source: chart/templates/service-copy.yaml\n"
+    "apiVersion: v1\nkind: Service\nmetadata:\n  name: web\n  namespace: prod\n"
+    "---\nkind: NoSource\n"
+)
+
+
+class TestResourceIndex(unittest.TestCase):
+    """'ResourceIndex' class test cases."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.target_dir = os.path.join(self.temp_dir.name, "out")
+        self.index_path = os.path.join(self.temp_dir.name, "index.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_records(self):
+        with open(self.index_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_records(self):
+        """Test that every rendered document gets a record."""
+        manifest = render(
+            HELM_OUTPUT, self.target_dir, RenderOptions(index=self.index_path)
+        )
+        records = self.read_records()
+        self.assertEqual([record["index"] for record in records], [1, 2, 3])
+        self.assertEqual(
+            records[0],
+            {
+                "index": 1,
+                "apiVersion": "v1",
+                "kind": "Service",
+                "name": "web",
+                "namespace": "prod",
+                "source": "chart/templates/service.yaml",
+                "path": "service.yaml",
+                "size": len(SERVICE),
+                "sha256": hashlib.sha256(SERVICE.encode("utf-8")).hexdigest(),
+            },
+        )
+        # Headers in flow style are parsed instead of scanned.
+        self.assertEqual(records[1]["namespace"], "dev")
+        self.assertEqual(manifest.duplicates, 1)
+
+    def test_duplicates_are_reported(self):
+        """Test that resources sharing kind, name and namespace are warned about."""
+        with self.assertLogs(level="WARNING") as logs:
+            render(HELM_OUTPUT, self.target_dir, RenderOptions(index=self.index_path))
+        self.assertIn(
+            "Duplicate resource Service web in namespace prod:"
+            " documents [#1] and [#3]",
+            "\n".join(logs.output),
+        )
+
+    def test_index_with_transform(self):
+        """Test that records describe the transformed documents."""
+        options = RenderOptions(index=self.index_path, drop_label_keys=["a"], jobs=2)
+        render(HELM_OUTPUT, self.target_dir, options)
+        for record in self.read_records():
+            with open(
+                os.path.join(self.target_dir, record["path"]), encoding="utf-8"
+            ) as f:
+                self.assertEqual(len(f.read()), record["size"])
+
+    def test_index_discarded_on_error(self):
+        """Test that a failing render leaves no index behind."""
+        with self.assertRaises(DocumentError):
+            render(
+                "---\n# Source: chart/other/a.yaml\nkind: A\n",
+                self.target_dir,
+                RenderOptions(index=self.index_path),
+            )
+        self.assertFalse(os.path.exists(self.index_path))
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from helmYAMLizer import RunStats
+
+
+class TestRunStats(unittest.TestCase):
+    """'RunStats' class test cases."""
+
+    def test_measure_stages(self):
+        """Test that stage times and calls are accumulated."""
+        stats = RunStats()
+        for _ in range(3):
+            with stats.measure("parse"):
+                pass
+        wall, cpu, calls = stats.stages["parse"]
+        self.assertEqual(calls, 3)
+        self.assertGreaterEqual(wall, 0)
+        self.assertGreaterEqual(cpu, 0)
+
+    def test_measure_records_failures(self):
+        """Test that the time is recorded even when the stage fails."""
+        stats = RunStats()
+        with self.assertRaises(KeyError):
+            with stats.measure("write"):
+                raise KeyError("failure")
+        self.assertEqual(stats.stages["write"][2], 1)
+
+    def test_disabled_records_nothing(self):
+        """Test that a disabled instance does not record anything."""
+        stats = RunStats(enabled=False)
+        with stats.measure("parse"):
+            pass
+        stats.add_document(1, "chart/templates/a.yaml", "a.yaml", "a: 1\n", 1.0)
+        self.assertEqual((stats.stages, stats.documents), ({}, []))
+
+    def test_merge_worker_stages(self):
+        """Test merging stage times collected in a pool worker."""
+        stats = RunStats()
+        stats.add("parse", 1.0, 0.5)
+        stats.merge({"parse": [2.0, 1.0, 1], "serialize": [1.0, 1.0, 1]})
+        self.assertEqual(stats.stages["parse"], [3.0, 1.5, 2])
+        self.assertEqual(stats.stages["serialize"], [1.0, 1.0, 1])
+
+    def test_iter_timed(self):
+        """Test that iterating through the stage yields every item."""
+        stats = RunStats()
+        self.assertEqual(list(stats.iter_timed("read", iter("abc"))), ["a", "b", "c"])
+        self.assertEqual(stats.stages["read"][2], 4)
+
+    def test_slowest_documents(self):
+        """Test that the slowest documents are reported with their sizes."""
+        stats = RunStats(slowest=2)
+        stats.add_document(1, "chart/templates/a.yaml", "a.yaml", "a: 1\n", 0.1)
+        stats.add_document(2, "chart/templates/b.yaml", "b.yaml", "b: é\n", 0.3)
+        stats.add_document(3, "chart/templates/c.yaml", "c.yaml", "c: 1\n", 0.2)
+        data = stats.to_dict()
+        self.assertEqual(
+            [doc["path"] for doc in data["slowest_documents"]], ["b.yaml", "c.yaml"]
+        )
+        self.assertEqual(data["slowest_documents"][0]["bytes"], 6)
+        with patch("helmYAMLizer.logging.info") as mock_logging:
+            stats.report()
+        self.assertEqual(mock_logging.call_count, 3)
+
+    def test_save(self):
+        """Test saving the statistics as JSON."""
+        stats = RunStats()
+        with stats.measure("parse"):
+            pass
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "stats.json")
+            stats.save(file_path)
+            with open(file_path, encoding="utf-8") as f:
+                data = json.load(f)
+        self.assertEqual(data["stages"]["parse"]["calls"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
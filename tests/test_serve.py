@@ -0,0 +1,204 @@
+# pylint: disable=missing-module-docstring
+# pylint: disable=no-name-in-module
+
+import io
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from helmYAMLizer import (
+    HelmYAMLizerError,
+    RenderOptions,
+    new_render_server,
+    remove_stale_socket,
+    render_remote,
+)
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+HELM_OUTPUT = (
+    b"---\n# Source: chart/templates/a.yaml\nmetadata:\n"
+    b"  labels:\n    drop: me\n    keep: me\n"
+    b"---\n# Source: chart/templates/sub/b.yaml\nkind: B\n"
+)
+
+
+class TestRenderServer(unittest.TestCase):
+    """Daemon server and 'render_remote' function test cases."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.socket_path = os.path.join(self.temp_dir.name, "daemon.sock")
+        self.server = new_render_server(self.socket_path, max_request_size=4096)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.logging = patch("helmYAMLizer.logging")
+        self.logging.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.logging.stop()
+        self.temp_dir.cleanup()
+
+    def target(self, name):
+        """Return the path of a target directory in the temporary folder."""
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_render_remote(self):
+        """Test that the daemon renders the request into the target folder."""
+        response = render_remote(
+            self.socket_path,
+            io.BytesIO(HELM_OUTPUT),
+            self.target("out"),
+            RenderOptions(drop_label_keys=["drop"]),
+        )
+        self.assertEqual(response["files"], ["a.yaml", "sub/b.yaml"])
+        self.assertEqual(response["written"], 2)
+        with open(os.path.join(self.target("out"), "a.yaml"), encoding="utf-8") as f:
+            self.assertNotIn("drop: me", f.read())
+
+    def test_concurrent_clients(self):
+        """Test that several clients are served at the same time."""
+
+        def request(index):
+            return render_remote(
+                self.socket_path, io.BytesIO(HELM_OUTPUT), self.target(str(index))
+            )
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            responses = list(executor.map(request, range(8)))
+        self.assertEqual([response["documents"] for response in responses], [2] * 8)
+
+    def test_request_size_limit(self):
+        """Test that requests beyond the size limit are rejected."""
+        with self.assertRaises(HelmYAMLizerError) as context:
+            render_remote(
+                self.socket_path, io.BytesIO(HELM_OUTPUT * 100), self.target("out")
+            )
+        self.assertIn("exceeds the limit of 4096 bytes", str(context.exception))
+        self.assertFalse(os.path.exists(self.target("out")))
+
+    def test_errors_are_reported(self):
+        """Test that a failing render is reported to the client."""
+        with self.assertRaises(HelmYAMLizerError) as context:
+            render_remote(
+                self.socket_path,
+                io.BytesIO(b"---\n# Source: nowhere.yaml\nkind: C\n"),
+                self.target("out"),
+            )
+        self.assertIn("Document [#1]", str(context.exception))
+        # The daemon keeps serving after a failed request.
+        response = render_remote(
+            self.socket_path, io.BytesIO(HELM_OUTPUT), self.target("out")
+        )
+        self.assertEqual(response["documents"], 2)
+
+    def test_option_types(self):
+        """Test that requests with mistyped or invalid options are rejected."""
+        with self.assertRaises(HelmYAMLizerError) as context:
+            render_remote(
+                self.socket_path,
+                io.BytesIO(HELM_OUTPUT),
+                self.target("out"),
+                RenderOptions(drop_label_keys="drop"),
+            )
+        self.assertIn(
+            "option 'drop_label_keys' must be Optional[List[str]], not 'drop'.",
+            str(context.exception),
+        )
+        with self.assertRaises(HelmYAMLizerError) as context:
+            render_remote(
+                self.socket_path,
+                io.BytesIO(HELM_OUTPUT),
+                self.target("out"),
+                RenderOptions(loader="fastt"),
+            )
+        self.assertIn(
+            "option 'loader' must be one of roundtrip, fast, not 'fastt'.",
+            str(context.exception),
+        )
+        self.assertFalse(os.path.exists(self.target("out")))
+
+
+class TestRemoveStaleSocket(unittest.TestCase):
+    """'remove_stale_socket' function test cases."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.socket_path = os.path.join(self.temp_dir.name, "daemon.sock")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_stale_socket(self):
+        """Test that a socket nobody listens on is removed."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+            stale.bind(self.socket_path)
+        remove_stale_socket(self.socket_path)
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_other_files_are_kept(self):
+        """Test that a regular file at the socket path is never removed."""
+        with open(self.socket_path, "w", encoding="utf-8") as f:
+            f.write("data")
+        with self.assertRaises(RuntimeError):
+            remove_stale_socket(self.socket_path)
+        with open(self.socket_path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "data")
+
+    def test_live_socket(self):
+        """Test that the socket of a running daemon is kept."""
+        with new_render_server(self.socket_path, max_request_size=4096):
+            with self.assertRaises(RuntimeError):
+                remove_stale_socket(self.socket_path)
+            self.assertTrue(os.path.exists(self.socket_path))
+
+
+class TestServe(unittest.TestCase):
+    """'--serve' and '--connect' command line test cases."""
+
+    def test_serve_until_terminated(self):
+        """Test that the daemon serves clients and shuts down cleanly."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            socket_path = os.path.join(temp_dir, "daemon.sock")
+            script = os.path.join(ROOT_DIR, "helmYAMLizer.py")
+            with subprocess.Popen(
+                [sys.executable, script, "--serve", socket_path],
+                stderr=subprocess.DEVNULL,
+            ) as daemon:
+                for _ in range(100):
+                    if os.path.exists(socket_path):
+                        break
+                    time.sleep(0.05)
+                target_dir = os.path.join(temp_dir, "out")
+                client = subprocess.run(
+                    [
+                        sys.executable,
+                        script,
+                        "--connect",
+                        socket_path,
+                        "-d",
+                        target_dir,
+                    ],
+                    input=HELM_OUTPUT,
+                    capture_output=True,
+                    check=False,
+                )
+                daemon.send_signal(signal.SIGTERM)
+                self.assertEqual(daemon.wait(timeout=10), 0)
+            self.assertEqual(client.returncode, 0)
+            self.assertTrue(os.path.exists(os.path.join(target_dir, "sub/b.yaml")))
+            self.assertFalse(os.path.exists(socket_path))
+
+
+if __name__ == "__main__":
+    unittest.main()